@@ -1,5 +1,9 @@
 #!/usr/bin/env python3
-"""创建测试数据库和表"""
+"""创建测试数据库和表
+
+只包含几个普通表；大规模的低代码 schema 测试数据使用
+tests/benchmarks/synthetic_schema.py 生成。
+"""
 
 import sqlite3
 import os
@@ -1,17 +1,29 @@
 """API 客户端模块 - 用于通过 API 获取数据库信息"""
 
+import asyncio
 import os
 from typing import List, Optional, Dict, Any
 import httpx
+from .metrics import metrics
 from .models import TableInfo, ColumnInfo
 
 
 class APIClient:
     """API 客户端，用于从远程 API 获取数据库表结构信息"""
 
-    def __init__(self, base_url: Optional[str] = None, token: Optional[str] = None):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        token: Optional[str] = None,
+        timeout: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
         self.base_url = base_url or os.getenv("API_BASE_URL")
         self.token = token or os.getenv("API_TOKEN")
+        # 每个请求的超时时间（秒）
+        self.timeout = timeout
+        # 自定义 httpx 传输层，例如测试和基准中使用的本地模拟 API
+        self.transport = transport
 
         if not self.base_url:
             raise ValueError("API_BASE_URL is required")
@@ -24,6 +36,36 @@ class APIClient:
         if self.token:
             self.headers["Authorization"] = f"Bearer {self.token}"
 
+        # 复用的 HTTP 连接池，按事件循环创建
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._http_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _client(self) -> httpx.AsyncClient:
+        """获取复用连接的 httpx.AsyncClient
+
+        连接池绑定在创建它的事件循环上，事件循环变化（例如 fork 出的 worker 或
+        新的 asyncio.run）时重新创建。
+        """
+        loop = asyncio.get_running_loop()
+        if (
+            self._http_client is None
+            or self._http_client.is_closed
+            or self._http_loop is not loop
+        ):
+            self._http_client = httpx.AsyncClient(
+                transport=self.transport, event_hooks=metrics.http_event_hooks()
+            )
+            self._http_loop = loop
+        return self._http_client
+
+    async def aclose(self):
+        """关闭 HTTP 连接池"""
+        if self._http_client is not None and not self._http_client.is_closed:
+            if self._http_loop is asyncio.get_running_loop():
+                await self._http_client.aclose()
+        self._http_client = None
+        self._http_loop = None
+
     async def get_table_info(self, table_name: str) -> Optional[TableInfo]:
         """通过 API 获取指定表的结构信息"""
         # 首先尝试通过低代码系统的 schema API 获取信息
@@ -37,82 +79,83 @@ class APIClient:
     async def _get_table_info_from_schema_api(self, table_name: str) -> Optional[TableInfo]:
         """通过低代码系统的 schema API 获取表信息"""
         try:
-            async with httpx.AsyncClient() as client:
-                # 查询实体基本信息
-                entity_response = await client.get(
-                    f"{self.base_url}/api/schema/entity/{table_name}",
-                    headers=self.headers,
-                    timeout=30.0,
-                )
+            client = self._client()
+            # 查询实体基本信息
+            entity_response = await client.get(
+                f"{self.base_url}/api/schema/entity/{table_name}",
+                headers=self.headers,
+                timeout=self.timeout,
+            )
                 
-                if entity_response.status_code != 200:
-                    return None
+            if entity_response.status_code != 200:
+                return None
                 
-                entity_data = entity_response.json()
-                if not entity_data or not entity_data.get('data'):
-                    return None
+            entity_data = entity_response.json()
+            if not entity_data or not entity_data.get('data'):
+                return None
                 
-                entity = entity_data['data']
-                entity_id = entity.get('id')
-                entity_name = entity.get('name', table_name)
-                entity_description = entity.get('description', '')
+            entity = entity_data['data']
+            entity_id = entity.get('id')
+            entity_name = entity.get('name', table_name)
+            entity_description = entity.get('description', '')
                 
-                # 查询字段信息
-                attrs_response = await client.get(
-                    f"{self.base_url}/api/schema/entity/{entity_id}/attributes",
-                    headers=self.headers,
-                    timeout=30.0,
-                )
+            # 查询字段信息
+            attrs_response = await client.get(
+                f"{self.base_url}/api/schema/entity/{entity_id}/attributes",
+                headers=self.headers,
+                timeout=self.timeout,
+            )
                 
-                if attrs_response.status_code != 200:
-                    return None
+            if attrs_response.status_code != 200:
+                return None
                 
-                attrs_data = attrs_response.json()
-                attributes = attrs_data.get('data', [])
+            attrs_data = attrs_response.json()
+            attributes = attrs_data.get('data', [])
                 
-                columns = []
-                foreign_keys = []
+            columns = []
+            foreign_keys = []
                 
-                for attr in attributes:
-                    # 解析字段信息
-                    column_info = ColumnInfo(
-                        name=attr.get('column_name') or attr.get('code'),
-                        type=attr.get('data_type', 'string'),
-                        nullable=not bool(attr.get('required', False)),
-                        default=attr.get('default_value'),
-                        comment=f"{attr.get('name', '')} ({attr.get('code', '')})" + 
-                               (f" - {attr.get('description', '')}" if attr.get('description') else ""),
-                        is_primary_key=bool(attr.get('primary_key', False)),
-                        max_length=attr.get('data_length')
-                    )
-                    columns.append(column_info)
+            for attr in attributes:
+                # 解析字段信息
+                column_info = ColumnInfo(
+                    name=attr.get('column_name') or attr.get('code'),
+                    type=attr.get('data_type', 'string'),
+                    code=attr.get('code'),
+                    nullable=not bool(attr.get('required', False)),
+                    default=attr.get('default_value'),
+                    comment=f"{attr.get('name', '')} ({attr.get('code', '')})" + 
+                           (f" - {attr.get('description', '')}" if attr.get('description') else ""),
+                    is_primary_key=bool(attr.get('primary_key', False)),
+                    max_length=attr.get('data_length')
+                )
+                columns.append(column_info)
                     
-                    # 处理外键关系
-                    if attr.get('ref_entity_id') and attr.get('ref_type') == 'foreign_key':
-                        # 查询引用的实体信息
-                        ref_entity_response = await client.get(
-                            f"{self.base_url}/api/schema/entity/by-id/{attr['ref_entity_id']}",
-                            headers=self.headers,
-                            timeout=30.0,
-                        )
+                # 处理外键关系
+                if attr.get('ref_entity_id') and attr.get('ref_type') == 'foreign_key':
+                    # 查询引用的实体信息
+                    ref_entity_response = await client.get(
+                        f"{self.base_url}/api/schema/entity/by-id/{attr['ref_entity_id']}",
+                        headers=self.headers,
+                        timeout=self.timeout,
+                    )
                         
-                        if ref_entity_response.status_code == 200:
-                            ref_entity_data = ref_entity_response.json()
-                            ref_entity = ref_entity_data.get('data', {})
-                            if ref_entity.get('table_name'):
-                                foreign_keys.append({
-                                    "column": attr.get('column_name') or attr.get('code'),
-                                    "referenced_table": ref_entity['table_name'],
-                                    "referenced_column": "id"
-                                })
+                    if ref_entity_response.status_code == 200:
+                        ref_entity_data = ref_entity_response.json()
+                        ref_entity = ref_entity_data.get('data', {})
+                        if ref_entity.get('table_name'):
+                            foreign_keys.append({
+                                "column": attr.get('column_name') or attr.get('code'),
+                                "referenced_table": ref_entity['table_name'],
+                                "referenced_column": "id"
+                            })
                 
-                return TableInfo(
-                    name=table_name,
-                    comment=f"{entity_name} - {entity_description}" if entity_description else entity_name,
-                    columns=columns,
-                    indexes=[],  # 低代码系统中索引信息通常不通过 API 提供
-                    foreign_keys=foreign_keys
-                )
+            return TableInfo(
+                name=table_name,
+                comment=f"{entity_name} - {entity_description}" if entity_description else entity_name,
+                columns=columns,
+                indexes=[],  # 低代码系统中索引信息通常不通过 API 提供
+                foreign_keys=foreign_keys
+            )
                 
         except httpx.RequestError as e:
             print(f"Schema API request error: {e}")
@@ -121,21 +164,21 @@ class APIClient:
     async def _get_table_info_from_traditional_api(self, table_name: str) -> Optional[TableInfo]:
         """通过传统 API 获取表信息"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/api/database/tables/{table_name}",
-                    headers=self.headers,
-                    timeout=30.0,
-                )
+            client = self._client()
+            response = await client.get(
+                f"{self.base_url}/api/database/tables/{table_name}",
+                headers=self.headers,
+                timeout=self.timeout,
+            )
 
-                if response.status_code == 200:
-                    data = response.json()
-                    return self._parse_table_info(data)
-                else:
-                    print(
-                        f"Traditional API request failed: {response.status_code} - {response.text}"
-                    )
-                    return None
+            if response.status_code == 200:
+                data = response.json()
+                return self._parse_table_info(data)
+            else:
+                print(
+                    f"Traditional API request failed: {response.status_code} - {response.text}"
+                )
+                return None
 
         except httpx.RequestError as e:
             print(f"Traditional API request error: {e}")
@@ -144,26 +187,26 @@ class APIClient:
     async def get_all_tables(self) -> List[str]:
         """通过 API 获取所有表名"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/api/database/tables",
-                    headers=self.headers,
-                    timeout=30.0,
-                )
+            client = self._client()
+            response = await client.get(
+                f"{self.base_url}/api/database/tables",
+                headers=self.headers,
+                timeout=self.timeout,
+            )
 
-                if response.status_code == 200:
-                    data = response.json()
-                    if isinstance(data, dict) and "tables" in data:
-                        return data["tables"]
-                    elif isinstance(data, list):
-                        return data
-                    else:
-                        return []
+            if response.status_code == 200:
+                data = response.json()
+                if isinstance(data, dict) and "tables" in data:
+                    return data["tables"]
+                elif isinstance(data, list):
+                    return data
                 else:
-                    print(
-                        f"API request failed: {response.status_code} - {response.text}"
-                    )
                     return []
+            else:
+                print(
+                    f"API request failed: {response.status_code} - {response.text}"
+                )
+                return []
 
         except httpx.RequestError as e:
             print(f"API request error: {e}")
@@ -172,37 +215,37 @@ class APIClient:
     async def search_tables(self, keyword: str) -> List[TableInfo]:
         """通过 API 搜索表"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/api/database/tables/search",
-                    params={"q": keyword},
-                    headers=self.headers,
-                    timeout=30.0,
-                )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    tables = []
-
-                    if isinstance(data, dict) and "tables" in data:
-                        table_list = data["tables"]
-                    elif isinstance(data, list):
-                        table_list = data
-                    else:
-                        return []
+            client = self._client()
+            response = await client.get(
+                f"{self.base_url}/api/database/tables/search",
+                params={"q": keyword},
+                headers=self.headers,
+                timeout=self.timeout,
+            )
 
-                    for table_data in table_list:
-                        table_info = self._parse_table_info(table_data)
-                        if table_info:
-                            tables.append(table_info)
+            if response.status_code == 200:
+                data = response.json()
+                tables = []
 
-                    return tables
+                if isinstance(data, dict) and "tables" in data:
+                    table_list = data["tables"]
+                elif isinstance(data, list):
+                    table_list = data
                 else:
-                    print(
-                        f"API request failed: {response.status_code} - {response.text}"
-                    )
                     return []
 
+                for table_data in table_list:
+                    table_info = self._parse_table_info(table_data)
+                    if table_info:
+                        tables.append(table_info)
+
+                return tables
+            else:
+                print(
+                    f"API request failed: {response.status_code} - {response.text}"
+                )
+                return []
+
         except httpx.RequestError as e:
             print(f"API request error: {e}")
             return []
@@ -227,6 +270,7 @@ class APIClient:
                 column = ColumnInfo(
                     name=col_data.get("name", ""),
                     type=col_data.get("type", ""),
+                    code=col_data.get("code") or col_data.get("name", ""),
                     nullable=col_data.get("nullable", True),
                     default=col_data.get("default"),
                     comment=col_data.get("comment"),
@@ -251,18 +295,18 @@ class APIClient:
     async def get_table_documentation(self, table_name: str) -> Optional[str]:
         """获取表的文档说明"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/api/database/tables/{table_name}/docs",
-                    headers=self.headers,
-                    timeout=30.0,
-                )
+            client = self._client()
+            response = await client.get(
+                f"{self.base_url}/api/database/tables/{table_name}/docs",
+                headers=self.headers,
+                timeout=self.timeout,
+            )
 
-                if response.status_code == 200:
-                    data = response.json()
-                    return data.get("documentation", "")
-                else:
-                    return None
+            if response.status_code == 200:
+                data = response.json()
+                return data.get("documentation", "")
+            else:
+                return None
 
         except httpx.RequestError as e:
             print(f"API request error: {e}")
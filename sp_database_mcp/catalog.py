@@ -0,0 +1,349 @@
+"""表目录缓存模块 - 缓存各数据源的表清单和表结构信息"""
+
+import base64
+import binascii
+import bisect
+import os
+import time
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from .catalog_file import MappedCatalog
+from .compact import CompactTable, StringPool
+from .metrics import metrics
+from .models import ColumnFilter, TableInfo
+
+# 资源列表每页默认返回的条数
+DEFAULT_PAGE_SIZE = 500
+
+
+class InvalidCursorError(ValueError):
+    """分页游标无法解析"""
+
+
+def encode_cursor(last_key: str) -> str:
+    """将上一页最后一个条目编码为不透明的分页游标"""
+    return base64.urlsafe_b64encode(last_key.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> str:
+    """解析分页游标，返回上一页最后一个条目"""
+    try:
+        return base64.b64decode(cursor, altchars=b"-_", validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise InvalidCursorError(f"无效的分页游标: {cursor}") from e
+
+
+def paginate(
+    keys: Sequence[str], cursor: Optional[str], page_size: int
+) -> Tuple[Sequence[str], Optional[str]]:
+    """对已排序的条目做游标分页
+
+    游标记录的是上一页最后一个条目本身而不是偏移量，目录在两次请求之间发生
+    增删时也不会重复或跳过条目。返回 (当前页条目, 下一页游标)。
+    """
+    start = 0
+    if cursor:
+        start = bisect.bisect_right(keys, decode_cursor(cursor))
+
+    page = keys[start : start + page_size]
+    next_cursor = None
+    if page and start + page_size < len(keys):
+        next_cursor = encode_cursor(page[-1])
+    return page, next_cursor
+
+
+class TableCatalog:
+    """按数据源缓存排好序的表清单和表结构信息
+
+    表结构以 CompactTable 的形式保存，读取时才还原为 TableInfo。
+
+    表结构的渲染结果（markdown、JSON 等）与缓存条目一起保存，同一个版本的表结构
+    每种格式只渲染一次。
+
+    可以挂载一个只读映射的目录文件（MappedCatalog）作为底层：内存中没有的表
+    从映射文件中读取，不占用进程堆内存；映射文件中的内容视为始终有效，由写入
+    文件的一方负责刷新。被 invalidate 的表不再从映射文件读取，直到挂载新的文件。
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else float(os.getenv("CATALOG_TTL", "300"))
+        # 目录版本号，每次整体重新加载或从快照恢复时递增
+        self.version = 0
+        self._table_names: Dict[str, Tuple[float, List[str]]] = {}
+        self._table_infos: Dict[Tuple[str, str], Tuple[float, CompactTable]] = {}
+        # 所有表共享的字符串池，清空全部缓存时一起重置
+        self._pool = StringPool()
+        self._mapped: Optional[MappedCatalog] = None
+        self._mapped_skip_sources: Set[str] = set()
+        self._mapped_skip_tables: Set[Tuple[str, str]] = set()
+        # (数据源类型, 表名) -> (表结构版本, {格式: 渲染结果})；表结构版本是渲染时的
+        # 缓存条目（CompactTable）或映射文件对象，条目被替换后旧的渲染结果自然失效
+        self._rendered: Dict[Tuple[str, str], Tuple[object, Dict[str, str]]] = {}
+
+    def attach(self, mapped: Optional[MappedCatalog]):
+        """挂载（或以 None 卸载）映射的目录文件，目录版本号与文件一致
+
+        挂载新文件时丢弃内存中按需加载的表清单和表结构，否则它们（worker 中 ttl
+        为无穷大）会一直遮住新文件中的内容。旧的映射不显式关闭，仍在使用它的
+        请求结束后随对象回收。
+        """
+        self._mapped = mapped
+        self._mapped_skip_sources = set()
+        self._mapped_skip_tables = set()
+        if mapped is not None:
+            self._table_names = {}
+            self._table_infos = {}
+            self._pool = StringPool()
+            self._rendered = {}
+            self.version = mapped.version
+        else:
+            self._rendered = {
+                key: rendered
+                for key, rendered in self._rendered.items()
+                if not isinstance(rendered[0], MappedCatalog)
+            }
+
+    @property
+    def mapped(self) -> Optional[MappedCatalog]:
+        return self._mapped
+
+    def _mapped_for(self, source: str) -> Optional[MappedCatalog]:
+        if self._mapped is None or source in self._mapped_skip_sources:
+            return None
+        return self._mapped
+
+    def _is_fresh(self, loaded_at: float) -> bool:
+        return time.monotonic() - loaded_at < self.ttl
+
+    async def get_table_names(
+        self, source: str, loader: Callable[[], Awaitable[List[str]]]
+    ) -> List[str]:
+        """获取指定数据源的表清单（已排序），缓存过期时通过 loader 重新加载"""
+        cached = self._table_names.get(source)
+        if cached and self._is_fresh(cached[0]):
+            metrics.record_cache("table_names", True)
+            return cached[1]
+
+        mapped = self._mapped_for(source)
+        if mapped is not None:
+            metrics.record_cache("table_names", True)
+            return mapped.table_names(source)
+
+        metrics.record_cache("table_names", False)
+        table_names = sorted(set(await loader()))
+        self._table_names[source] = (time.monotonic(), table_names)
+        return table_names
+
+    async def search_table_names(
+        self,
+        source: str,
+        keyword: str,
+        loader: Callable[[], Awaitable[List[str]]],
+    ) -> List[str]:
+        """在缓存的表清单中按关键词（不区分大小写）查找表名"""
+        keyword = keyword.lower()
+        return [
+            table_name
+            for table_name in await self.get_table_names(source, loader)
+            if keyword in table_name.lower()
+        ]
+
+    async def get_table_info(
+        self,
+        source: str,
+        table_name: str,
+        loader: Callable[[str], Awaitable[Optional[TableInfo]]],
+    ) -> Optional[TableInfo]:
+        """获取表结构信息，未缓存或已过期时通过 loader 加载（不存在的表不缓存）"""
+        cached = self._table_infos.get((source, table_name))
+        if cached and self._is_fresh(cached[0]):
+            metrics.record_cache("table_info", True)
+            return cached[1].to_table_info()
+
+        mapped = self._mapped_for(source)
+        if mapped is not None and (source, table_name) not in self._mapped_skip_tables:
+            table_info = mapped.get_table_info(source, table_name)
+            if table_info is not None:
+                metrics.record_cache("table_info", True)
+                return table_info
+
+        metrics.record_cache("table_info", False)
+        table_info = await loader(table_name)
+        if table_info is not None:
+            self._table_infos[(source, table_name)] = (
+                time.monotonic(),
+                CompactTable.from_table_info(table_info, self._pool),
+            )
+        return table_info
+
+    async def get_table_slice(
+        self,
+        source: str,
+        table_name: str,
+        loader: Callable[[str], Awaitable[Optional[TableInfo]]],
+        start: int = 0,
+        stop: Optional[int] = None,
+    ) -> Optional[Tuple[TableInfo, int]]:
+        """获取只包含第 start 到 stop 个字段的表结构和字段总数，表不存在时返回 None
+
+        已缓存的表只还原请求的这一段字段，宽表分页时不必每页还原全部字段。
+        """
+        key = (source, table_name)
+        cached = self._table_infos.get(key)
+        if cached and self._is_fresh(cached[0]):
+            metrics.record_cache("table_info", True)
+            return cached[1].to_table_info(start, stop), len(cached[1])
+
+        mapped = self._mapped_for(source)
+        if mapped is not None and key not in self._mapped_skip_tables:
+            result = mapped.get_table_slice(source, table_name, start, stop)
+            if result is not None:
+                metrics.record_cache("table_info", True)
+                return result
+
+        table_info = await self.get_table_info(source, table_name, loader)
+        if table_info is None:
+            return None
+        columns = table_info.columns
+        page = table_info.model_copy(update={"columns": columns[start:stop]})
+        return page, len(columns)
+
+    async def get_filtered_table_info(
+        self,
+        source: str,
+        table_name: str,
+        column_filter: ColumnFilter,
+        loader: Callable[[str, ColumnFilter], Awaitable[Optional[TableInfo]]],
+    ) -> Optional[TableInfo]:
+        """获取只包含满足筛选条件字段的表结构，表不存在时返回 None
+
+        已缓存的表直接在紧凑存储（或映射文件）中筛选，只还原满足条件的字段；
+        未缓存时由 loader 在查询中筛选，只包含部分字段的结果不写入缓存。
+        """
+        key = (source, table_name)
+        cached = self._table_infos.get(key)
+        if cached and self._is_fresh(cached[0]):
+            metrics.record_cache("table_info", True)
+            return cached[1].filtered(column_filter)
+
+        mapped = self._mapped_for(source)
+        if mapped is not None and key not in self._mapped_skip_tables:
+            table_info = mapped.get_filtered_table_info(
+                source, table_name, column_filter
+            )
+            if table_info is not None:
+                metrics.record_cache("table_info", True)
+                return table_info
+
+        metrics.record_cache("table_info", False)
+        return await loader(table_name, column_filter)
+
+    def _schema_version(self, source: str, table_name: str) -> Optional[object]:
+        """当前可用的缓存条目（表结构版本），没有时返回 None"""
+        key = (source, table_name)
+        cached = self._table_infos.get(key)
+        if cached and self._is_fresh(cached[0]):
+            return cached[1]
+
+        mapped = self._mapped_for(source)
+        if (
+            mapped is not None
+            and key not in self._mapped_skip_tables
+            and mapped.find(source, table_name) is not None
+        ):
+            return mapped
+        return None
+
+    async def render(
+        self,
+        source: str,
+        table_name: str,
+        fmt: str,
+        loader: Callable[[str], Awaitable[Optional[TableInfo]]],
+        renderer: Callable[[TableInfo], str],
+    ) -> Optional[str]:
+        """获取表结构按 fmt 格式渲染的文本，表不存在时返回 None
+
+        renderer 的输出只能由表结构和 fmt 决定；缓存命中时直接返回之前的渲染结果，
+        不再还原 TableInfo。
+        """
+        key = (source, table_name)
+        version = self._schema_version(source, table_name)
+        rendered = self._rendered.get(key)
+        if version is not None and rendered and rendered[0] is version:
+            text = rendered[1].get(fmt)
+            if text is not None:
+                metrics.record_cache("rendered", True)
+                return text
+
+        metrics.record_cache("rendered", False)
+        table_info = await self.get_table_info(source, table_name, loader)
+        if table_info is None:
+            return None
+
+        text = renderer(table_info)
+        version = self._schema_version(source, table_name)
+        if version is not None:
+            rendered = self._rendered.get(key)
+            if not rendered or rendered[0] is not version:
+                rendered = self._rendered[key] = (version, {})
+            rendered[1][fmt] = text
+        return text
+
+    async def preload(
+        self,
+        source: str,
+        names_loader: Callable[[], Awaitable[List[str]]],
+        info_loader: Callable[[str], Awaitable[Optional[TableInfo]]],
+    ) -> int:
+        """整体加载一个数据源的表清单和全部表结构，返回加载的表数量"""
+        self.invalidate(source)
+        loaded = 0
+        for table_name in await self.get_table_names(source, names_loader):
+            self._table_infos.pop((source, table_name), None)
+            if await self.get_table_info(source, table_name, info_loader):
+                loaded += 1
+        self.version += 1
+        return loaded
+
+    def invalidate(self, source: Optional[str] = None, table_name: Optional[str] = None):
+        """使缓存失效
+
+        指定表名时只失效该表的结构信息；只指定数据源时失效该数据源的全部缓存；
+        都不指定时清空全部缓存。
+        """
+        if table_name is not None:
+            self._table_infos.pop((source, table_name), None)
+            self._rendered.pop((source, table_name), None)
+            self._mapped_skip_tables.add((source, table_name))
+            return
+
+        if source is None:
+            self._table_names.clear()
+            self._table_infos.clear()
+            self._rendered.clear()
+            self._pool = StringPool()
+            self.attach(None)
+            return
+
+        self._table_names.pop(source, None)
+        self._mapped_skip_sources.add(source)
+        for key in [key for key in self._table_infos if key[0] == source]:
+            del self._table_infos[key]
+        for key in [key for key in self._rendered if key[0] == source]:
+            del self._rendered[key]
+
+    def tables(self) -> Iterator[Tuple[str, TableInfo]]:
+        """内存中缓存的全部表结构 (数据源类型, TableInfo)，用于写入目录文件"""
+        for (source, _), (_, table) in self._table_infos.items():
+            yield source, table.to_table_info()
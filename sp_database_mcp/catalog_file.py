@@ -0,0 +1,342 @@
+"""二进制表目录文件模块 - 多个进程以只读 mmap 共享同一份表目录
+
+文件格式（小端序）：
+
+- 文件头：魔数、格式版本、目录版本号、各段的条目数和起始位置
+- 字符串表：(字符串数 + 1) 个 u32 偏移量，后接所有字符串的 UTF-8 字节；
+  编号 0 保留表示 None
+- 表索引：按 (数据源类型, 表名) 的 UTF-8 字节序排列的定长记录，可二分查找
+- 字段记录：定长记录，同一个表的字段连续存放
+
+进程打开文件后只映射内存，不把内容读入堆；查找表时只比较索引中的表名，
+表结构在真正需要时才解码为 TableInfo。同一主机上的多个进程映射同一个文件时
+共享操作系统页缓存中的一份物理内存。
+"""
+
+import json
+import mmap
+import os
+import struct
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .compact import (
+    FLAG_FOREIGN_KEY,
+    FLAG_NULLABLE,
+    FLAG_PRIMARY_KEY,
+    FLAG_SYSTEM,
+    NO_LENGTH,
+    column_flags,
+)
+from .models import (
+    ColumnFilter,
+    ColumnInfo,
+    TableInfo,
+    kept_foreign_keys,
+    trusted_column,
+    trusted_table,
+)
+
+MAGIC = b"SPCATLG\0"
+FORMAT_VERSION = 1
+
+# 魔数, 格式版本, 目录版本号, 字符串数, 表数, 字段数, 各段起始位置
+_HEADER = struct.Struct("<8sIQIIIQQQQ4x")
+# 数据源类型, 表名, 表说明, 索引和外键(JSON), 第一个字段的序号, 字段数
+_TABLE_RECORD = struct.Struct("<6I")
+# name, type, code, default, comment, modifier, max_length, 标志位
+_COLUMN_RECORD = struct.Struct("<6IqB3x")
+_OFFSET = struct.Struct("<I")
+# 字段标志位和 NO_LENGTH 与紧凑存储共用（compact），属于文件格式的一部分
+
+
+class CatalogFileError(ValueError):
+    """目录文件格式不正确"""
+
+
+class _StringTableBuilder:
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.data: List[bytes] = [b""]
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.data)
+            self.ids[value] = string_id
+            self.data.append(value.encode("utf-8"))
+        return string_id
+
+
+def write_catalog_file(
+    path: str,
+    tables: Iterable[Tuple[str, TableInfo]],
+    version: int = 0,
+):
+    """将 (数据源类型, TableInfo) 写入目录文件
+
+    先写临时文件再替换，已经映射旧文件的进程不受影响，可以在发现文件被替换后
+    重新映射。
+    """
+    strings = _StringTableBuilder()
+    table_records = []
+    column_records = []
+
+    # 按 UTF-8 字节序排列，与读取时二分查找的比较方式一致
+    for source, table_info in sorted(
+        tables,
+        key=lambda item: (item[0].encode("utf-8"), item[1].name.encode("utf-8")),
+    ):
+        extra = json.dumps(
+            {"indexes": table_info.indexes, "foreign_keys": table_info.foreign_keys},
+            ensure_ascii=False,
+            default=str,
+        )
+        table_records.append(
+            _TABLE_RECORD.pack(
+                strings.add(source),
+                strings.add(table_info.name),
+                strings.add(table_info.comment),
+                strings.add(extra),
+                len(column_records),
+                len(table_info.columns),
+            )
+        )
+        for column in table_info.columns:
+            column_records.append(
+                _COLUMN_RECORD.pack(
+                    strings.add(column.name),
+                    strings.add(column.type),
+                    strings.add(column.code),
+                    strings.add(column.default),
+                    strings.add(column.comment),
+                    strings.add(column.modifier),
+                    NO_LENGTH if column.max_length is None else column.max_length,
+                    column_flags(column),
+                )
+            )
+
+    offsets = [0]
+    for data in strings.data:
+        offsets.append(offsets[-1] + len(data))
+
+    offsets_pos = _HEADER.size
+    data_pos = offsets_pos + _OFFSET.size * len(offsets)
+    tables_pos = data_pos + offsets[-1]
+    columns_pos = tables_pos + _TABLE_RECORD.size * len(table_records)
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        version,
+        len(strings.data),
+        len(table_records),
+        len(column_records),
+        offsets_pos,
+        data_pos,
+        tables_pos,
+        columns_pos,
+    )
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        f.writelines(strings.data)
+        f.writelines(table_records)
+        f.writelines(column_records)
+    os.replace(tmp_path, path)
+
+
+class MappedCatalog:
+    """只读映射的目录文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mm) < _HEADER.size:
+            raise CatalogFileError(f"目录文件不完整: {path}")
+        (
+            magic,
+            format_version,
+            self.version,
+            self._string_count,
+            self._table_count,
+            self._column_count,
+            self._offsets_pos,
+            self._data_pos,
+            self._tables_pos,
+            self._columns_pos,
+        ) = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise CatalogFileError(f"不支持的目录文件格式: {path}")
+        end = self._columns_pos + _COLUMN_RECORD.size * self._column_count
+        if end > len(self._mm):
+            raise CatalogFileError(f"目录文件不完整: {path}")
+
+        # 各数据源类型在表索引中的记录范围和解码后的表名清单，首次使用时计算
+        self._ranges: Dict[str, Tuple[int, int]] = {}
+        self._table_names: Dict[str, List[str]] = {}
+
+    def _string_bytes(self, string_id: int) -> bytes:
+        start, end = struct.unpack_from(
+            "<2I", self._mm, self._offsets_pos + _OFFSET.size * string_id
+        )
+        return self._mm[self._data_pos + start : self._data_pos + end]
+
+    def _string(self, string_id: int) -> Optional[str]:
+        if string_id == 0:
+            return None
+        return self._string_bytes(string_id).decode("utf-8")
+
+    def _table_record(self, index: int) -> Tuple[int, ...]:
+        return _TABLE_RECORD.unpack_from(
+            self._mm, self._tables_pos + _TABLE_RECORD.size * index
+        )
+
+    def _key(self, index: int) -> Tuple[bytes, bytes]:
+        source_id, name_id = self._table_record(index)[:2]
+        return self._string_bytes(source_id), self._string_bytes(name_id)
+
+    def _lower_bound(self, key: Tuple[bytes, ...]) -> int:
+        low, high = 0, self._table_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _source_range(self, source: str) -> Tuple[int, int]:
+        cached = self._ranges.get(source)
+        if cached is None:
+            source_bytes = source.encode("utf-8")
+            start = self._lower_bound((source_bytes,))
+            # UTF-8 编码中不会出现 0xff 字节，作为该数据源类型的上界
+            end = self._lower_bound((source_bytes, b"\xff"))
+            cached = self._ranges[source] = (start, end)
+        return cached
+
+    def find(self, source: str, table_name: str) -> Optional[int]:
+        """二分查找表在索引中的位置，不存在时返回 None"""
+        key = (source.encode("utf-8"), table_name.encode("utf-8"))
+        index = self._lower_bound(key)
+        if index < self._table_count and self._key(index) == key:
+            return index
+        return None
+
+    def table_names(self, source: str) -> List[str]:
+        """指定数据源类型的表名（已排序）"""
+        names = self._table_names.get(source)
+        if names is None:
+            start, end = self._source_range(source)
+            names = self._table_names[source] = [
+                self._string(self._table_record(i)[1]) for i in range(start, end)
+            ]
+        return names
+
+    def sources(self) -> List[str]:
+        """文件中包含的数据源类型"""
+        sources = []
+        index = 0
+        while index < self._table_count:
+            source = self._string(self._table_record(index)[0])
+            sources.append(source)
+            index = self._source_range(source)[1]
+        return sources
+
+    def _column(self, index: int) -> ColumnInfo:
+        (
+            name_id,
+            type_id,
+            code_id,
+            default_id,
+            comment_id,
+            modifier_id,
+            max_length,
+            flags,
+        ) = _COLUMN_RECORD.unpack_from(
+            self._mm, self._columns_pos + _COLUMN_RECORD.size * index
+        )
+        return trusted_column(
+            {
+                "name": self._string(name_id),
+                "type": self._string(type_id),
+                "code": self._string(code_id),
+                "nullable": bool(flags & FLAG_NULLABLE),
+                "default": self._string(default_id),
+                "comment": self._string(comment_id),
+                "is_primary_key": bool(flags & FLAG_PRIMARY_KEY),
+                "is_foreign_key": bool(flags & FLAG_FOREIGN_KEY),
+                "max_length": None if max_length == NO_LENGTH else max_length,
+                "modifier": self._string(modifier_id),
+                "is_system": bool(flags & FLAG_SYSTEM),
+            }
+        )
+
+    def get_table_info(self, source: str, table_name: str) -> Optional[TableInfo]:
+        """解码表结构，表不存在时返回 None"""
+        result = self.get_table_slice(source, table_name)
+        return result[0] if result is not None else None
+
+    def get_table_slice(
+        self, source: str, table_name: str, start: int = 0, stop: Optional[int] = None
+    ) -> Optional[Tuple[TableInfo, int]]:
+        """只解码第 start 到 stop 个字段，返回 (TableInfo, 字段总数)，表不存在时返回 None"""
+        index = self.find(source, table_name)
+        if index is None:
+            return None
+
+        column_count = self._table_record(index)[5]
+        positions = range(*slice(start, stop).indices(column_count))
+        return self._decode_table(index, positions), column_count
+
+    def get_filtered_table_info(
+        self, source: str, table_name: str, column_filter: ColumnFilter
+    ) -> Optional[TableInfo]:
+        """只解码满足筛选条件的字段，表不存在时返回 None"""
+        index = self.find(source, table_name)
+        if index is None:
+            return None
+
+        first_column, column_count = self._table_record(index)[4:]
+        positions, removed = [], set()
+        for i in range(column_count):
+            name_id, _, code_id, *_, flags = _COLUMN_RECORD.unpack_from(
+                self._mm, self._columns_pos + _COLUMN_RECORD.size * (first_column + i)
+            )
+            code, name = self._string(code_id), self._string(name_id)
+            if column_filter.matches(code, name, bool(flags & FLAG_SYSTEM)):
+                positions.append(i)
+            else:
+                removed.update((code, name))
+        return self._decode_table(index, positions, removed)
+
+    def _decode_table(
+        self, index: int, positions: Iterable[int], removed_columns: Optional[Set[str]] = None
+    ) -> TableInfo:
+        """解码第 index 个表，只包含 positions 指定的字段（表内序号）
+
+        removed_columns 为被筛选掉的字段的编码和名称，它们的外键不会返回。
+        """
+        _, name_id, comment_id, extra_id, first_column, _ = self._table_record(index)
+        extra: Dict[str, Any] = json.loads(self._string(extra_id))
+        return trusted_table(
+            name=self._string(name_id),
+            comment=self._string(comment_id),
+            columns=[self._column(first_column + i) for i in positions],
+            indexes=extra["indexes"],
+            foreign_keys=kept_foreign_keys(
+                extra["foreign_keys"], removed_columns or set()
+            ),
+        )
+
+    def __len__(self) -> int:
+        """表数量"""
+        return self._table_count
+
+    def close(self):
+        self._mm.close()
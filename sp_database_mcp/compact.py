@@ -0,0 +1,198 @@
+"""紧凑表结构存储模块 - 以列式数组和字符串池保存表结构，按需还原为 TableInfo
+
+大量 TableInfo/ColumnInfo 对象常驻内存时，每个字段都是一个带 __dict__ 的
+pydantic 实例，而字段类型（如 varchar(100)）、编码（如 id、created_at）、修改人
+等字符串大量重复。紧凑存储中：
+
+- 同一目录的所有表共享一个字符串池，重复的字符串只保存一份，字段中只记录
+  4 字节的字符串编号
+- 每个字符串属性、max_length 和布尔标志各自保存为一个 array（列式存储）
+- 只有被读取时才还原为 TableInfo/ColumnInfo
+"""
+
+import sys
+from array import array
+from typing import Any, Dict, List, Optional
+
+from .models import (
+    ColumnFilter,
+    ColumnInfo,
+    TableInfo,
+    kept_foreign_keys,
+    trusted_column,
+    trusted_table,
+)
+
+# 按字符串池编号保存的 ColumnInfo 属性
+_STRING_FIELDS = ("name", "type", "code", "default", "comment", "modifier")
+
+# 按位保存在一个字节中的布尔属性，也用于二进制目录文件（catalog_file），修改时
+# 需要提升目录文件的 FORMAT_VERSION
+FLAG_NULLABLE = 1
+FLAG_PRIMARY_KEY = 2
+FLAG_FOREIGN_KEY = 4
+FLAG_SYSTEM = 8
+
+# max_length 为 None 时保存的值
+NO_LENGTH = -1
+
+
+def column_flags(column: ColumnInfo) -> int:
+    """字段布尔属性的标志位"""
+    return (
+        (FLAG_NULLABLE if column.nullable else 0)
+        | (FLAG_PRIMARY_KEY if column.is_primary_key else 0)
+        | (FLAG_FOREIGN_KEY if column.is_foreign_key else 0)
+        | (FLAG_SYSTEM if column.is_system else 0)
+    )
+
+
+class StringPool:
+    """字符串池：相同的字符串只保存一份，编号 0 表示 None"""
+
+    __slots__ = ("_strings", "_ids")
+
+    def __init__(self):
+        self._strings: List[Optional[str]] = [None]
+        self._ids: Dict[str, int] = {}
+
+    def add(self, value: Optional[str]) -> int:
+        """返回字符串的编号，新字符串会被加入池中"""
+        if value is None:
+            return 0
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            # str 子类（例如 SQLAlchemy 的 quoted_name）先转换为 str 才能驻留
+            value = sys.intern(str(value))
+            self._strings.append(value)
+            self._ids[value] = string_id
+        return string_id
+
+    def get(self, string_id: int) -> Optional[str]:
+        return self._strings[string_id]
+
+    def __len__(self) -> int:
+        return len(self._strings) - 1
+
+
+class CompactTable:
+    """单个表的紧凑结构，字符串保存在共享的 StringPool 中"""
+
+    __slots__ = (
+        "name",
+        "comment",
+        "indexes",
+        "foreign_keys",
+        "pool",
+        "_strings",
+        "_max_lengths",
+        "_flags",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        comment: Optional[str],
+        indexes: List[Dict[str, Any]],
+        foreign_keys: List[Dict[str, Any]],
+        pool: StringPool,
+        strings: Dict[str, array],
+        max_lengths: array,
+        flags: array,
+    ):
+        self.name = name
+        self.comment = comment
+        self.indexes = indexes
+        self.foreign_keys = foreign_keys
+        self.pool = pool
+        self._strings = strings
+        self._max_lengths = max_lengths
+        self._flags = flags
+
+    @classmethod
+    def from_table_info(cls, table_info: TableInfo, pool: StringPool) -> "CompactTable":
+        """将 TableInfo 转换为紧凑结构，字符串加入 pool"""
+        columns = table_info.columns
+        strings = {
+            field: array("I", (pool.add(getattr(column, field)) for column in columns))
+            for field in _STRING_FIELDS
+        }
+        max_lengths = array(
+            "q",
+            (
+                NO_LENGTH if column.max_length is None else column.max_length
+                for column in columns
+            ),
+        )
+        flags = array("B", (column_flags(column) for column in columns))
+        return cls(
+            table_info.name,
+            table_info.comment,
+            table_info.indexes,
+            table_info.foreign_keys,
+            pool,
+            strings,
+            max_lengths,
+            flags,
+        )
+
+    def __len__(self) -> int:
+        """字段数"""
+        return len(self._flags)
+
+    def column(self, index: int) -> ColumnInfo:
+        """还原第 index 个字段"""
+        get = self.pool.get
+        strings = self._strings
+        flags = self._flags[index]
+        max_length = self._max_lengths[index]
+        # 按 ColumnInfo 的字段声明顺序构建，序列化结果与校验构建的模型一致
+        return trusted_column(
+            {
+                "name": get(strings["name"][index]),
+                "type": get(strings["type"][index]),
+                "code": get(strings["code"][index]),
+                "nullable": bool(flags & FLAG_NULLABLE),
+                "default": get(strings["default"][index]),
+                "comment": get(strings["comment"][index]),
+                "is_primary_key": bool(flags & FLAG_PRIMARY_KEY),
+                "is_foreign_key": bool(flags & FLAG_FOREIGN_KEY),
+                "max_length": None if max_length == NO_LENGTH else max_length,
+                "modifier": get(strings["modifier"][index]),
+                "is_system": bool(flags & FLAG_SYSTEM),
+            }
+        )
+
+    def to_table_info(self, start: int = 0, stop: Optional[int] = None) -> TableInfo:
+        """还原为 TableInfo（每次调用返回新的对象），只包含第 start 到 stop 个字段"""
+        return trusted_table(
+            name=self.name,
+            comment=self.comment,
+            columns=[
+                self.column(i) for i in range(*slice(start, stop).indices(len(self)))
+            ],
+            indexes=self.indexes,
+            foreign_keys=self.foreign_keys,
+        )
+
+    def filtered(self, column_filter: ColumnFilter) -> TableInfo:
+        """按筛选条件还原 TableInfo，只还原满足条件的字段及其外键"""
+        get = self.pool.get
+        codes = self._strings["code"]
+        names = self._strings["name"]
+        flags = self._flags
+        columns, removed = [], set()
+        for i in range(len(self)):
+            code, name = get(codes[i]), get(names[i])
+            if column_filter.matches(code, name, bool(flags[i] & FLAG_SYSTEM)):
+                columns.append(self.column(i))
+            else:
+                removed.update((code, name))
+        return trusted_table(
+            name=self.name,
+            comment=self.comment,
+            columns=columns,
+            indexes=self.indexes,
+            foreign_keys=kept_foreign_keys(self.foreign_keys, removed),
+        )
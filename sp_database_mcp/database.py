@@ -1,146 +1,416 @@
 """数据库连接和查询模块"""
 
 import os
-from typing import List, Optional
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
 
-from sqlalchemy import MetaData, Table, create_engine, text
+from sqlalchemy import MetaData, Table, bindparam, create_engine, inspect, text
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import SQLAlchemyError
 
-from .models import ColumnInfo, DatabaseSchema, TableInfo
+from .metrics import metrics
+from .models import (
+    ColumnFilter,
+    DatabaseSchema,
+    TableInfo,
+    trusted_column,
+    trusted_table,
+)
+from .system_fields import SystemFieldClassifier, default_classifier
+
+# 所有 engine 执行的 SQL 都计入运行统计
+metrics.instrument_engine(Engine)
+
+# 低代码系统 schema 表中必须存在的字段，缺失任何一个都视为不支持低代码查询
+_REQUIRED_ENTITY_COLUMNS = ("id", "name", "code")
+_REQUIRED_ATTRIBUTE_COLUMNS = ("entity_id", "name", "code")
+
+# 查询中用到的可选字段，不存在时以 NULL 代替
+_OPTIONAL_ENTITY_COLUMNS = ("description",)
+_OPTIONAL_ATTRIBUTE_COLUMNS = (
+    "column_name",
+    "data_type",
+    "data_length",
+    "primary_key",
+    "required",
+    "default_value",
+    "description",
+    "ref_entity_id",
+    "ref_type",
+    "updated_by",
+    "is_system",
+)
+
+
+def _select_list(available: FrozenSet[str], columns: tuple) -> str:
+    """生成 SELECT 字段列表，不存在的字段以 NULL 占位"""
+    return ", ".join(
+        column if column in available else f"NULL AS {column}" for column in columns
+    )
+
+
+def _optional_str(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _schema_column_fields(
+    attr: Any, system_fields: Optional[SystemFieldClassifier] = None
+) -> Dict[str, Any]:
+    """将 da_entity_attribute 的一行转换为 ColumnInfo 字段
+
+    值被显式转换为模型声明的类型，结果可直接交给 trusted_column 跳过校验构建。
+    is_system 为空（例如没有该字段）时按 system_fields 的规则识别。
+    """
+    description = attr["description"]
+    data_length = attr["data_length"]
+    is_system = attr["is_system"]
+    if is_system is None and system_fields is not None:
+        is_system = system_fields.is_system(str(attr["column_name"] or attr["code"]))
+    return {
+        "name": str(attr["name"]),
+        "type": str(attr["data_type"] or "string"),
+        "code": str(attr["code"]),
+        "nullable": not bool(attr["required"]),  # required 字段取反
+        "default": _optional_str(attr["default_value"]),
+        # name (code) - description
+        "comment": f"{attr['name']} ({attr['code']})"
+        + (f" - {description}" if description else ""),
+        "is_primary_key": bool(attr["primary_key"]),
+        "is_foreign_key": False,
+        "max_length": int(data_length) if data_length else None,
+        "modifier": _optional_str(attr["updated_by"]),
+        "is_system": bool(is_system),
+    }
 
 
 class DatabaseClient:
     """数据库客户端"""
 
-    def __init__(self, database_url: Optional[str] = None):
+    def __init__(
+        self,
+        database_url: Optional[str] = None,
+        system_fields: Optional[SystemFieldClassifier] = None,
+        **engine_options: Any,
+    ):
         self.database_url = database_url or os.getenv("DATABASE_URL")
         if not self.database_url:
             raise ValueError("DATABASE_URL is required")
 
+        # 没有 is_system 信息的字段按字段名规则识别系统字段
+        self.system_fields = system_fields or default_classifier()
+
+        # 透传给 create_engine 的参数，例如 pool_size、max_overflow
+        self.engine_options = engine_options
         self.engine: Optional[Engine] = None
+        # 低代码 schema 表的探测结果，None 表示当前数据库不支持低代码查询
+        self.entity_columns: Optional[FrozenSet[str]] = None
+        self.attribute_columns: Optional[FrozenSet[str]] = None
+        self._schema_probed = False
+        self._reset_schema_queries()
         self._connect()
 
     def _connect(self):
         """建立数据库连接"""
         try:
-            self.engine = create_engine(self.database_url)
+            self.engine = create_engine(self.database_url, **self.engine_options)
             # 测试连接
             with self.engine.connect() as conn:
                 conn.execute(text("SELECT 1"))
         except SQLAlchemyError as e:
             raise ConnectionError(f"Failed to connect to database: {e}")
 
-    def get_table_info(self, table_name: str) -> Optional[TableInfo]:
-        """获取指定表的结构信息"""
-        if not self.engine:
+        self._probe_schema_tables()
+
+    def _probe_schema_tables(self):
+        """探测低代码系统的 schema 表是否存在以及包含哪些字段
+
+        只在建立连接和 refresh 时执行一次，之后 get_table_info 直接按探测结果
+        选择查询方式，非低代码数据库不再每次都执行一次注定失败的查询。探测本身
+        出错（例如数据库暂时不可用）时保留之前的结果并标记为未探测，下次使用时
+        重新探测，不会因为一次失败在进程的整个生命周期内按非低代码数据库处理。
+        """
+        try:
+            inspector = inspect(self.engine)
+            table_names = set(inspector.get_table_names())
+            if {"da_logic_entity", "da_entity_attribute"} <= table_names:
+                entity_columns = frozenset(
+                    column["name"]
+                    for column in inspector.get_columns("da_logic_entity")
+                )
+                attribute_columns = frozenset(
+                    column["name"]
+                    for column in inspector.get_columns("da_entity_attribute")
+                )
+            else:
+                entity_columns = attribute_columns = frozenset()
+        except SQLAlchemyError as e:
+            print(f"Error probing low-code schema tables: {e}")
+            self._schema_probed = False
+            return
+        self._schema_probed = True
+
+        if not set(_REQUIRED_ENTITY_COLUMNS) <= entity_columns or not set(
+            _REQUIRED_ATTRIBUTE_COLUMNS
+        ) <= attribute_columns:
+            self._reset_schema_queries()
+            return
+
+        self._build_schema_queries(entity_columns, attribute_columns)
+        # 最后设置探测结果，refresh 期间并发的查询不会看到只构建了一半的语句
+        self.entity_columns = entity_columns
+        self.attribute_columns = attribute_columns
+
+    def _reset_schema_queries(self):
+        self.entity_columns = None
+        self.attribute_columns = None
+        self._entity_query = None
+        self._attribute_select = None
+        self._attribute_order = None
+        self._attribute_query = None
+        self._ref_query = None
+        self._entity_page_queries = None
+        self._entity_codes_query = None
+        self._batch_attribute_query = None
+        self._watermark_query = None
+
+    def _build_schema_queries(
+        self, entity_columns: FrozenSet[str], attribute_columns: FrozenSet[str]
+    ):
+        """按探测到的 schema 表字段构建查询语句"""
+        entity_select = _select_list(
+            entity_columns, _REQUIRED_ENTITY_COLUMNS + _OPTIONAL_ENTITY_COLUMNS
+        )
+        self._entity_query = text(f"""
+            SELECT {entity_select}
+            FROM da_logic_entity
+            WHERE code = :table_code
+        """)
+        attribute_select = _select_list(
+            attribute_columns, ("name", "code") + _OPTIONAL_ATTRIBUTE_COLUMNS
+        )
+        attribute_key = "id" if "id" in attribute_columns else "code"
+        self._attribute_select = f"""
+            SELECT {attribute_select}
+            FROM da_entity_attribute
+            WHERE entity_id = :entity_id
+        """
+        self._attribute_order = f"ORDER BY {attribute_key}"
+        self._attribute_query = text(
+            f"{self._attribute_select} {self._attribute_order}"
+        )
+        ref_table_column = "table_name" if "table_name" in entity_columns else "code"
+        self._ref_query = text(f"""
+            SELECT id, {ref_table_column} FROM da_logic_entity
+            WHERE id IN :ref_entity_ids
+        """).bindparams(bindparam("ref_entity_ids", expanding=True))
+
+        # 导出时按 id 键集分页读取实体（第一页和后续页），每批实体的字段一次读取
+        self._entity_page_queries = tuple(
+            text(f"""
+                SELECT {entity_select}
+                FROM da_logic_entity
+                {condition}
+                ORDER BY id
+                LIMIT :batch_size
+            """)
+            for condition in ("", "WHERE id > :after_id")
+        )
+        self._entity_codes_query = text(
+            "SELECT code FROM da_logic_entity WHERE code IN :codes"
+        ).bindparams(bindparam("codes", expanding=True))
+        self._batch_attribute_query = text(f"""
+            SELECT entity_id, {attribute_select}
+            FROM da_entity_attribute
+            WHERE entity_id IN :entity_ids
+            ORDER BY entity_id, {attribute_key}
+        """).bindparams(bindparam("entity_ids", expanding=True))
+        if "updated_at" in entity_columns and "updated_at" in attribute_columns:
+            self._watermark_query = text("""
+                SELECT e.code, e.updated_at, MAX(a.updated_at), COUNT(a.entity_id)
+                FROM da_logic_entity e
+                LEFT JOIN da_entity_attribute a ON a.entity_id = e.id
+                GROUP BY e.id, e.code, e.updated_at
+            """)
+        else:
+            self._watermark_query = None
+
+    @property
+    def has_schema_tables(self) -> bool:
+        """当前数据库是否包含低代码系统的 schema 表，上次探测出错时重新探测"""
+        if not self._schema_probed and self.engine:
+            self._probe_schema_tables()
+        return self.entity_columns is not None
+
+    def refresh(self):
+        """重新探测数据库能力（例如低代码 schema 表在运行期间被创建）
+
+        数据源的表清单缓存过期重新加载时调用。
+        """
+        if self.engine:
+            self._probe_schema_tables()
+
+    def get_table_watermarks(self) -> Optional[Dict[str, Tuple[Any, ...]]]:
+        """一次查询获取所有低代码实体的变更水位
+
+        返回 {实体编码: (实体 updated_at, 字段最大 updated_at, 字段数)}，
+        数据库不支持（无低代码 schema 表或缺少 updated_at 字段）时返回 None。
+        """
+        if not self.engine or self._watermark_query is None:
+            return None
+
+        try:
+            with self.engine.connect() as conn:
+                rows = conn.execute(self._watermark_query).fetchall()
+            return {row[0]: tuple(row[1:]) for row in rows}
+        except SQLAlchemyError as e:
+            print(f"Error getting table watermarks: {e}")
             return None
 
-        # 首先尝试通过低代码系统的 schema 表获取信息
-        schema_info = self._get_table_info_from_schema(table_name)
-        if schema_info:
-            return schema_info
+    def get_table_info(
+        self, table_name: str, column_filter: Optional[ColumnFilter] = None
+    ) -> Optional[TableInfo]:
+        """获取指定表的结构信息，指定 column_filter 时只返回满足条件的字段"""
+        if not self.engine:
+            return None
 
-        # 如果低代码系统查询失败，回退到传统的数据库元数据查询
-        return self._get_table_info_from_metadata(table_name)
+        # 低代码数据库优先通过 schema 表获取信息
+        if self.has_schema_tables:
+            schema_info = self._get_table_info_from_schema(table_name, column_filter)
+            if schema_info:
+                return schema_info
+
+        # 非低代码数据库或实体不存在时，使用传统的数据库元数据查询
+        table_info = self._get_table_info_from_metadata(table_name)
+        if table_info and column_filter:
+            return column_filter.apply(table_info)
+        return table_info
+
+    def _filtered_attribute_query(self, column_filter: ColumnFilter):
+        """把字段筛选条件加入字段查询的 WHERE 子句，返回 (查询, 参数)
+
+        数据库中无法表达的条件（例如通配符中的字符集合）留给查询结果上的筛选。
+        """
+        conditions = []
+        params: Dict[str, Any] = {}
+        if column_filter.exclude_system and "is_system" in self.attribute_columns:
+            conditions.append("(is_system IS NULL OR NOT is_system)")
+        if column_filter.columns is not None:
+            conditions.append("(LOWER(code) IN :codes OR name IN :names)")
+            params["codes"] = sorted({column.lower() for column in column_filter.columns})
+            params["names"] = sorted(set(column_filter.columns))
+        like_pattern = column_filter.like_pattern()
+        if like_pattern is not None:
+            conditions.append("LOWER(code) LIKE :code_pattern ESCAPE '!'")
+            params["code_pattern"] = like_pattern
+
+        query = text(
+            " AND ".join([self._attribute_select] + conditions)
+            + f" {self._attribute_order}"
+        )
+        if column_filter.columns is not None:
+            query = query.bindparams(
+                bindparam("codes", expanding=True), bindparam("names", expanding=True)
+            )
+        return query, params
 
-    def _get_table_info_from_schema(self, table_name: str) -> Optional[TableInfo]:
+    def _get_table_info_from_schema(
+        self, table_name: str, column_filter: Optional[ColumnFilter] = None
+    ) -> Optional[TableInfo]:
         """通过低代码系统的 schema 表获取表信息"""
         try:
             with self.engine.connect() as conn:
                 # 查询实体基本信息
-                entity_query = text("""
-                    SELECT id, name, code, table_name, data_type, table_type, 
-                           status, created_at, updated_at, owners, description
-                    FROM da_logic_entity 
-                    WHERE code = :table_code
-                """)
                 entity_result = conn.execute(
-                    entity_query, {"table_code": table_name}
+                    self._entity_query, {"table_code": table_name}
                 ).fetchone()
 
                 if not entity_result:
                     return None
 
-                entity_id = entity_result[0]
-                entity_name = entity_result[1]
-                entity_description = (
-                    entity_result[10] if len(entity_result) > 10 else None
-                )
+                entity = entity_result._mapping
+                entity_id = entity["id"]
 
-                # 查询字段信息
-                attr_query = text("""
-                    SELECT name, code, column_name, data_type, data_length, data_scale,
-                           primary_key, is_unique, required, default_value, description,
-                           ref_entity_id, ref_attr_id, ref_type, is_editable, status, 
-                           created_at, updated_at, created_by, updated_by, is_system
-                    FROM da_entity_attribute 
-                    WHERE entity_id = :entity_id
-                    ORDER BY id
-                """)
-                attr_results = conn.execute(
-                    attr_query, {"entity_id": entity_id}
-                ).fetchall()
-
-                columns = []
-                for attr in attr_results:
-                    # 解析数据类型
-                    data_type = attr[3] or "string"
-                    max_length = attr[4] if attr[4] else None
-
-                    column_info = ColumnInfo(
-                        name=attr[0],
-                        type=data_type,
-                        code=attr[1],
-                        modifier=attr[19],
-                        nullable=not bool(attr[8]),  # required 字段取反
-                        default=attr[9],  # default_value
-                        is_system=bool(attr[20]),
-                        comment=f"{attr[0]} ({attr[1]})"
-                        + (
-                            f" - {attr[10]}" if attr[10] else ""
-                        ),  # name (code) - description
-                        is_primary_key=bool(attr[6]),  # primary_key
-                        max_length=max_length,
+                # 查询字段信息，筛选条件尽量在查询中完成
+                attribute_query, params = self._attribute_query, {}
+                if column_filter:
+                    attribute_query, params = self._filtered_attribute_query(
+                        column_filter
                     )
-                    columns.append(column_info)
-
-                # 构建外键信息（基于 ref_entity_id 和 ref_type）
-                foreign_keys = []
-                for attr in attr_results:
-                    if (
-                        attr[11] and attr[13] == "foreign_key"
-                    ):  # ref_entity_id 和 ref_type
-                        # 查询引用的实体信息
-                        ref_query = text("""
-                            SELECT table_name FROM da_logic_entity WHERE id = :ref_entity_id
-                        """)
-                        ref_result = conn.execute(
-                            ref_query, {"ref_entity_id": attr[11]}
-                        ).fetchone()
-                        if ref_result:
-                            foreign_keys.append(
-                                {
-                                    "column": attr[2] or attr[1],
-                                    "referenced_table": ref_result[0],
-                                    "referenced_column": "id",  # 通常引用主键
-                                }
-                            )
-
-                return TableInfo(
-                    name=table_name,
-                    comment=f"{entity_name} - {entity_description}"
-                    if entity_description
-                    else entity_name,
-                    columns=columns,
-                    indexes=[],  # 低代码系统中索引信息不在这些表中
-                    foreign_keys=foreign_keys,
+                attr_results = [
+                    attr._mapping
+                    for attr in conn.execute(
+                        attribute_query, {"entity_id": entity_id, **params}
+                    ).fetchall()
+                ]
+                fields = [
+                    _schema_column_fields(attr, self.system_fields)
+                    for attr in attr_results
+                ]
+                if column_filter:
+                    selected = [
+                        column_filter.matches(
+                            field["code"], field["name"], field["is_system"]
+                        )
+                        for field in fields
+                    ]
+                    attr_results = [
+                        attr for attr, keep in zip(attr_results, selected) if keep
+                    ]
+                    fields = [field for field, keep in zip(fields, selected) if keep]
+
+                ref_tables = self._referenced_tables(conn, attr_results)
+                return self._schema_table_info(
+                    table_name, entity, attr_results, fields, ref_tables
                 )
 
         except SQLAlchemyError as e:
             print(f"Error getting table info from schema for {table_name}: {e}")
             return None
 
+    def _referenced_tables(self, conn, attrs: Iterable[Any]) -> Dict[Any, str]:
+        """一次查询字段引用的实体，返回 {实体 id: 表名}"""
+        ref_ids = {
+            attr["ref_entity_id"]
+            for attr in attrs
+            if attr["ref_entity_id"] and attr["ref_type"] == "foreign_key"
+        }
+        if not ref_ids:
+            return {}
+        rows = conn.execute(self._ref_query, {"ref_entity_ids": sorted(ref_ids)})
+        return {row[0]: row[1] for row in rows}
+
+    @staticmethod
+    def _schema_table_info(
+        table_name: str,
+        entity: Any,
+        attrs: List[Any],
+        fields: List[Dict[str, Any]],
+        ref_tables: Dict[Any, str],
+    ) -> TableInfo:
+        """由实体、字段行及其转换结果和引用的表名构建 TableInfo"""
+        # 构建外键信息（基于 ref_entity_id 和 ref_type）
+        foreign_keys = [
+            {
+                "column": attr["column_name"] or attr["code"],
+                "referenced_table": ref_tables[attr["ref_entity_id"]],
+                "referenced_column": "id",  # 通常引用主键
+            }
+            for attr in attrs
+            if attr["ref_type"] == "foreign_key"
+            and attr["ref_entity_id"] in ref_tables
+        ]
+
+        entity_name = entity["name"]
+        entity_description = entity["description"]
+        return trusted_table(
+            name=table_name,
+            comment=f"{entity_name} - {entity_description}"
+            if entity_description
+            else _optional_str(entity_name),
+            columns=[trusted_column(field) for field in fields],
+            indexes=[],  # 低代码系统中索引信息不在这些表中
+            foreign_keys=foreign_keys,
+        )
+
     def _get_table_info_from_metadata(self, table_name: str) -> Optional[TableInfo]:
         """通过数据库元数据获取表信息（传统方式）"""
         try:
@@ -149,14 +419,20 @@ class DatabaseClient:
 
             columns = []
             for column in table.columns:
-                column_info = ColumnInfo(
-                    name=column.name,
-                    type=str(column.type),
-                    nullable=column.nullable,
-                    default=str(column.default) if column.default else None,
-                    comment=column.comment,
-                    is_primary_key=column.primary_key,
-                    max_length=getattr(column.type, "length", None),
+                column_info = trusted_column(
+                    {
+                        "name": column.name,
+                        "type": str(column.type),
+                        "code": column.name,
+                        "nullable": bool(column.nullable),
+                        "default": str(column.default) if column.default else None,
+                        "comment": column.comment,
+                        "is_primary_key": bool(column.primary_key),
+                        "is_foreign_key": False,
+                        "max_length": getattr(column.type, "length", None),
+                        "modifier": None,
+                        "is_system": self.system_fields.is_system(column.name),
+                    }
                 )
                 columns.append(column_info)
 
@@ -182,7 +458,7 @@ class DatabaseClient:
                     }
                 )
 
-            return TableInfo(
+            return trusted_table(
                 name=table_name,
                 comment=table.comment,
                 columns=columns,
@@ -200,9 +476,8 @@ class DatabaseClient:
             return []
 
         try:
-            metadata = MetaData()
-            metadata.reflect(bind=self.engine)
-            return list(metadata.tables.keys())
+            # 只读取表名，不反射每张表的完整结构
+            return inspect(self.engine).get_table_names()
         except SQLAlchemyError as e:
             print(f"Error getting table list: {e}")
             return []
@@ -224,6 +499,85 @@ class DatabaseClient:
 
         return DatabaseSchema(database_name=database_name, tables=tables)
 
+    def iter_table_infos(self, batch_size: int = 500) -> Iterator[TableInfo]:
+        """逐个生成数据库中所有表的结构信息，用于流式导出
+
+        低代码实体按 id 键集分页读取，每批实体的字段和外键引用各只查询一次；
+        不属于任何实体的物理表随后按批反射元数据。任何时刻只持有一批表结构，
+        内存占用与数据库规模无关（物理表名清单除外）。
+
+        读取实体和表名清单时的数据库错误直接抛出，不会只生成一部分表。
+        """
+        if not self.engine:
+            return
+        if batch_size <= 0:
+            raise ValueError("batch_size 必须大于 0")
+
+        if self.has_schema_tables:
+            yield from self._iter_schema_table_infos(batch_size)
+
+        table_names = inspect(self.engine).get_table_names()
+        for start in range(0, len(table_names), batch_size):
+            batch = table_names[start : start + batch_size]
+            entity_codes = set()
+            if self.has_schema_tables:
+                with self.engine.connect() as conn:
+                    entity_codes = {
+                        row[0]
+                        for row in conn.execute(
+                            self._entity_codes_query, {"codes": batch}
+                        )
+                    }
+            for table_name in batch:
+                if table_name in entity_codes:
+                    continue
+                table_info = self._get_table_info_from_metadata(table_name)
+                if table_info:
+                    yield table_info
+
+    def _iter_schema_table_infos(self, batch_size: int) -> Iterator[TableInfo]:
+        """按 id 键集分页读取低代码实体，每批构建并生成对应的 TableInfo"""
+        first_page, next_page = self._entity_page_queries
+        after_id = None
+        while True:
+            with self.engine.connect() as conn:
+                if after_id is None:
+                    params = {"batch_size": batch_size}
+                    entities = conn.execute(first_page, params).fetchall()
+                else:
+                    params = {"batch_size": batch_size, "after_id": after_id}
+                    entities = conn.execute(next_page, params).fetchall()
+                if not entities:
+                    return
+
+                attrs_by_entity: Dict[Any, List[Any]] = {
+                    entity._mapping["id"]: [] for entity in entities
+                }
+                rows = conn.execute(
+                    self._batch_attribute_query,
+                    {"entity_ids": list(attrs_by_entity)},
+                )
+                for row in rows:
+                    attr = row._mapping
+                    attrs_by_entity[attr["entity_id"]].append(attr)
+                ref_tables = self._referenced_tables(
+                    conn, (a for attrs in attrs_by_entity.values() for a in attrs)
+                )
+
+            for entity in entities:
+                entity = entity._mapping
+                attrs = attrs_by_entity[entity["id"]]
+                fields = [
+                    _schema_column_fields(attr, self.system_fields) for attr in attrs
+                ]
+                yield self._schema_table_info(
+                    str(entity["code"]), entity, attrs, fields, ref_tables
+                )
+
+            if len(entities) < batch_size:
+                return
+            after_id = entities[-1]._mapping["id"]
+
     def search_tables(self, keyword: str) -> List[TableInfo]:
         """根据关键词搜索表"""
         all_tables = self.get_all_tables()
@@ -239,6 +593,11 @@ class DatabaseClient:
 
         return result
 
+    def after_fork(self):
+        """在 fork 出的子进程中调用，丢弃继承自父进程的连接池（不关闭父进程的连接）"""
+        if self.engine:
+            self.engine.dispose(close=False)
+
     def close(self):
         """关闭数据库连接"""
         if self.engine:
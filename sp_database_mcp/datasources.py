@@ -0,0 +1,454 @@
+"""数据源注册模块 - 管理多个命名数据源，每个数据源有独立的客户端和表目录缓存"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .catalog import TableCatalog
+from .models import ColumnFilter, DataSourceConfig, TableInfo
+
+if TYPE_CHECKING:
+    # SQLAlchemy / httpx 导入较慢，运行时在首次连接时才导入
+    from .api_client import APIClient
+    from .database import DatabaseClient
+
+# 由 DATABASE_URL / API_BASE_URL 环境变量配置的默认数据源
+DEFAULT_DATASOURCE = "default"
+
+
+class UnknownDataSourceError(KeyError):
+    """未注册的数据源"""
+
+
+class DataSource:
+    """命名数据源：客户端在首次使用时创建，表目录缓存与其他数据源隔离"""
+
+    def __init__(
+        self,
+        config: DataSourceConfig,
+        db_client: Optional["DatabaseClient"] = None,
+        api_client: Optional["APIClient"] = None,
+    ):
+        self.config = config
+        self.catalog = TableCatalog()
+        self.last_used = time.monotonic()
+        self._db_client = db_client
+        self._api_client = api_client
+        # 直接传入客户端时视为已连接
+        self._connected = db_client is not None or api_client is not None
+        self._connect_lock = threading.Lock()
+        # 正在线程中进行的连接，等待连接超时后再次使用时复用，不再排队新的线程
+        self._connect_task: Optional["asyncio.Future[None]"] = None
+
+    @property
+    def name(self) -> str:
+        return self.config.name
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    def connect(self):
+        """创建客户端，只在首次使用时执行一次（可能在线程中调用）"""
+        if self._connected:
+            return
+
+        with self._connect_lock:
+            if not self._connected:
+                self._create_clients()
+                self._connected = True
+
+    async def aconnect(self):
+        """在线程中建立连接，网络较慢时不阻塞事件循环上的其他请求
+
+        并发的调用等待同一次连接；调用方放弃等待（例如超时）不会中断连接，之后的
+        调用继续等待它，而不是再占用一个线程阻塞在连接锁上。
+        """
+        if self._connected:
+            return
+        task = self._connect_task
+        if (
+            task is None
+            or task.done()
+            or task.get_loop() is not asyncio.get_running_loop()
+        ):
+            task = self._connect_task = asyncio.ensure_future(
+                asyncio.to_thread(self.connect)
+            )
+            # 所有调用方都放弃等待时，避免未读取的异常产生警告
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        await asyncio.shield(task)
+
+    def _create_clients(self):
+        if self.config.database_url:
+            from .database import DatabaseClient
+
+            engine_options = {
+                key: value
+                for key, value in (
+                    ("pool_size", self.config.pool_size),
+                    ("max_overflow", self.config.max_overflow),
+                    ("pool_recycle", self.config.pool_recycle),
+                )
+                if value is not None
+            }
+            try:
+                self._db_client = DatabaseClient(
+                    self.config.database_url, **engine_options
+                )
+                print(f"数据源 {self.name}: 数据库连接已建立")
+            except Exception as e:
+                print(f"数据源 {self.name}: 数据库连接失败: {e}")
+
+        if self.config.api_base_url:
+            from .api_client import APIClient
+
+            try:
+                self._api_client = APIClient(
+                    self.config.api_base_url, self.config.api_token
+                )
+                print(f"数据源 {self.name}: API 客户端已初始化")
+            except Exception as e:
+                print(f"数据源 {self.name}: API 客户端初始化失败: {e}")
+
+    def touch(self):
+        """记录最近一次使用时间"""
+        self.last_used = time.monotonic()
+
+    # 客户端属性不会隐式连接（同步连接会阻塞事件循环），未连接时为 None；
+    # 使用前先调用 connect()（线程中）或 await aconnect()
+    @property
+    def db_client(self) -> Optional["DatabaseClient"]:
+        return self._db_client
+
+    @property
+    def api_client(self) -> Optional["APIClient"]:
+        return self._api_client
+
+    def configured_sources(self) -> List[str]:
+        """已配置的数据源类型（database / api），不需要先连接"""
+        sources = []
+        if self.config.database_url or self._db_client:
+            sources.append("database")
+        if self.config.api_base_url or self._api_client:
+            sources.append("api")
+        return sources
+
+    # 数据库查询是同步的，放到线程中执行，避免阻塞事件循环上的其他请求
+    def _reload_database_tables(self) -> List[str]:
+        # 表清单过期重新加载（以及 worker 模式整体刷新目录）时重新探测数据库能力，
+        # 例如运行期间创建的低代码 schema 表、之前探测出错的数据库
+        self.db_client.refresh()
+        return self.db_client.get_all_tables()
+
+    async def _load_database_tables(self) -> List[str]:
+        return await asyncio.to_thread(self._reload_database_tables)
+
+    async def _load_api_tables(self) -> List[str]:
+        return await self.api_client.get_all_tables()
+
+    async def _load_database_table_info(self, table_name: str) -> Optional[TableInfo]:
+        return await asyncio.to_thread(self.db_client.get_table_info, table_name)
+
+    async def _load_api_table_info(self, table_name: str) -> Optional[TableInfo]:
+        return await self.api_client.get_table_info(table_name)
+
+    async def _load_database_filtered_table_info(
+        self, table_name: str, column_filter: ColumnFilter
+    ) -> Optional[TableInfo]:
+        return await asyncio.to_thread(
+            self.db_client.get_table_info, table_name, column_filter
+        )
+
+    async def _load_api_filtered_table_info(
+        self, table_name: str, column_filter: ColumnFilter
+    ) -> Optional[TableInfo]:
+        # API 只能返回完整的表结构，加载（并缓存）后再筛选
+        table_info = await self.table_info("api", table_name)
+        return column_filter.apply(table_info) if table_info else None
+
+    async def table_names(self, source: str) -> List[str]:
+        """通过表目录缓存获取 database 或 api 的表清单"""
+        if source == "database":
+            return await self.catalog.get_table_names(
+                "database", self._load_database_tables
+            )
+        return await self.catalog.get_table_names("api", self._load_api_tables)
+
+    async def table_info(self, source: str, table_name: str) -> Optional[TableInfo]:
+        """通过表目录缓存获取 database 或 api 的表信息"""
+        if source == "database":
+            return await self.catalog.get_table_info(
+                "database", table_name, self._load_database_table_info
+            )
+        return await self.catalog.get_table_info(
+            "api", table_name, self._load_api_table_info
+        )
+
+    async def get_table_info(self, table_name: str, source: str) -> Optional[TableInfo]:
+        """获取表信息"""
+        await self.aconnect()
+        if source == "database" and self.db_client:
+            return await self.table_info("database", table_name)
+        elif source == "api" and self.api_client:
+            return await self.table_info("api", table_name)
+        elif source == "auto":
+            # 优先使用数据库直连，然后是 API
+            if self.db_client:
+                result = await self.table_info("database", table_name)
+                if result:
+                    return result
+            if self.api_client:
+                return await self.table_info("api", table_name)
+
+        return None
+
+    def _candidate_sources(self, source: str) -> List[str]:
+        """按 get_table_info 的优先顺序列出要查找的数据源类型"""
+        candidates = []
+        if source in ("database", "auto") and self.db_client:
+            candidates.append("database")
+        if source in ("api", "auto") and self.api_client:
+            candidates.append("api")
+        return candidates
+
+    def _info_loader(
+        self, source: str
+    ) -> Callable[[str], Awaitable[Optional[TableInfo]]]:
+        if source == "database":
+            return self._load_database_table_info
+        return self._load_api_table_info
+
+    async def render_table(
+        self,
+        table_name: str,
+        source: str,
+        fmt: str,
+        renderer: Callable[[TableInfo], str],
+    ) -> Optional[str]:
+        """获取按 fmt 格式渲染的表信息，渲染结果缓存在表目录中"""
+        await self.aconnect()
+        for candidate in self._candidate_sources(source):
+            text = await self.catalog.render(
+                candidate, table_name, fmt, self._info_loader(candidate), renderer
+            )
+            if text is not None:
+                return text
+        return None
+
+    async def table_slice(
+        self, table_name: str, source: str, start: int = 0, stop: Optional[int] = None
+    ) -> Optional[Tuple[TableInfo, int]]:
+        """获取表结构中的一段字段和字段总数，数据源选择与 get_table_info 相同"""
+        await self.aconnect()
+        for candidate in self._candidate_sources(source):
+            result = await self.catalog.get_table_slice(
+                candidate, table_name, self._info_loader(candidate), start, stop
+            )
+            if result is not None:
+                return result
+        return None
+
+    async def filtered_table_info(
+        self, table_name: str, source: str, column_filter: ColumnFilter
+    ) -> Optional[TableInfo]:
+        """获取只包含满足筛选条件字段的表信息，数据源选择与 get_table_info 相同"""
+        await self.aconnect()
+        for candidate in self._candidate_sources(source):
+            loader = (
+                self._load_database_filtered_table_info
+                if candidate == "database"
+                else self._load_api_filtered_table_info
+            )
+            table_info = await self.catalog.get_filtered_table_info(
+                candidate, table_name, column_filter, loader
+            )
+            if table_info is not None:
+                return table_info
+        return None
+
+    def sources(self) -> List[str]:
+        """已配置的数据源类型（database / api）"""
+        sources = []
+        if self.db_client:
+            sources.append("database")
+        if self.api_client:
+            sources.append("api")
+        return sources
+
+    async def search_source(self, source: str, keyword: str) -> List[TableInfo]:
+        """只在指定类型（database / api）中搜索表"""
+        await self.aconnect()
+        if source == "database":
+            return await self._search_database_tables(keyword)
+        return await self.api_client.search_tables(keyword)
+
+    async def _search_database_tables(self, keyword: str) -> List[TableInfo]:
+        """在缓存的数据库表目录中搜索表"""
+        result = []
+        for table_name in await self.catalog.search_table_names(
+            "database", keyword, self._load_database_tables
+        ):
+            table_info = await self.table_info("database", table_name)
+            if table_info:
+                result.append(table_info)
+        return result
+
+    async def search_tables(self, keyword: str, source: str) -> List[TableInfo]:
+        """搜索表"""
+        await self.aconnect()
+        if source == "database" and self.db_client:
+            return await self._search_database_tables(keyword)
+        elif source == "api" and self.api_client:
+            return await self.api_client.search_tables(keyword)
+        elif source == "auto":
+            # 优先使用数据库直连
+            if self.db_client:
+                result = await self._search_database_tables(keyword)
+                if result:
+                    return result
+            if self.api_client:
+                return await self.api_client.search_tables(keyword)
+
+        return []
+
+    async def list_all_tables(self, source: str) -> List[str]:
+        """列出所有表"""
+        await self.aconnect()
+        if source == "database" and self.db_client:
+            return await self.table_names("database")
+        elif source == "api" and self.api_client:
+            return await self.table_names("api")
+        elif source == "auto":
+            # 优先使用数据库直连
+            if self.db_client:
+                result = await self.table_names("database")
+                if result:
+                    return result
+            if self.api_client:
+                return await self.table_names("api")
+
+        return []
+
+    async def preload(self, target: Optional[TableCatalog] = None) -> int:
+        """预加载表清单和全部表结构，返回加载的表数量
+
+        target 为空时加载到数据源自己的表目录中。
+        """
+        await self.aconnect()
+        target = target or self.catalog
+        count = 0
+        if self.db_client:
+            count += await target.preload(
+                "database", self._load_database_tables, self._load_database_table_info
+            )
+        if self.api_client:
+            count += await target.preload(
+                "api", self._load_api_tables, self._load_api_table_info
+            )
+        return count
+
+    def after_fork(self):
+        """在 fork 出的子进程中调用，丢弃继承自父进程的连接"""
+        if self._db_client:
+            self._db_client.after_fork()
+
+    async def close(self):
+        """关闭客户端并清空表目录缓存，之后再次使用时会重新连接"""
+        if self._db_client:
+            self._db_client.close()
+        if self._api_client:
+            await self._api_client.aclose()
+        self._db_client = None
+        self._api_client = None
+        self._connected = False
+        self._connect_task = None
+        self.catalog.invalidate()
+
+
+class DataSourceRegistry:
+    """命名数据源注册表，空闲的数据源会被回收"""
+
+    def __init__(self, idle_timeout: Optional[float] = None):
+        self.idle_timeout = (
+            idle_timeout
+            if idle_timeout is not None
+            else float(os.getenv("DATASOURCE_IDLE_TIMEOUT", "600"))
+        )
+        self._datasources: Dict[str, DataSource] = {}
+
+    def register(self, datasource: DataSource) -> DataSource:
+        """注册数据源，同名数据源会被替换"""
+        self._datasources[datasource.name] = datasource
+        return datasource
+
+    def get(self, name: Optional[str] = None) -> DataSource:
+        """按名称获取数据源，未指定名称时返回默认数据源"""
+        name = name or DEFAULT_DATASOURCE
+        datasource = self._datasources.get(name)
+        if datasource is None:
+            raise UnknownDataSourceError(name)
+        datasource.touch()
+        return datasource
+
+    @property
+    def default(self) -> DataSource:
+        return self.get(DEFAULT_DATASOURCE)
+
+    def names(self) -> List[str]:
+        """已注册的数据源名称"""
+        return sorted(self._datasources)
+
+    def datasources(self) -> List[DataSource]:
+        return [self._datasources[name] for name in self.names()]
+
+    async def evict_idle(self) -> List[str]:
+        """关闭空闲超时的非常驻数据源，返回被回收的数据源名称"""
+        now = time.monotonic()
+        evicted = []
+        for datasource in self._datasources.values():
+            if (
+                datasource.connected
+                and not datasource.config.pinned
+                and now - datasource.last_used > self.idle_timeout
+            ):
+                await datasource.close()
+                evicted.append(datasource.name)
+        return evicted
+
+    async def close_all(self):
+        for datasource in self._datasources.values():
+            await datasource.close()
+
+    @classmethod
+    def from_env(cls) -> "DataSourceRegistry":
+        """根据环境变量创建注册表
+
+        - DATABASE_URL / API_BASE_URL / API_TOKEN 配置常驻的 default 数据源
+        - DATASOURCES_CONFIG 指向 JSON 文件，格式为 {名称: 数据源配置}，
+          配置字段见 DataSourceConfig
+        """
+        registry = cls()
+        registry.register(
+            DataSource(
+                DataSourceConfig(
+                    name=DEFAULT_DATASOURCE,
+                    database_url=os.getenv("DATABASE_URL"),
+                    api_base_url=os.getenv("API_BASE_URL"),
+                    api_token=os.getenv("API_TOKEN"),
+                    pinned=True,
+                )
+            )
+        )
+
+        config_path = os.getenv("DATASOURCES_CONFIG")
+        if config_path:
+            with open(config_path, encoding="utf-8") as f:
+                configs = json.load(f)
+            for name, config in configs.items():
+                registry.register(DataSource(DataSourceConfig(name=name, **config)))
+
+        return registry
@@ -0,0 +1,91 @@
+"""表结构流式导出模块 - 逐表写出 JSON Lines，可选 gzip/zstd 压缩
+
+每行是一个表的完整结构（TableInfo 的 JSON），读取方可以逐行解析。表结构由
+DatabaseClient.iter_table_infos 按批生成，写出后即可释放，导出大型低代码库时
+内存占用不随表数量增长。
+"""
+
+import gzip
+import io
+import os
+from typing import IO, Iterable, Optional
+
+from .formats import dumps
+from .models import TableInfo
+
+COMPRESSIONS = ("gzip", "zstd")
+
+# 根据扩展名推断压缩方式
+_SUFFIXES = {".gz": "gzip", ".gzip": "gzip", ".zst": "zstd", ".zstd": "zstd"}
+
+
+def infer_compression(path: str) -> Optional[str]:
+    """根据文件扩展名推断压缩方式，无法推断时返回 None（不压缩）"""
+    return _SUFFIXES.get(os.path.splitext(path)[1].lower())
+
+
+def _open_zstd(raw: IO[bytes]) -> IO[bytes]:
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError(
+            "zstd 压缩需要安装 zstandard: pip install 'sp-database-mcp[zstd]'"
+        )
+    return zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+
+
+def write_jsonl(
+    tables: Iterable[TableInfo], out: IO[bytes], compression: Optional[str] = None
+) -> int:
+    """把表结构逐行写入二进制流 out，返回写出的表数量
+
+    out 不会被关闭；压缩时在返回前写完压缩流的结尾。
+    """
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(f"不支持的压缩方式: {compression}")
+
+    if compression == "gzip":
+        stream: IO[bytes] = gzip.GzipFile(fileobj=out, mode="wb", mtime=0)
+    elif compression == "zstd":
+        stream = _open_zstd(out)
+    else:
+        stream = out
+
+    writer = io.TextIOWrapper(stream, encoding="utf-8", newline="\n")
+    count = 0
+    for table_info in tables:
+        writer.write(dumps(table_info.model_dump()))
+        writer.write("\n")
+        count += 1
+    # 压缩流关闭时写出结尾；未压缩时保持 out 打开，由调用方关闭
+    if stream is out:
+        writer.flush()
+        writer.detach()
+    else:
+        writer.close()
+    return count
+
+
+def export_schema(
+    client,
+    path: str,
+    compression: Optional[str] = None,
+    batch_size: int = 500,
+) -> int:
+    """流式导出 client 所连接数据库的全部表结构，返回导出的表数量
+
+    未指定 compression 时按扩展名推断。先写临时文件再替换，导出中途失败不会
+    留下不完整的文件。
+    """
+    tables = client.iter_table_infos(batch_size=batch_size)
+    if compression is None:
+        compression = infer_compression(path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            count = write_jsonl(tables, f, compression)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
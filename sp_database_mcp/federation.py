@@ -0,0 +1,123 @@
+"""跨数据源搜索模块 - 并发搜索所有已配置的数据源并合并排序结果"""
+
+import asyncio
+import os
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from .datasources import DataSource
+from .models import FederatedMatch, SourceSearchStatus, TableInfo
+
+# 单个数据源的默认搜索时限（秒）
+DEFAULT_SEARCH_TIMEOUT = float(os.getenv("FEDERATED_SEARCH_TIMEOUT", "5"))
+
+
+def rank_table(table: TableInfo, keyword: str) -> int:
+    """计算表与关键词的匹配分数，0 表示不匹配
+
+    表名完全相同 > 表名前缀匹配 > 表名包含关键词 > 仅表说明包含关键词
+    """
+    keyword = keyword.lower()
+    name = table.name.lower()
+    if name == keyword:
+        return 100
+    if name.startswith(keyword):
+        return 80
+    if keyword in name:
+        return 60
+    if table.comment and keyword in table.comment.lower():
+        return 30
+    return 0
+
+
+async def _search_one(
+    datasource: DataSource, source: str, keyword: str, timeout: float
+) -> Tuple[List[FederatedMatch], SourceSearchStatus]:
+    """在单个数据源中搜索，超时或出错时只影响该数据源"""
+    started = time.perf_counter()
+    matches: List[FederatedMatch] = []
+    status, error = "ok", None
+    try:
+        tables = await asyncio.wait_for(
+            datasource.search_source(source, keyword), timeout
+        )
+        for table in tables:
+            matches.append(
+                FederatedMatch(
+                    datasource=datasource.name,
+                    source=source,
+                    # 数据源自己判定匹配（例如 API 按字段搜索）的结果排在最后
+                    score=max(rank_table(table, keyword), 10),
+                    table=table,
+                )
+            )
+    except asyncio.TimeoutError:
+        status = "timeout"
+    except Exception as e:
+        status, error = "error", str(e)
+
+    return matches, SourceSearchStatus(
+        datasource=datasource.name,
+        source=source,
+        status=status,
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+        matches=len(matches),
+        error=error,
+    )
+
+
+async def _search_datasource(
+    datasource: DataSource, keyword: str, timeout: float
+) -> Tuple[List[FederatedMatch], List[SourceSearchStatus]]:
+    """连接（首次使用时）并搜索一个数据源的所有类型，整体受 timeout 约束"""
+    started = time.perf_counter()
+    deadline = time.monotonic() + timeout
+    try:
+        # 首次使用的数据源需要建立连接，在线程中执行
+        await asyncio.wait_for(datasource.aconnect(), timeout)
+    except Exception as e:
+        timed_out = isinstance(e, asyncio.TimeoutError)
+        return [], [
+            SourceSearchStatus(
+                datasource=datasource.name,
+                source="*",
+                status="timeout" if timed_out else "error",
+                elapsed_ms=(time.perf_counter() - started) * 1000,
+                error=None if timed_out else str(e),
+            )
+        ]
+
+    results = await asyncio.gather(
+        *(
+            _search_one(
+                datasource, source, keyword, max(deadline - time.monotonic(), 0)
+            )
+            for source in datasource.sources()
+        )
+    )
+    matches = [match for source_matches, _ in results for match in source_matches]
+    return matches, [status for _, status in results]
+
+
+async def federated_search(
+    datasources: Sequence[DataSource],
+    keyword: str,
+    timeout: Optional[float] = None,
+) -> Tuple[List[FederatedMatch], List[SourceSearchStatus]]:
+    """并发搜索所有数据源，返回按分数排序的合并结果和各数据源的执行情况
+
+    每个数据源（连接 + 搜索）各自受 timeout 秒的时限约束，慢的或不可用的数据源
+    不会拖慢其他数据源的结果。
+    """
+    timeout = timeout if timeout is not None else DEFAULT_SEARCH_TIMEOUT
+
+    matches: List[FederatedMatch] = []
+    statuses: List[SourceSearchStatus] = []
+    for datasource_matches, datasource_statuses in await asyncio.gather(
+        *(_search_datasource(datasource, keyword, timeout) for datasource in datasources)
+    ):
+        matches.extend(datasource_matches)
+        statuses.extend(datasource_statuses)
+
+    matches.sort(key=lambda match: (-match.score, match.table.name, match.datasource))
+    return matches, statuses
@@ -0,0 +1,140 @@
+"""表结构输出格式模块 - JSON、JSON Lines、CSV 和紧凑表示法
+
+markdown 表格和 indent=2 的 JSON 便于阅读，但体积是必要内容的两到三倍；这里的
+格式去掉了对齐空白和重复的键名，减少序列化耗时、传输字节和模型 token。
+
+每种格式提供整表渲染函数和单个字段渲染函数，后者用于分页时估计每个字段的输出
+规模。安装了 orjson 时 JSON 序列化使用 orjson。
+"""
+
+import csv
+import io
+import json
+from typing import Any, Callable, Dict, Tuple
+
+from .models import ColumnInfo, TableInfo
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 取决于是否安装了可选依赖
+    orjson = None
+
+# 工具参数 format 的可选值，markdown 的渲染在 server 中
+FORMATS = ("markdown", "json", "jsonl", "csv", "compact")
+
+_CSV_FIELDS = tuple(ColumnInfo.model_fields)
+
+
+def dumps(value: Any) -> str:
+    """序列化为不含多余空白的 JSON，非 ASCII 字符不转义"""
+    if orjson is not None:
+        return orjson.dumps(value, default=str).decode("utf-8")
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def format_table_json(table_info: TableInfo) -> str:
+    """整表一个 JSON 对象"""
+    return dumps(table_info.model_dump())
+
+
+def format_column_json(column: ColumnInfo) -> str:
+    return dumps(column.model_dump())
+
+
+def format_table_jsonl(table_info: TableInfo) -> str:
+    """第一行是表信息（不含字段），之后每行一个字段"""
+    data = table_info.model_dump()
+    columns = data.pop("columns")
+    return "".join([dumps(data), "\n"] + [dumps(column) + "\n" for column in columns])
+
+
+def format_column_jsonl(column: ColumnInfo) -> str:
+    return format_column_json(column) + "\n"
+
+
+def _csv_rows(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue()
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def _csv_values(column: ColumnInfo) -> Tuple[Any, ...]:
+    values = column.__dict__
+    return tuple(_csv_value(values[field]) for field in _CSV_FIELDS)
+
+
+def format_table_csv(table_info: TableInfo) -> str:
+    """每行一个字段，第一行为列名；布尔值输出为 1/0，索引和外键不包含在内"""
+    return _csv_rows([_CSV_FIELDS] + [_csv_values(c) for c in table_info.columns])
+
+
+def format_column_csv(column: ColumnInfo) -> str:
+    return _csv_rows([_csv_values(column)])
+
+
+def _compact_column(column: ColumnInfo, reference: str = "") -> str:
+    parts = [column.code, ":", column.type]
+    if column.max_length and "(" not in column.type:
+        parts.append(f"({column.max_length})")
+    if column.is_primary_key:
+        parts.append("*")
+    if not column.nullable:
+        parts.append("!")
+    if column.is_system:
+        parts.append("~")
+    if reference:
+        parts.append(f">{reference}")
+    if column.name != column.code:
+        parts.append(f" {column.name}")
+    elif column.comment:
+        parts.append(f" {column.comment}")
+    parts.append("\n")
+    return "".join(parts)
+
+
+def format_table_compact(table_info: TableInfo) -> str:
+    """紧凑表示法
+
+    每行一个字段，格式为 编码:类型，后缀 * 表示主键、! 非空、~ 系统字段、
+    >表.字段 外键，最后是属性名称（与编码相同时为字段注释）；索引以 @ 开头。
+    """
+    references: Dict[str, str] = {
+        fk.get("column"): f"{fk.get('referenced_table')}.{fk.get('referenced_column')}"
+        for fk in table_info.foreign_keys
+    }
+    parts = [f"# {table_info.name}"]
+    if table_info.comment:
+        parts.append(f" {table_info.comment}")
+    parts.append("\n# *主键 !非空 ~系统字段 >外键\n")
+    parts.extend(
+        _compact_column(column, references.get(column.code, ""))
+        for column in table_info.columns
+    )
+    for index in table_info.indexes:
+        unique = " unique" if index.get("unique") else ""
+        columns = ",".join(index.get("columns", []))
+        parts.append(f"@{index.get('name')}{unique}({columns})\n")
+    return "".join(parts)
+
+
+def format_column_compact(column: ColumnInfo) -> str:
+    return _compact_column(column)
+
+
+# 格式 -> (整表渲染, 单个字段渲染)
+RENDERERS: Dict[
+    str, Tuple[Callable[[TableInfo], str], Callable[[ColumnInfo], str]]
+] = {
+    "json": (format_table_json, format_column_json),
+    "jsonl": (format_table_jsonl, format_column_jsonl),
+    "csv": (format_table_csv, format_column_csv),
+    "compact": (format_table_compact, format_column_compact),
+}
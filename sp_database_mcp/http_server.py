@@ -0,0 +1,77 @@
+"""HTTP 传输模块 - 通过 Streamable HTTP 和 SSE 让多个 MCP 客户端共享同一个服务器进程"""
+
+import asyncio
+import contextlib
+from typing import Awaitable, Callable, Sequence
+
+from mcp.server.lowlevel import Server
+from mcp.server.sse import SseServerTransport
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from starlette.types import Receive, Scope, Send
+
+
+class _StreamableHTTPApp:
+    """将请求转交给 StreamableHTTPSessionManager 的 ASGI 应用"""
+
+    def __init__(self, session_manager: StreamableHTTPSessionManager):
+        self.session_manager = session_manager
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await self.session_manager.handle_request(scope, receive, send)
+
+
+def create_app(
+    mcp_server: Server,
+    background_tasks: Sequence[Callable[[], Awaitable[None]]] = (),
+    json_response: bool = False,
+    stateless: bool = False,
+) -> Starlette:
+    """创建 HTTP 应用
+
+    - `/mcp`: Streamable HTTP 传输
+    - `/sse` + `/messages/`: 旧版 SSE 传输，兼容尚未支持 Streamable HTTP 的客户端
+
+    所有会话运行在同一个进程中，共享数据库连接池、表目录缓存等状态。
+    background_tasks 随应用启动，在应用关闭时取消。
+
+    stateless 模式下每个请求独立处理，不依赖进程内的会话状态，适用于多个 worker
+    共享同一个监听 socket 的场景；SSE 传输依赖会话状态，此时不提供。
+    """
+    session_manager = StreamableHTTPSessionManager(
+        app=mcp_server, json_response=json_response, stateless=stateless
+    )
+    sse = SseServerTransport("/messages/")
+
+    async def handle_sse(request: Request) -> Response:
+        async with sse.connect_sse(
+            request.scope, request.receive, request._send
+        ) as (read_stream, write_stream):
+            await mcp_server.run(
+                read_stream,
+                write_stream,
+                mcp_server.create_initialization_options(),
+            )
+        return Response()
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette):
+        tasks = [asyncio.create_task(task()) for task in background_tasks]
+        try:
+            async with session_manager.run():
+                yield
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    routes = [Route("/mcp", endpoint=_StreamableHTTPApp(session_manager))]
+    if not stateless:
+        routes += [
+            Route("/sse", endpoint=handle_sse, methods=["GET"]),
+            Mount("/messages/", app=sse.handle_post_message),
+        ]
+
+    return Starlette(routes=routes, lifespan=lifespan)
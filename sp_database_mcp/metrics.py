@@ -0,0 +1,269 @@
+"""运行统计模块 - 记录各请求的延迟直方图、SQL 和 HTTP 请求数、缓存命中率和输出字节数
+
+统计只在内存中累积，由 server_stats 工具读取，也可以定期写入本地文件。计数在
+事件循环和 asyncio.to_thread 的工作线程中都会更新，不加锁，结果为近似值。
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import time
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    from .sqltrace import SQLTracer
+
+# 延迟直方图各桶的上界（毫秒），最后一个桶收集超过 10 秒的请求
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class LatencyHistogram:
+    """固定分桶的延迟直方图，百分位数取所在桶的上界"""
+
+    __slots__ = ("counts", "count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, q: float) -> float:
+        """第 q 百分位数所在桶的上界，落在最后一个桶时返回最大值"""
+        if not self.count:
+            return 0.0
+        rank = self.count * q / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                if index == len(LATENCY_BUCKETS_MS):
+                    return self.max_ms
+                return min(LATENCY_BUCKETS_MS[index], self.max_ms)
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": {
+                f"le_{bound:g}ms": count
+                for bound, count in zip(LATENCY_BUCKETS_MS, self.counts)
+                if count
+            },
+        }
+
+
+class OperationStats:
+    """一种操作（例如 tool:get_table_info）的统计"""
+
+    __slots__ = (
+        "latency",
+        "errors",
+        "sql_statements",
+        "sql_ms",
+        "http_requests",
+        "bytes_emitted",
+    )
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.errors = 0
+        self.sql_statements = 0
+        self.sql_ms = 0.0
+        self.http_requests = 0
+        self.bytes_emitted = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        calls = self.latency.count
+        return {
+            **self.latency.to_dict(),
+            "errors": self.errors,
+            "sql_statements": self.sql_statements,
+            "sql_per_call": round(self.sql_statements / calls, 2) if calls else 0.0,
+            "sql_ms": round(self.sql_ms, 3),
+            "http_requests": self.http_requests,
+            "bytes_emitted": self.bytes_emitted,
+        }
+
+
+# 当前请求的统计，SQL 和 HTTP 计数同时记入所属的操作
+_current: contextvars.ContextVar[Optional[OperationStats]] = contextvars.ContextVar(
+    "current_operation", default=None
+)
+
+
+class Metrics:
+    """服务器运行统计"""
+
+    def __init__(self):
+        # 可选的 SQL 跟踪（SQL_TRACE 开启），按请求汇总 SQL 形状并发现 N+1
+        self.sql_tracer: Optional["SQLTracer"] = None
+        self.reset()
+
+    def reset(self):
+        """清空全部统计"""
+        if self.sql_tracer is not None:
+            self.sql_tracer.reset()
+        self.started_at = time.time()
+        self.operations: Dict[str, OperationStats] = {}
+        self.sql_statements = 0
+        self.sql_ms = 0.0
+        self.http_requests = 0
+        self.http_errors = 0
+        self.http_ms = 0.0
+        # 缓存类型 -> [命中次数, 未命中次数]
+        self.cache: Dict[str, List[int]] = {}
+
+    @contextlib.contextmanager
+    def operation(self, name: str) -> Iterator[OperationStats]:
+        """统计一次请求的耗时，期间执行的 SQL 和 HTTP 请求记入该操作"""
+        stats = self.operations.get(name)
+        if stats is None:
+            stats = self.operations[name] = OperationStats()
+        token = _current.set(stats)
+        tracer = self.sql_tracer
+        trace_token = tracer.begin() if tracer is not None else None
+        started = time.perf_counter()
+        try:
+            yield stats
+        except BaseException:
+            stats.errors += 1
+            raise
+        finally:
+            stats.latency.observe((time.perf_counter() - started) * 1000)
+            if trace_token is not None:
+                tracer.end(name, trace_token)
+            _current.reset(token)
+
+    def record_error(self):
+        """当前请求以错误结束（处理函数捕获了异常，返回错误信息）"""
+        stats = _current.get()
+        if stats is not None:
+            stats.errors += 1
+
+    def record_output(self, size: int):
+        """当前请求输出的字节数"""
+        stats = _current.get()
+        if stats is not None:
+            stats.bytes_emitted += size
+
+    def record_sql(self, elapsed: float, statement: str = ""):
+        self.sql_statements += 1
+        self.sql_ms += elapsed * 1000
+        stats = _current.get()
+        if stats is not None:
+            stats.sql_statements += 1
+            stats.sql_ms += elapsed * 1000
+        if self.sql_tracer is not None:
+            self.sql_tracer.record(statement, elapsed * 1000)
+
+    def record_http_request(self):
+        self.http_requests += 1
+        stats = _current.get()
+        if stats is not None:
+            stats.http_requests += 1
+
+    def record_http_response(self, elapsed: float, status_code: int):
+        self.http_ms += elapsed * 1000
+        if status_code >= 400:
+            self.http_errors += 1
+
+    def record_cache(self, kind: str, hit: bool):
+        counts = self.cache.get(kind)
+        if counts is None:
+            counts = self.cache[kind] = [0, 0]
+        counts[0 if hit else 1] += 1
+
+    def instrument_engine(self, engine):
+        """统计 SQLAlchemy engine（或 Engine 类，即全部 engine）执行的 SQL 语句数和耗时"""
+        from sqlalchemy import event
+
+        def before(conn, cursor, statement, parameters, context, executemany):
+            context._metrics_started = time.perf_counter()
+
+        def after(conn, cursor, statement, parameters, context, executemany):
+            self.record_sql(time.perf_counter() - context._metrics_started, statement)
+
+        event.listen(engine, "before_cursor_execute", before)
+        event.listen(engine, "after_cursor_execute", after)
+
+    def http_event_hooks(self) -> Dict[str, List[Any]]:
+        """httpx.AsyncClient 的 event_hooks，统计请求数、错误响应数和到收到响应的耗时
+
+        未得到响应（连接失败、超时）的请求计入请求数，不计入错误数和耗时。
+        """
+
+        async def on_request(request):
+            self.record_http_request()
+            request.extensions["metrics_started"] = time.perf_counter()
+
+        async def on_response(response):
+            started = response.request.extensions.get("metrics_started")
+            elapsed = time.perf_counter() - started if started else 0.0
+            self.record_http_response(elapsed, response.status_code)
+
+        return {"request": [on_request], "response": [on_response]}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """可序列化为 JSON 的统计结果"""
+        return {
+            "started_at": time.strftime(
+                "%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)
+            ),
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "pid": os.getpid(),
+            "operations": {
+                name: stats.to_dict() for name, stats in sorted(self.operations.items())
+            },
+            "sql": {
+                "statements": self.sql_statements,
+                "total_ms": round(self.sql_ms, 3),
+            },
+            "http": {
+                "requests": self.http_requests,
+                "error_responses": self.http_errors,
+                "total_ms": round(self.http_ms, 3),
+            },
+            "cache": {
+                kind: {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_ratio": round(hits / (hits + misses), 4),
+                }
+                for kind, (hits, misses) in sorted(self.cache.items())
+            },
+            **(
+                {"sql_trace": self.sql_tracer.snapshot()}
+                if self.sql_tracer is not None
+                else {}
+            ),
+        }
+
+    def dump(self, path: str):
+        """把统计结果写入 JSON 文件，路径中的 {pid} 替换为进程号（多 worker 时使用）"""
+        path = os.path.expanduser(path.replace("{pid}", str(os.getpid())))
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+
+# 进程内共享的统计实例
+metrics = Metrics()
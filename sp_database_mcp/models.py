@@ -1,8 +1,10 @@
 """数据模型定义"""
 
-from typing import Any, Dict, List, Optional
+import fnmatch
+import re
+from typing import Any, Dict, List, Optional, Set
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 
 class ColumnInfo(BaseModel):
@@ -31,6 +33,146 @@ class TableInfo(BaseModel):
     foreign_keys: List[Dict[str, Any]] = []
 
 
+# 由本项目代码生成、值已是声明类型的数据（例如 DatabaseClient 查询出的行、紧凑
+# 表目录中的数据）构建模型时跳过 pydantic 校验；批量加载大量字段时校验是主要的
+# CPU 开销。来自 API 等外部输入的数据仍然走正常的校验。
+#
+# pydantic v2 的 model_construct 是纯 Python 实现，逐字段处理默认值，反而比 Rust
+# 实现的校验更慢，这里直接设置实例的 __dict__。fields 必须包含模型的全部字段；
+# 所有字段都已显式设置，fields_set 可以在实例之间共享（赋值时只会加入已有的字段名）。
+_COLUMN_FIELDS_SET = set(ColumnInfo.model_fields)
+_TABLE_FIELDS_SET = set(TableInfo.model_fields)
+
+
+def _construct(model_cls: type, fields: Dict[str, Any], fields_set: set) -> Any:
+    model = object.__new__(model_cls)
+    object.__setattr__(model, "__dict__", fields)
+    object.__setattr__(model, "__pydantic_fields_set__", fields_set)
+    object.__setattr__(model, "__pydantic_extra__", None)
+    object.__setattr__(model, "__pydantic_private__", None)
+    return model
+
+
+def trusted_column(fields: Dict[str, Any]) -> ColumnInfo:
+    """跳过校验构建 ColumnInfo，fields 必须包含全部字段且类型正确"""
+    return _construct(ColumnInfo, fields, _COLUMN_FIELDS_SET)
+
+
+def trusted_table(
+    name: str,
+    comment: Optional[str],
+    columns: List[ColumnInfo],
+    indexes: List[Dict[str, Any]],
+    foreign_keys: List[Dict[str, Any]],
+) -> TableInfo:
+    """跳过校验构建 TableInfo"""
+    return _construct(
+        TableInfo,
+        {
+            "name": name,
+            "comment": comment,
+            "columns": columns,
+            "indexes": indexes,
+            "foreign_keys": foreign_keys,
+        },
+        _TABLE_FIELDS_SET,
+    )
+
+
+class ColumnFilter(BaseModel):
+    """get_table_info 的字段筛选条件，各条件同时满足的字段才会被返回
+
+    - exclude_system: 排除系统字段
+    - columns: 只返回这些字段（按字段编码不区分大小写匹配，或按属性名称匹配）
+    - column_pattern: 字段编码匹配的通配符（* 和 ?），不区分大小写
+    """
+
+    exclude_system: bool = False
+    columns: Optional[List[str]] = None
+    column_pattern: Optional[str] = None
+
+    _codes: frozenset = PrivateAttr(default=frozenset())
+    _names: frozenset = PrivateAttr(default=frozenset())
+    _pattern: Optional[re.Pattern] = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any):
+        if self.columns is not None:
+            self._codes = frozenset(column.lower() for column in self.columns)
+            self._names = frozenset(self.columns)
+        if self.column_pattern:
+            self._pattern = re.compile(
+                fnmatch.translate(self.column_pattern), re.IGNORECASE
+            )
+
+    @classmethod
+    def from_arguments(cls, arguments: Dict[str, Any]) -> Optional["ColumnFilter"]:
+        """从工具参数中读取筛选条件，没有设置任何条件时返回 None"""
+        column_filter = cls(
+            exclude_system=bool(arguments.get("exclude_system", False)),
+            columns=arguments.get("columns"),
+            column_pattern=arguments.get("column_pattern") or None,
+        )
+        if (
+            not column_filter.exclude_system
+            and column_filter.columns is None
+            and column_filter.column_pattern is None
+        ):
+            return None
+        return column_filter
+
+    def matches(self, code: str, name: str, is_system: bool) -> bool:
+        """判断字段是否满足筛选条件"""
+        if self.exclude_system and is_system:
+            return False
+        if (
+            self.columns is not None
+            and code.lower() not in self._codes
+            and name not in self._names
+        ):
+            return False
+        if self._pattern is not None and not self._pattern.match(code):
+            return False
+        return True
+
+    def like_pattern(self) -> Optional[str]:
+        """column_pattern 对应的小写 SQL LIKE 模式，无法表示时返回 None
+
+        LIKE 的特殊字符以 ! 转义（查询中需要 ESCAPE '!'），反斜杠在 MySQL 字符串
+        中本身是转义符，不便跨数据库使用。
+        """
+        if not self.column_pattern or "[" in self.column_pattern:
+            return None
+        escaped = re.sub(r"([!%_])", r"!\1", self.column_pattern.lower())
+        return escaped.replace("*", "%").replace("?", "_")
+
+    def apply(self, table_info: TableInfo) -> TableInfo:
+        """返回只包含满足条件字段（及其外键）的 TableInfo"""
+        columns, removed = [], set()
+        for column in table_info.columns:
+            if self.matches(column.code, column.name, column.is_system):
+                columns.append(column)
+            else:
+                removed.update((column.code, column.name))
+        return table_info.model_copy(
+            update={
+                "columns": columns,
+                "foreign_keys": kept_foreign_keys(table_info.foreign_keys, removed),
+            }
+        )
+
+
+def kept_foreign_keys(
+    foreign_keys: List[Dict[str, Any]], removed_columns: Set[str]
+) -> List[Dict[str, Any]]:
+    """去掉被筛选掉的字段（编码或名称在 removed_columns 中）的外键
+
+    与数据库按筛选条件查询字段时的结果一致：只保留选中字段的外键。
+    """
+    if not removed_columns:
+        return foreign_keys
+    return [fk for fk in foreign_keys if fk.get("column") not in removed_columns]
+
+
 class DatabaseSchema(BaseModel):
     """数据库架构信息"""
 
@@ -45,3 +187,52 @@ class APIResponse(BaseModel):
     data: Optional[Dict[str, Any]] = None
     message: Optional[str] = None
     error: Optional[str] = None
+
+
+class DataSourceConfig(BaseModel):
+    """命名数据源配置"""
+
+    name: str
+    database_url: Optional[str] = None
+    api_base_url: Optional[str] = None
+    api_token: Optional[str] = None
+    # 数据库连接池参数，未设置时使用 SQLAlchemy 默认值
+    pool_size: Optional[int] = None
+    max_overflow: Optional[int] = None
+    pool_recycle: Optional[int] = None
+    # 常驻数据源不会因空闲被回收
+    pinned: bool = False
+
+
+class SystemFieldRules(BaseModel):
+    """系统字段识别规则，字段名不区分大小写
+
+    - exact: 完全相同的字段名
+    - prefixes / suffixes: 字段名前缀 / 后缀
+    - patterns: 正则表达式（从字段名开头匹配）
+    """
+
+    exact: List[str] = []
+    prefixes: List[str] = []
+    suffixes: List[str] = []
+    patterns: List[str] = []
+
+
+class FederatedMatch(BaseModel):
+    """跨数据源搜索的单条结果"""
+
+    datasource: str
+    source: str
+    score: int
+    table: TableInfo
+
+
+class SourceSearchStatus(BaseModel):
+    """跨数据源搜索中单个数据源的执行情况"""
+
+    datasource: str
+    source: str
+    status: str  # ok / timeout / error
+    elapsed_ms: float
+    matches: int = 0
+    error: Optional[str] = None
@@ -0,0 +1,62 @@
+"""宽表分页模块 - 按字段数和 token 预算切分表结构输出"""
+
+from typing import Optional, Tuple
+
+from .catalog import InvalidCursorError, decode_cursor, encode_cursor
+
+# 按 token 预算分页时每次从表目录还原的字段数
+COLUMN_CHUNK_SIZE = 50
+
+# 页脚（字段范围、下一页 cursor 和 token 估计）预留的 token 数
+FOOTER_TOKENS = 40
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估计文本的 token 数
+
+    ASCII 字符按约 4 个字符一个 token 计算，中文等非 ASCII 字符按每个字符一个
+    token 计算；只用于控制输出规模，不追求与具体模型的分词结果一致。
+    """
+    ascii_count = len(text.encode("ascii", "ignore"))
+    return (ascii_count + 3) // 4 + len(text) - ascii_count
+
+
+def encode_page_cursor(table_name: str, offset: int) -> str:
+    """将下一页的起始字段序号编码为游标，游标只对同一个表有效"""
+    return encode_cursor(f"{offset}:{table_name}")
+
+
+def decode_page_cursor(cursor: str, table_name: str) -> int:
+    """解析字段分页游标，返回下一页的起始字段序号"""
+    offset, _, cursor_table = decode_cursor(cursor).partition(":")
+    if cursor_table != table_name or not offset.isdigit():
+        raise InvalidCursorError(f"无效的分页游标: {cursor}")
+    return int(offset)
+
+
+def parse_page_arguments(
+    arguments: dict, table_name: str
+) -> Optional[Tuple[int, Optional[int], Optional[int]]]:
+    """从工具参数中解析 (offset, limit, max_tokens)，未要求分页时返回 None
+
+    cursor 优先于 offset；参数不合法时抛出 ValueError。
+    """
+    cursor = arguments.get("cursor")
+    offset = arguments.get("offset")
+    limit = arguments.get("limit")
+    max_tokens = arguments.get("max_tokens")
+    if cursor is None and offset is None and limit is None and max_tokens is None:
+        return None
+
+    offset = decode_page_cursor(cursor, table_name) if cursor else int(offset or 0)
+    if offset < 0:
+        raise ValueError("offset 不能为负数")
+    if limit is not None:
+        limit = int(limit)
+        if limit <= 0:
+            raise ValueError("limit 必须大于 0")
+    if max_tokens is not None:
+        max_tokens = int(max_tokens)
+        if max_tokens <= 0:
+            raise ValueError("max_tokens 必须大于 0")
+    return offset, limit, max_tokens
@@ -1,92 +1,267 @@
 """SP Database MCP Server - 主服务器文件"""
 
+import argparse
 import asyncio
+import contextlib
+import hashlib
+import io
 import json
+import math
 import os
+import shutil
 import sys
-from typing import Any, Dict, List, Optional
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TextIO, Tuple
+from urllib.parse import parse_qs
 
 from dotenv import load_dotenv
 from mcp.server import Server
 from mcp.server.lowlevel import NotificationOptions
 from mcp.server.models import InitializationOptions
 from mcp.server.stdio import stdio_server
+from mcp.shared.exceptions import McpError
 from mcp.types import (
+    INVALID_PARAMS,
     EmbeddedResource,
+    ErrorData,
     ImageContent,
+    ListResourcesRequest,
+    ListResourcesResult,
     LoggingLevel,
     Resource,
+    ResourceTemplate,
+    ServerResult,
     TextContent,
     Tool,
 )
-
-from .api_client import APIClient
-from .database import DatabaseClient
-from .models import ColumnInfo, TableInfo
+from pydantic import AnyUrl
+
+from .catalog import DEFAULT_PAGE_SIZE, InvalidCursorError, TableCatalog, paginate
+from .catalog_file import CatalogFileError, MappedCatalog, write_catalog_file
+from .export import COMPRESSIONS, export_schema, write_jsonl
+from .datasources import (
+    DEFAULT_DATASOURCE,
+    DataSource,
+    DataSourceRegistry,
+    UnknownDataSourceError,
+)
+from .federation import DEFAULT_SEARCH_TIMEOUT, federated_search
+from .formats import FORMATS, RENDERERS
+from .metrics import metrics
+from .models import (
+    ColumnFilter,
+    ColumnInfo,
+    FederatedMatch,
+    SourceSearchStatus,
+    TableInfo,
+)
+from .paging import (
+    COLUMN_CHUNK_SIZE,
+    FOOTER_TOKENS,
+    encode_page_cursor,
+    estimate_tokens,
+    parse_page_arguments,
+)
+from .sqltrace import SQLTracer
+from .subscriptions import ChangeDetector, SubscriptionRegistry
+from .usage import UsageLog, prewarm
 
 # 加载环境变量
 load_dotenv()
 
+
+class DatabaseMCPServer(Server):
+    """SP Database MCP 服务器"""
+
+    def get_capabilities(self, notification_options, experimental_capabilities):
+        capabilities = super().get_capabilities(
+            notification_options, experimental_capabilities
+        )
+        # lowlevel Server 不会根据订阅处理器声明 subscribe 能力
+        if capabilities.resources:
+            capabilities.resources.subscribe = True
+        return capabilities
+
+
 # 创建服务器实例
-server = Server("sp-database-mcp")
+server = DatabaseMCPServer("sp-database-mcp", version="0.1.2")
 
-# 全局客户端实例
-db_client: Optional[DatabaseClient] = None
-api_client: Optional[APIClient] = None
+# 数据源注册表，default 数据源由 DATABASE_URL / API_BASE_URL 配置
+registry = DataSourceRegistry.from_env()
 
+# 资源列表每页条数
+RESOURCE_PAGE_SIZE = int(os.getenv("RESOURCE_PAGE_SIZE", str(DEFAULT_PAGE_SIZE)))
 
-@server.list_resources()
-async def handle_list_resources() -> List[Resource]:
-    """列出可用的资源"""
-    resources = []
+# 资源订阅和变更检测，后台任务按间隔检查被订阅的资源
+subscriptions = SubscriptionRegistry()
+change_detector = ChangeDetector()
+RESOURCE_POLL_INTERVAL = float(os.getenv("RESOURCE_POLL_INTERVAL", "30"))
 
-    # 如果有数据库连接，列出所有表作为资源
-    if db_client:
+# 空闲数据源回收检查间隔（秒）
+DATASOURCE_EVICT_INTERVAL = 60.0
+
+# 表访问记录，启动时预热默认数据源中最常用的 PREWARM_TOP_N 个表
+usage_log = UsageLog.from_env()
+PREWARM_TOP_N = int(os.getenv("PREWARM_TOP_N", "20"))
+PREWARM_DELAY = float(os.getenv("PREWARM_DELAY", "0.2"))
+USAGE_LOG_FLUSH_INTERVAL = float(os.getenv("USAGE_LOG_FLUSH_INTERVAL", "60"))
+
+# 多个服务器进程以 mmap 共享的只读目录文件（由 --write-catalog 生成），以及检查
+# 文件是否被替换的间隔（秒）
+CATALOG_FILE = os.getenv("CATALOG_FILE")
+SNAPSHOT_POLL_INTERVAL = float(os.getenv("SNAPSHOT_POLL_INTERVAL", "5"))
+
+# 运行统计（server_stats 工具的内容）定期写入的文件和间隔（秒），未设置时不写入
+STATS_DUMP_PATH = os.getenv("STATS_DUMP_PATH")
+STATS_DUMP_INTERVAL = float(os.getenv("STATS_DUMP_INTERVAL", "60"))
+
+# SQL 跟踪：按请求统计 SQL 形状，同一请求中某个形状执行 SQL_TRACE_REPEAT_THRESHOLD
+# 次以上时在 server_stats 中标记为疑似 N+1
+if os.getenv("SQL_TRACE", "").lower() in ("1", "true", "yes"):
+    metrics.sql_tracer = SQLTracer(int(os.getenv("SQL_TRACE_REPEAT_THRESHOLD", "3")))
+
+# 正在处理的交互请求数，后台预热在有请求时让路
+_active_requests = 0
+
+
+@contextlib.contextmanager
+def _interactive_request():
+    global _active_requests
+    _active_requests += 1
+    try:
+        yield
+    finally:
+        _active_requests -= 1
+
+
+async def _resource_uris() -> List[str]:
+    """默认数据源的所有资源 URI（已排序），基于表目录缓存构建"""
+    datasource = registry.default
+    await datasource.aconnect()
+    uris = []
+
+    # 如果有 API 客户端，也可以列出 API 资源（api:// 排在 database:// 之前）
+    if datasource.api_client:
         try:
-            tables = db_client.get_all_tables()
-            for table_name in tables:
-                resources.append(
-                    Resource(
-                        uri=f"database://table/{table_name}",
-                        name=f"表: {table_name}",
-                        description=f"数据库表 {table_name} 的结构信息",
-                        mimeType="application/json",
-                    )
-                )
+            tables = await datasource.table_names("api")
+            uris.extend(f"api://table/{table_name}" for table_name in tables)
         except Exception as e:
-            print(f"Error listing database tables: {e}")
+            print(f"Error listing API tables: {e}")
 
-    # 如果有 API 客户端，也可以列出 API 资源
-    if api_client:
+    # 如果有数据库连接，列出所有表作为资源
+    if datasource.db_client:
         try:
-            tables = await api_client.get_all_tables()
-            for table_name in tables:
-                resources.append(
-                    Resource(
-                        uri=f"api://table/{table_name}",
-                        name=f"API表: {table_name}",
-                        description=f"通过 API 获取的表 {table_name} 的结构信息",
-                        mimeType="application/json",
-                    )
-                )
+            tables = await datasource.table_names("database")
+            uris.extend(f"database://table/{table_name}" for table_name in tables)
         except Exception as e:
-            print(f"Error listing API tables: {e}")
+            print(f"Error listing database tables: {e}")
+
+    return uris
+
+
+def _make_resource(uri: str) -> Resource:
+    if uri.startswith("api://table/"):
+        table_name = uri.replace("api://table/", "")
+        return Resource(
+            uri=uri,
+            name=f"API表: {table_name}",
+            description=f"通过 API 获取的表 {table_name} 的结构信息",
+            mimeType="application/json",
+        )
+
+    table_name = uri.replace("database://table/", "")
+    return Resource(
+        uri=uri,
+        name=f"表: {table_name}",
+        description=f"数据库表 {table_name} 的结构信息",
+        mimeType="application/json",
+    )
+
+
+async def handle_list_resources(cursor: Optional[str] = None) -> ListResourcesResult:
+    """分页列出可用的资源"""
+    try:
+        uris, next_cursor = paginate(await _resource_uris(), cursor, RESOURCE_PAGE_SIZE)
+    except InvalidCursorError as e:
+        raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
+
+    return ListResourcesResult(
+        resources=[_make_resource(uri) for uri in uris], nextCursor=next_cursor
+    )
+
 
-    return resources
+async def _list_resources_request(req: ListResourcesRequest) -> ServerResult:
+    cursor = req.params.cursor if req.params else None
+    return ServerResult(await handle_list_resources(cursor))
+
+
+# lowlevel 的 list_resources 装饰器不会传递 cursor，这里直接注册请求处理器
+server.request_handlers[ListResourcesRequest] = _list_resources_request
+
+
+@server.list_resource_templates()
+async def handle_list_resource_templates() -> List[ResourceTemplate]:
+    """列出资源模板，客户端无需枚举全部资源即可按表名读取"""
+    # 按配置决定模板，不等待（可能仍在后台进行的）连接
+    sources = registry.default.configured_sources()
+    templates = []
+
+    if "database" in sources:
+        templates.append(
+            ResourceTemplate(
+                uriTemplate="database://table/{table_name}",
+                name="数据库表结构",
+                description="通过数据库直连获取指定表的结构信息",
+                mimeType="application/json",
+            )
+        )
+
+    if "api" in sources:
+        templates.append(
+            ResourceTemplate(
+                uriTemplate="api://table/{table_name}",
+                name="API表结构",
+                description="通过 API 获取指定表的结构信息",
+                mimeType="application/json",
+            )
+        )
+
+    return templates
 
 
 @server.read_resource()
-async def handle_read_resource(uri: str) -> str:
-    """读取资源内容"""
+async def handle_read_resource(uri: AnyUrl) -> str:
+    """读取资源内容（资源对应默认数据源）"""
+    with _interactive_request(), metrics.operation("resource:read"):
+        text = await _read_resource(str(uri))
+        metrics.record_output(len(text.encode("utf-8")))
+        return text
+
+
+async def _read_resource(uri: str) -> str:
+    datasource = registry.default
+    await datasource.aconnect()
+    # 资源 URI 可以带 ?format= 指定输出格式，默认为缩进的 JSON
+    uri, _, query = uri.partition("?")
+    fmt = parse_qs(query).get("format", [None])[0]
+    if fmt is None:
+        fmt, render_table = "json_pretty", _format_table_json
+    elif fmt in FORMATS:
+        render_table = _table_renderers(fmt)[0]
+    else:
+        return f"不支持的格式 {fmt}，可用格式: {', '.join(FORMATS)}"
+
     try:
         if uri.startswith("database://table/"):
             table_name = uri.replace("database://table/", "")
-            if db_client:
-                table_info = db_client.get_table_info(table_name)
-                if table_info:
-                    return json.dumps(
-                        table_info.model_dump(), indent=2, ensure_ascii=False
-                    )
+            if datasource.db_client:
+                text = await datasource.render_table(
+                    table_name, "database", fmt, render_table
+                )
+                if text is not None:
+                    usage_log.record(datasource.name, table_name)
+                    return text
                 else:
                     return f"表 {table_name} 不存在或无法访问"
             else:
@@ -94,12 +269,13 @@ async def handle_read_resource(uri: str) -> str:
 
         elif uri.startswith("api://table/"):
             table_name = uri.replace("api://table/", "")
-            if api_client:
-                table_info = await api_client.get_table_info(table_name)
-                if table_info:
-                    return json.dumps(
-                        table_info.model_dump(), indent=2, ensure_ascii=False
-                    )
+            if datasource.api_client:
+                text = await datasource.render_table(
+                    table_name, "api", fmt, render_table
+                )
+                if text is not None:
+                    usage_log.record(datasource.name, table_name)
+                    return text
                 else:
                     return f"表 {table_name} 不存在或无法通过 API 访问"
             else:
@@ -112,6 +288,112 @@ async def handle_read_resource(uri: str) -> str:
         return f"读取资源时出错: {str(e)}"
 
 
+@server.subscribe_resource()
+async def handle_subscribe_resource(uri: AnyUrl) -> None:
+    """订阅资源，资源变化时推送 resources/updated 通知"""
+    uri = str(uri)
+    subscriptions.subscribe(uri, server.request_context.session)
+    change_detector.seed(await _resource_fingerprints([uri]))
+
+
+@server.unsubscribe_resource()
+async def handle_unsubscribe_resource(uri: AnyUrl) -> None:
+    """取消订阅资源"""
+    uri = str(uri)
+    subscriptions.unsubscribe(uri, server.request_context.session)
+    if not subscriptions.subscribers(uri):
+        change_detector.forget([uri])
+
+
+def _hash_table_info(table_info: Optional[TableInfo]) -> Optional[str]:
+    if table_info is None:
+        return None
+    return hashlib.sha1(table_info.model_dump_json().encode("utf-8")).hexdigest()
+
+
+async def _resource_fingerprints(uris: List[str]) -> Dict[str, Optional[str]]:
+    """计算资源指纹：低代码实体使用 updated_at 水位，其他表使用内容哈希"""
+    datasource = registry.default
+    await datasource.aconnect()
+    db_client = datasource.db_client
+    api_client = datasource.api_client
+    fingerprints: Dict[str, Optional[str]] = {}
+
+    watermarks = None
+    if db_client and any(uri.startswith("database://table/") for uri in uris):
+        # 一次查询拿到所有实体的水位，避免逐表查询
+        watermarks = await asyncio.to_thread(db_client.get_table_watermarks)
+
+    for uri in uris:
+        if uri.startswith("database://table/") and db_client:
+            table_name = uri.replace("database://table/", "")
+            if watermarks is not None and table_name in watermarks:
+                fingerprints[uri] = repr(watermarks[table_name])
+            else:
+                table_info = await asyncio.to_thread(
+                    db_client.get_table_info, table_name
+                )
+                fingerprints[uri] = _hash_table_info(table_info)
+        elif uri.startswith("api://table/") and api_client:
+            table_name = uri.replace("api://table/", "")
+            fingerprints[uri] = _hash_table_info(
+                await api_client.get_table_info(table_name)
+            )
+
+    return fingerprints
+
+
+async def _notify_resource_changes():
+    """检查被订阅的资源，只向变化资源的订阅者推送通知"""
+    uris = subscriptions.uris()
+    if not uris:
+        return
+
+    changed = change_detector.detect(await _resource_fingerprints(uris))
+    for uri in changed:
+        source, _, table_name = uri.partition("://table/")
+        registry.default.catalog.invalidate(source, table_name)
+        for session in subscriptions.subscribers(uri):
+            try:
+                await session.send_resource_updated(AnyUrl(uri))
+            except Exception as e:
+                # 会话已断开，清理其全部订阅
+                print(f"Error sending resource update for {uri}: {e}")
+                subscriptions.remove_session(session)
+
+
+async def _dump_metrics():
+    """后台任务：定期把运行统计写入 STATS_DUMP_PATH"""
+    while True:
+        await asyncio.sleep(STATS_DUMP_INTERVAL)
+        try:
+            await asyncio.to_thread(metrics.dump, STATS_DUMP_PATH)
+        except Exception as e:
+            print(f"Error dumping stats: {e}")
+
+
+async def _evict_idle_datasources():
+    """后台任务：定期回收空闲的数据源"""
+    while True:
+        await asyncio.sleep(DATASOURCE_EVICT_INTERVAL)
+        try:
+            evicted = await registry.evict_idle()
+            if evicted:
+                print(f"已回收空闲数据源: {', '.join(evicted)}")
+        except Exception as e:
+            print(f"Error evicting idle datasources: {e}")
+
+
+async def _watch_resource_changes():
+    """后台变更检测任务"""
+    while True:
+        await asyncio.sleep(RESOURCE_POLL_INTERVAL)
+        try:
+            await _notify_resource_changes()
+        except Exception as e:
+            print(f"Error checking resource changes: {e}")
+
+
 @server.list_tools()
 async def handle_list_tools() -> List[Tool]:
     """列出可用的工具"""
@@ -129,6 +411,27 @@ async def handle_list_tools() -> List[Tool]:
                         "description": "数据源类型：database(直连数据库)、api(通过API)、auto(自动选择)",
                         "default": "auto",
                     },
+                    "format": {
+                        "type": "string",
+                        "enum": list(FORMATS),
+                        "description": "输出格式：markdown 表格，json / jsonl / csv 便于程序解析，compact 为最省 token 的紧凑表示",
+                        "default": "markdown",
+                    },
+                    "exclude_system": {
+                        "type": "boolean",
+                        "description": "不返回系统字段（创建人、更新时间等）",
+                        "default": False,
+                    },
+                    "columns": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "只返回这些字段（字段编码或属性名称）",
+                    },
+                    "column_pattern": {
+                        "type": "string",
+                        "description": "只返回编码匹配该通配符的字段，例如 user_*",
+                    },
+                    **PAGE_PROPERTIES,
                 },
                 "required": ["table_name"],
             },
@@ -170,19 +473,135 @@ async def handle_list_tools() -> List[Tool]:
             description="获取表的详细文档说明",
             inputSchema={
                 "type": "object",
-                "properties": {"table_name": {"type": "string", "description": "表名"}},
+                "properties": {
+                    "table_name": {"type": "string", "description": "表名"},
+                    **PAGE_PROPERTIES,
+                },
                 "required": ["table_name"],
             },
         ),
     ]
 
+    federated_search_tool = Tool(
+        name="federated_search",
+        description="在所有已配置的数据源中并发搜索表，结果按匹配程度排序并标注来源数据源。单个数据源超时或不可用不影响其他数据源的结果。",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "keyword": {"type": "string", "description": "搜索关键词"},
+                "datasources": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": registry.names()},
+                    "description": "只搜索这些数据源，默认搜索全部",
+                },
+                "timeout": {
+                    "type": "number",
+                    "description": "每个数据源的搜索时限（秒）",
+                    "default": DEFAULT_SEARCH_TIMEOUT,
+                },
+            },
+            "required": ["keyword"],
+        },
+    )
+
+    # 所有工具都可以通过 datasource 参数选择命名数据源
+    for tool in tools:
+        tool.inputSchema["properties"]["datasource"] = {
+            "type": "string",
+            "enum": registry.names(),
+            "description": "数据源名称，多数据源部署时使用",
+            "default": DEFAULT_DATASOURCE,
+        }
+
+    tools.append(federated_search_tool)
+    tools.append(
+        Tool(
+            name="server_stats",
+            description="查看服务器运行统计：各工具和资源请求的延迟分布、执行的 SQL 语句数、HTTP 请求数、缓存命中率和输出字节数",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "format": {
+                        "type": "string",
+                        "enum": ["markdown", "json"],
+                        "description": "输出格式",
+                        "default": "markdown",
+                    },
+                    "reset": {
+                        "type": "boolean",
+                        "description": "返回后清空统计",
+                        "default": False,
+                    },
+                },
+            },
+        )
+    )
     return tools
 
 
+# 统计中按名称区分的工具，其他名称的调用记为 tool:unknown
+_TOOL_NAMES = frozenset(
+    {
+        "get_table_info",
+        "search_tables",
+        "list_all_tables",
+        "get_table_documentation",
+        "federated_search",
+        "server_stats",
+    }
+)
+
+
+# get_table_info / get_table_documentation 的字段分页参数，用于字段很多的宽表
+PAGE_PROPERTIES = {
+    "limit": {"type": "integer", "minimum": 1, "description": "本页最多返回的字段数"},
+    "offset": {
+        "type": "integer",
+        "minimum": 0,
+        "description": "从第几个字段开始（从 0 开始计数）",
+        "default": 0,
+    },
+    "max_tokens": {
+        "type": "integer",
+        "minimum": 1,
+        "description": "本页输出的估计 token 上限，超出前截断并返回下一页 cursor",
+    },
+    "cursor": {
+        "type": "string",
+        "description": "上一页返回的 cursor，优先于 offset",
+    },
+}
+
+
 @server.call_tool()
 async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
     """处理工具调用"""
+    operation = f"tool:{name if name in _TOOL_NAMES else 'unknown'}"
+    with _interactive_request(), metrics.operation(operation):
+        contents = await _call_tool(name, arguments)
+        metrics.record_output(
+            sum(len(content.text.encode("utf-8")) for content in contents)
+        )
+        return contents
+
+
+async def _call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
+    if name == "server_stats":
+        return _server_stats(arguments)
     try:
+        try:
+            datasource = registry.get(arguments.get("datasource"))
+        except UnknownDataSourceError as e:
+            return [
+                TextContent(
+                    type="text",
+                    text=f"错误：未知数据源 {e}，可用数据源: {', '.join(registry.names())}",
+                )
+            ]
+        # 跨数据源搜索自己在时限内连接各数据源，不等待默认数据源
+        if name != "federated_search":
+            await datasource.aconnect()
+
         if name == "get_table_info":
             table_name = arguments.get("table_name")
             source = arguments.get("source", "auto")
@@ -190,11 +609,29 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
             if not table_name:
                 return [TextContent(type="text", text="错误：缺少表名参数")]
 
-            table_info = await _get_table_info(table_name, source)
-            if table_info:
-                # 格式化输出
-                output = _format_table_info(table_info)
-                return [TextContent(type="text", text=output)]
+            fmt = arguments.get("format", "markdown")
+            if fmt not in FORMATS:
+                return [
+                    TextContent(
+                        type="text",
+                        text=f"错误：不支持的格式 {fmt}，可用格式: {', '.join(FORMATS)}",
+                    )
+                ]
+            try:
+                page = parse_page_arguments(arguments, table_name)
+            except (TypeError, ValueError) as e:
+                return [TextContent(type="text", text=f"错误：分页参数无效: {e}")]
+            try:
+                column_filter = ColumnFilter.from_arguments(arguments)
+            except ValueError as e:
+                return [TextContent(type="text", text=f"错误：字段筛选参数无效: {e}")]
+
+            contents = await _table_info_contents(
+                datasource, table_name, source, fmt, page, column_filter
+            )
+            if contents is not None:
+                usage_log.record(datasource.name, table_name)
+                return contents
             else:
                 return [
                     TextContent(type="text", text=f"未找到表 '{table_name}' 的信息")
@@ -207,7 +644,7 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
             if not keyword:
                 return [TextContent(type="text", text="错误：缺少搜索关键词")]
 
-            tables = await _search_tables(keyword, source)
+            tables = await datasource.search_tables(keyword, source)
             if tables:
                 output = f"找到 {len(tables)} 个匹配的表：\n\n"
                 for table in tables:
@@ -224,7 +661,7 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
         elif name == "list_all_tables":
             source = arguments.get("source", "auto")
 
-            tables = await _list_all_tables(source)
+            tables = await datasource.list_all_tables(source)
             if tables:
                 output = f"数据库中共有 {len(tables)} 个表：\n\n"
                 for table_name in sorted(tables):
@@ -239,179 +676,752 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
             if not table_name:
                 return [TextContent(type="text", text="错误：缺少表名参数")]
 
-            # 首先尝试获取表信息
-            table_info = await _get_table_info(table_name, "auto")
-            if not table_info:
+            try:
+                page = parse_page_arguments(arguments, table_name)
+            except (TypeError, ValueError) as e:
+                return [TextContent(type="text", text=f"错误：分页参数无效: {e}")]
+
+            # 首先尝试获取表信息（使用缓存的渲染结果）
+            header = await datasource.render_table(
+                table_name, "auto", "documentation_header", _format_documentation_header
+            )
+            if header is None:
                 return [
                     TextContent(type="text", text=f"未找到表 '{table_name}' 的信息")
                 ]
+            usage_log.record(datasource.name, table_name)
 
-            # 如果有 API 客户端，尝试获取文档
+            # 如果有 API 客户端，尝试获取文档（分页时只在第一页输出）
             documentation = ""
-            if api_client:
+            if datasource.api_client and (page is None or page[0] == 0):
                 try:
-                    documentation = await api_client.get_table_documentation(table_name)
+                    documentation = await datasource.api_client.get_table_documentation(
+                        table_name
+                    )
                 except Exception as e:
                     print(f"Error getting documentation: {e}")
 
+            if page is None:
+                table_markdown = await datasource.render_table(
+                    table_name, "auto", "markdown", _format_table_info
+                )
+            else:
+                reserved = estimate_tokens(
+                    _join_table_documentation(header, "", documentation)
+                )
+                result = await _format_table_page(
+                    table_name,
+                    _table_slicer(datasource, table_name, "auto"),
+                    page,
+                    reserved,
+                )
+                table_markdown = result and f"{result[0]}\n{result[1]}"
+            if table_markdown is None:
+                return [
+                    TextContent(type="text", text=f"未找到表 '{table_name}' 的信息")
+                ]
+
             # 生成完整的文档
-            output = _format_table_documentation(table_info, documentation)
+            output = _join_table_documentation(header, table_markdown, documentation)
             return [TextContent(type="text", text=output)]
 
+        elif name == "federated_search":
+            keyword = arguments.get("keyword")
+
+            if not keyword:
+                return [TextContent(type="text", text="错误：缺少搜索关键词")]
+
+            names = arguments.get("datasources") or registry.names()
+            try:
+                datasources = [registry.get(ds_name) for ds_name in names]
+            except UnknownDataSourceError as e:
+                return [TextContent(type="text", text=f"错误：未知数据源 {e}")]
+
+            matches, statuses = await federated_search(
+                datasources, keyword, arguments.get("timeout")
+            )
+            return [
+                TextContent(
+                    type="text", text=_format_federated_results(keyword, matches, statuses)
+                )
+            ]
+
         else:
             return [TextContent(type="text", text=f"未知工具: {name}")]
 
     except Exception as e:
+        metrics.record_error()
         return [TextContent(type="text", text=f"工具调用出错: {str(e)}")]
 
 
-async def _get_table_info(table_name: str, source: str) -> Optional[TableInfo]:
-    """获取表信息的内部方法"""
-    if source == "database" and db_client:
-        return db_client.get_table_info(table_name)
-    elif source == "api" and api_client:
-        return await api_client.get_table_info(table_name)
-    elif source == "auto":
-        # 优先使用数据库直连，然后是 API
-        if db_client:
-            result = db_client.get_table_info(table_name)
-            if result:
-                return result
-        if api_client:
-            return await api_client.get_table_info(table_name)
-
-    return None
-
-
-async def _search_tables(keyword: str, source: str) -> List[TableInfo]:
-    """搜索表的内部方法"""
-    if source == "database" and db_client:
-        return db_client.search_tables(keyword)
-    elif source == "api" and api_client:
-        return await api_client.search_tables(keyword)
-    elif source == "auto":
-        # 优先使用数据库直连
-        if db_client:
-            result = db_client.search_tables(keyword)
-            if result:
-                return result
-        if api_client:
-            return await api_client.search_tables(keyword)
-
-    return []
-
-
-async def _list_all_tables(source: str) -> List[str]:
-    """列出所有表的内部方法"""
-    if source == "database" and db_client:
-        return db_client.get_all_tables()
-    elif source == "api" and api_client:
-        return await api_client.get_all_tables()
-    elif source == "auto":
-        # 优先使用数据库直连
-        if db_client:
-            result = db_client.get_all_tables()
-            if result:
-                return result
-        if api_client:
-            return await api_client.get_all_tables()
-
-    return []
+def _server_stats(arguments: Dict[str, Any]) -> List[TextContent]:
+    """server_stats 工具：返回运行统计，reset 为真时随后清空"""
+    snapshot = metrics.snapshot()
+    if arguments.get("reset"):
+        metrics.reset()
+    if arguments.get("format") == "json":
+        text = json.dumps(snapshot, ensure_ascii=False, indent=2)
+    else:
+        text = _format_server_stats(snapshot)
+    return [TextContent(type="text", text=text)]
+
+
+def _format_server_stats(snapshot: Dict[str, Any]) -> str:
+    """运行统计的 markdown 表示"""
+    lines = [
+        "# 服务器运行统计\n",
+        f"进程 {snapshot['pid']}，自 {snapshot['started_at']} 起"
+        f"（{snapshot['uptime_s']:g} 秒）\n",
+        "## 请求\n",
+        "| 操作 | 次数 | 错误 | p50 (ms) | p95 (ms) | p99 (ms) | 最大 (ms)"
+        " | SQL/次 | HTTP 请求 | 输出字节 |",
+        "|------|------|------|----------|----------|----------|-----------"
+        "|--------|-----------|----------|",
+    ]
+    for name, op in snapshot["operations"].items():
+        lines.append(
+            f"| {name} | {op['count']} | {op['errors']} | {op['p50_ms']:g}"
+            f" | {op['p95_ms']:g} | {op['p99_ms']:g} | {op['max_ms']:g}"
+            f" | {op['sql_per_call']:g} | {op['http_requests']}"
+            f" | {op['bytes_emitted']} |"
+        )
+    lines += [
+        "",
+        "## 缓存\n",
+        "| 缓存 | 命中 | 未命中 | 命中率 |",
+        "|------|------|--------|--------|",
+    ]
+    for kind, cache in snapshot["cache"].items():
+        lines.append(
+            f"| {kind} | {cache['hits']} | {cache['misses']}"
+            f" | {cache['hit_ratio']:.1%} |"
+        )
+    sql, http = snapshot["sql"], snapshot["http"]
+    lines += [
+        "",
+        f"- SQL 语句: {sql['statements']}，共 {sql['total_ms']:g} ms",
+        f"- HTTP 请求: {http['requests']}，错误响应 {http['error_responses']}，"
+        f"共 {http['total_ms']:g} ms",
+    ]
+    trace = snapshot.get("sql_trace")
+    if trace is not None:
+        lines += _format_sql_trace(trace)
+    lines += ["", "延迟百分位数为所在直方图桶的上界。"]
+    return "\n".join(lines)
+
+
+def _format_sql_trace(trace: Dict[str, Any]) -> List[str]:
+    """SQL 跟踪部分：各操作的语句数和疑似 N+1 的语句形状"""
+    lines = [
+        "",
+        "## SQL 跟踪\n",
+        "| 操作 | 请求数 | 语句/次 | 最多/次 | 最耗时的语句 |",
+        "|------|--------|---------|---------|--------------|",
+    ]
+    for name, op in trace["operations"].items():
+        top = f"`{op['shapes'][0]['sql'][:80]}`" if op["shapes"] else ""
+        lines.append(
+            f"| {name} | {op['calls']} | {op['statements_per_call']:g}"
+            f" | {op['max_statements_per_call']} | {top} |"
+        )
+    lines.append("")
+    if not trace["n_plus_one"]:
+        lines.append(
+            f"未发现同一请求中执行 {trace['repeat_threshold']} 次以上的语句形状。"
+        )
+        return lines
+    lines.append(
+        f"疑似 N+1（同一请求中执行 {trace['repeat_threshold']} 次以上的语句形状）：\n"
+    )
+    for finding in trace["n_plus_one"]:
+        lines.append(
+            f"- {finding['operation']}：{finding['calls']} 次请求，单次最多"
+            f" {finding['max_repeats']} 次 `{finding['sql']}`"
+        )
+    return lines
 
 
-def _format_table_info(table_info: TableInfo) -> str:
-    """格式化表信息输出"""
-    output = f"# {table_info.name} 表结构信息\n\n"
+def _format_federated_results(
+    keyword: str,
+    matches: List[FederatedMatch],
+    statuses: List[SourceSearchStatus],
+) -> str:
+    """格式化跨数据源搜索结果"""
+    if matches:
+        output = f"在 {len(statuses)} 个数据源中找到 {len(matches)} 个匹配 '{keyword}' 的表：\n\n"
+    else:
+        output = f"未在任何数据源中找到包含关键词 '{keyword}' 的表\n\n"
+
+    for match in matches:
+        output += f"## {match.table.name}\n"
+        output += f"**数据源**: {match.datasource} ({match.source})\n"
+        if match.table.comment:
+            output += f"**说明**: {match.table.comment}\n"
+        output += f"**字段数**: {len(match.table.columns)}\n\n"
+
+    for status in statuses:
+        if status.status == "timeout":
+            output += f"⚠️ 数据源 {status.datasource} ({status.source}) 超时，结果可能不完整\n"
+        elif status.status == "error":
+            output += f"⚠️ 数据源 {status.datasource} ({status.source}) 出错: {status.error}\n"
+
+    return output
+
 
+def _format_table_head(table_info: TableInfo) -> str:
+    """表结构信息的标题、表说明和字段表头"""
+    parts = [f"# {table_info.name} 表结构信息\n\n"]
     if table_info.comment:
-        output += f"**表说明**: {table_info.comment}\n\n"
+        parts.append(f"**表说明**: {table_info.comment}\n\n")
+    parts.append(
+        "## 字段信息\n\n"
+        "| 属性名称 | 编码 | 数据类型 | 主键 | 系统字段 |\n"
+        "|----------|------|----------|------|--------|\n"
+    )
+    return "".join(parts)
 
-    output += "## 字段信息\n\n"
-    output += "| 属性名称 | 编码 | 数据类型 | 主键 | 系统字段 |\n"
-    output += "|----------|------|----------|------|--------|\n"
 
-    for column in table_info.columns:
-        primary_key = "是" if column.is_primary_key else ""
-        is_system = "是" if column.is_system else ""
+def _format_column_row(column: ColumnInfo) -> str:
+    """字段表中的一行"""
+    primary_key = "是" if column.is_primary_key else ""
+    is_system = "是" if column.is_system else ""
+    return f"| {column.name} | {column.code} | {column.type} | {primary_key} | {is_system} |\n"
 
-        output += f"| {column.name} | {column.code} | {column.type} | {primary_key} | {is_system} |\n"
 
+def _format_table_tail(table_info: TableInfo) -> str:
+    """索引和外键信息"""
+    parts = []
     if table_info.indexes:
-        output += "\n## 索引信息\n\n"
+        parts.append("\n## 索引信息\n\n")
         for index in table_info.indexes:
             index_type = "唯一索引" if index.get("unique") else "普通索引"
             columns = ", ".join(index.get("columns", []))
-            output += f"- **{index.get('name')}** ({index_type}): {columns}\n"
+            parts.append(f"- **{index.get('name')}** ({index_type}): {columns}\n")
 
     if table_info.foreign_keys:
-        output += "\n## 外键关系\n\n"
-        for fk in table_info.foreign_keys:
-            output += f"- {fk.get('column')} → {fk.get('referenced_table')}.{fk.get('referenced_column')}\n"
+        parts.append("\n## 外键关系\n\n")
+        parts.extend(
+            f"- {fk.get('column')} → {fk.get('referenced_table')}.{fk.get('referenced_column')}\n"
+            for fk in table_info.foreign_keys
+        )
+    return "".join(parts)
 
-    return output
+
+def _format_table_info(table_info: TableInfo) -> str:
+    """格式化表信息输出（各部分收集到列表中，最后一次拼接）"""
+    parts = [_format_table_head(table_info)]
+    parts.extend(_format_column_row(column) for column in table_info.columns)
+    parts.append(_format_table_tail(table_info))
+    return "".join(parts)
+
+
+def _table_slicer(
+    datasource: DataSource, table_name: str, source: str
+) -> Callable[[int, Optional[int]], Awaitable[Optional[Tuple[TableInfo, int]]]]:
+    """从表目录缓存中按段还原字段"""
+
+    async def load_slice(start: int, stop: Optional[int]):
+        return await datasource.table_slice(table_name, source, start, stop)
+
+    return load_slice
+
+
+def _list_slicer(
+    table_info: TableInfo,
+) -> Callable[[int, Optional[int]], Awaitable[Optional[Tuple[TableInfo, int]]]]:
+    """从已经获取到的 TableInfo（例如筛选后的结果）中按段取字段"""
+    columns = table_info.columns
+
+    async def load_slice(start: int, stop: Optional[int]):
+        page = table_info.model_copy(update={"columns": columns[start:stop]})
+        return page, len(columns)
+
+    return load_slice
+
+
+def _table_renderers(
+    fmt: str,
+) -> Tuple[Callable[[TableInfo], str], Callable[[ColumnInfo], str]]:
+    """格式对应的 (整表渲染, 单个字段渲染) 函数"""
+    if fmt == "markdown":
+        return _format_table_info, _format_column_row
+    return RENDERERS[fmt]
+
+
+async def _format_table_page(
+    table_name: str,
+    load_slice: Callable[
+        [int, Optional[int]], Awaitable[Optional[Tuple[TableInfo, int]]]
+    ],
+    page: Tuple[int, Optional[int], Optional[int]],
+    reserved_tokens: int = 0,
+    fmt: str = "markdown",
+) -> Optional[Tuple[str, str]]:
+    """按 (offset, limit, max_tokens) 输出表结构的一页字段，返回 (正文, 页脚)，
+    表不存在时返回 None
+
+    load_slice(start, stop) 返回只包含这一段字段的 TableInfo 和字段总数，
+    通常从表目录缓存中按段还原，不重新查询数据源。设置了 max_tokens 时逐个字段
+    累计估计的 token 数（reserved_tokens 为同一响应中其他内容占用的部分），超出
+    预算前停止，但每页至少包含一个字段。索引和外键只在最后一页输出。
+    """
+    render_table, render_column = _table_renderers(fmt)
+    offset, limit, max_tokens = page
+    stop = offset + limit if limit is not None else None
+    columns: List[ColumnInfo] = []
+    head_info: Optional[TableInfo] = None
+    used = reserved_tokens + FOOTER_TOKENS
+    position = offset
+    total = 0
+    exhausted = False
+    while not exhausted and (stop is None or position < stop):
+        chunk_stop = position + COLUMN_CHUNK_SIZE
+        if stop is not None:
+            chunk_stop = min(chunk_stop, stop)
+        result = await load_slice(position, chunk_stop)
+        if result is None:
+            return None
+        table_info, total = result
+        if head_info is None:
+            head_info = table_info
+            empty = table_info.model_copy(
+                update={"columns": [], "indexes": [], "foreign_keys": []}
+            )
+            used += estimate_tokens(render_table(empty))
+        if not table_info.columns:
+            break
+
+        for column in table_info.columns:
+            cost = estimate_tokens(render_column(column))
+            if max_tokens is not None and columns and used + cost > max_tokens:
+                exhausted = True
+                break
+            columns.append(column)
+            used += cost
+            position += 1
+        if position >= total:
+            break
+
+    update: Dict[str, Any] = {"columns": columns}
+    if position < total:
+        update.update(indexes=[], foreign_keys=[])
+    body = render_table(head_info.model_copy(update=update))
+
+    if columns:
+        footer = f"> 第 {offset + 1}-{position} 个字段（共 {total} 个）"
+    else:
+        footer = f"> 没有更多字段（共 {total} 个）"
+    if position < total:
+        footer += f"，下一页 cursor: `{encode_page_cursor(table_name, position)}`"
+    tokens = estimate_tokens(body) + estimate_tokens(footer) + reserved_tokens
+    return body, f"{footer}\n> 估计 {tokens} tokens\n"
+
+
+async def _table_info_contents(
+    datasource: DataSource,
+    table_name: str,
+    source: str,
+    fmt: str,
+    page: Optional[Tuple[int, Optional[int], Optional[int]]],
+    column_filter: Optional[ColumnFilter],
+) -> Optional[List[TextContent]]:
+    """get_table_info 的输出内容，表不存在时返回 None"""
+    render_table = _table_renderers(fmt)[0]
+    if column_filter is None and page is None:
+        # 渲染结果随表结构缓存，重复查询同一个表时不再重新格式化
+        output = await datasource.render_table(table_name, source, fmt, render_table)
+        return None if output is None else [TextContent(type="text", text=output)]
+
+    if column_filter is None:
+        load_slice = _table_slicer(datasource, table_name, source)
+    else:
+        # 筛选在查询或紧凑缓存中完成，只还原和渲染需要的字段
+        table_info = await datasource.filtered_table_info(
+            table_name, source, column_filter
+        )
+        if table_info is None:
+            return None
+        if page is None:
+            return [TextContent(type="text", text=render_table(table_info))]
+        load_slice = _list_slicer(table_info)
+
+    result = await _format_table_page(table_name, load_slice, page, fmt=fmt)
+    return None if result is None else _page_contents(fmt, *result)
+
+
+def _page_contents(fmt: str, body: str, footer: str) -> List[TextContent]:
+    """markdown 的页脚接在正文后面，其他格式的页脚单独作为一项，不影响解析正文"""
+    if fmt == "markdown":
+        return [TextContent(type="text", text=f"{body}\n{footer}")]
+    return [TextContent(type="text", text=body), TextContent(type="text", text=footer)]
+
+
+def _format_table_json(table_info: TableInfo) -> str:
+    """资源读取返回的 JSON 格式表信息"""
+    return json.dumps(table_info.model_dump(), indent=2, ensure_ascii=False)
+
+
+def _format_documentation_header(table_info: TableInfo) -> str:
+    """表文档的标题和表说明"""
+    parts = [f"# {table_info.name} 表文档\n\n"]
+    if table_info.comment:
+        parts.append(f"## 表说明\n\n{table_info.comment}\n\n")
+    return "".join(parts)
+
+
+def _join_table_documentation(
+    header: str, table_markdown: str, documentation: Optional[str] = None
+) -> str:
+    """拼接表文档：标题、API 提供的详细文档和表结构"""
+    if documentation:
+        return f"{header}## 详细文档\n\n{documentation}\n\n{table_markdown}"
+    return header + table_markdown
 
 
 def _format_table_documentation(
     table_info: TableInfo, documentation: Optional[str] = None
 ) -> str:
     """格式化表文档"""
-    output = f"# {table_info.name} 表文档\n\n"
+    return _join_table_documentation(
+        _format_documentation_header(table_info),
+        _format_table_info(table_info),
+        documentation,
+    )
 
-    if table_info.comment:
-        output += f"## 表说明\n\n{table_info.comment}\n\n"
 
-    if documentation:
-        output += f"## 详细文档\n\n{documentation}\n\n"
+def _init_clients():
+    """连接默认数据源，其他命名数据源在首次使用时再连接"""
+    datasource = registry.default
+    datasource.connect()
 
-    output += _format_table_info(table_info)
+    if not datasource.db_client and not datasource.api_client:
+        print("警告: 没有配置任何数据源，请检查环境变量配置")
 
-    return output
+    if len(registry.names()) > 1:
+        print(f"已注册数据源: {', '.join(registry.names())}")
 
+    if CATALOG_FILE and os.path.exists(CATALOG_FILE):
+        try:
+            mapped = MappedCatalog(CATALOG_FILE)
+        except (OSError, CatalogFileError) as e:
+            print(f"Error mapping catalog file {CATALOG_FILE}: {e}")
+        else:
+            datasource.catalog.attach(mapped)
+            print(f"已映射目录文件 {CATALOG_FILE}（{len(mapped)} 个表）")
 
-async def main():
-    """主函数"""
-    global db_client, api_client
 
-    # 初始化数据库客户端
-    database_url = os.getenv("DATABASE_URL")
-    if database_url:
+async def _follow_catalog_file():
+    """后台任务：目录文件被替换后重新映射"""
+    from .workers import SnapshotFollower
+
+    follower = SnapshotFollower(CATALOG_FILE)
+    follower.mark_current()
+    while True:
+        await asyncio.sleep(SNAPSHOT_POLL_INTERVAL)
         try:
-            db_client = DatabaseClient(database_url)
-            print("数据库连接已建立")
-        except Exception as e:
-            print(f"数据库连接失败: {e}")
+            mapped = follower.poll()
+        except (OSError, CatalogFileError) as e:
+            print(f"Error mapping catalog file {CATALOG_FILE}: {e}")
+            continue
+        if mapped is not None:
+            registry.default.catalog.attach(mapped)
+
+
+def _background_tasks() -> List[Any]:
+    """stdio / 单进程 HTTP 模式下随服务器运行的后台任务"""
+    tasks = [_watch_resource_changes, _evict_idle_datasources]
+    if CATALOG_FILE:
+        tasks.append(_follow_catalog_file)
+    if STATS_DUMP_PATH:
+        tasks.append(_dump_metrics)
+    return tasks
+
+
+def _write_catalog(path: str):
+    """加载默认数据源的全部表结构并写入目录文件"""
+    _init_clients()
+    catalog = TableCatalog(ttl=math.inf)
+    count = asyncio.run(registry.default.preload(catalog))
+    # 以写入时间作为版本号，重新生成的文件版本号总是更大
+    write_catalog_file(path, catalog.tables(), version=int(time.time()))
+    print(f"已将 {count} 个表写入目录文件 {path}")
+
+
+def _export_schema(path: str, compression: Optional[str], batch_size: int):
+    """按批读取默认数据库的全部表结构，逐行写入 JSON Lines 文件"""
+    from sqlalchemy.exc import SQLAlchemyError
+
+    # 导出到标准输出时，连接提示和错误信息都写到标准错误，不混入导出内容
+    stdout = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        datasource = registry.default
+        datasource.connect()
+        if not datasource.db_client:
+            print("错误: 导出表结构需要配置 DATABASE_URL")
+            sys.exit(1)
+
+        try:
+            if path == "-":
+                count = write_jsonl(
+                    datasource.db_client.iter_table_infos(batch_size=batch_size),
+                    stdout.buffer,
+                    compression,
+                )
+                stdout.flush()
+            else:
+                count = export_schema(
+                    datasource.db_client,
+                    path,
+                    compression=compression,
+                    batch_size=batch_size,
+                )
+        except (SQLAlchemyError, ValueError) as e:
+            # 读取失败或压缩方式不可用（例如未安装 zstandard）；导出到文件时临时
+            # 文件已删除，不会留下不完整的导出
+            print(f"错误: 导出表结构失败: {e}")
+            sys.exit(1)
+        print(f"已导出 {count} 个表的结构到 {path}")
 
-    # 初始化 API 客户端
-    api_base_url = os.getenv("API_BASE_URL")
-    if api_base_url:
+
+async def _warm_up():
+    """后台连接默认数据源
+
+    连接（可能经过较慢的 VPN）不阻塞 MCP 握手；在连接完成前到达的请求会等待
+    同一次连接，而不是重复建立。
+    """
+    try:
+        await asyncio.to_thread(_init_clients)
+    except Exception as e:
+        print(f"Error connecting default datasource: {e}")
+        return
+    await _prewarm_popular_tables()
+
+
+async def _prewarm_popular_tables():
+    """按访问记录预热默认数据源最常用的表，有交互请求时暂停"""
+    await asyncio.to_thread(usage_log.load)
+    datasource = registry.default
+    table_names = usage_log.top(datasource.name, PREWARM_TOP_N)
+    if not table_names:
+        return
+
+    loaded = await prewarm(
+        table_names,
+        lambda table_name: datasource.get_table_info(table_name, "auto"),
+        lambda: _active_requests > 0,
+        PREWARM_DELAY,
+    )
+    print(f"已预热 {loaded} 个常用表")
+
+
+async def _flush_usage_log():
+    """后台任务：定期保存表访问记录"""
+    while True:
+        await asyncio.sleep(USAGE_LOG_FLUSH_INTERVAL)
         try:
-            api_client = APIClient()
-            print("API 客户端已初始化")
+            await asyncio.to_thread(usage_log.save)
         except Exception as e:
-            print(f"API 客户端初始化失败: {e}")
+            print(f"Error saving usage log: {e}")
 
-    if not db_client and not api_client:
-        print("警告: 没有配置任何数据源，请检查环境变量配置")
 
-    # 启动服务器
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="sp-database-mcp",
-                server_version="0.1.2",
-                capabilities=server.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities=None,
-                ),
-            ),
-        )
+async def _run_stdio(stdout: TextIO):
+    """通过 stdio 为单个客户端提供服务，JSON-RPC 消息写入 stdout"""
+    import anyio
+
+    tasks = [asyncio.create_task(task()) for task in _background_tasks()]
+    protocol_out = anyio.wrap_file(io.TextIOWrapper(stdout.buffer, encoding="utf-8"))
+    try:
+        async with stdio_server(stdout=protocol_out) as (read_stream, write_stream):
+            await server.run(
+                read_stream,
+                write_stream,
+                server.create_initialization_options(),
+            )
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _run_http(host: str, port: int):
+    """通过 HTTP 为多个客户端提供服务，所有会话共享连接池和缓存"""
+    import uvicorn
+
+    from .http_server import create_app
+
+    app = create_app(server, background_tasks=_background_tasks())
+    config = uvicorn.Config(app, host=host, port=port, log_level="info")
+    await uvicorn.Server(config).serve()
+
+
+def _run_workers(host: str, port: int, worker_count: int):
+    """预加载表目录后 fork 多个 worker 共享监听 socket 提供 HTTP 服务
+
+    父进程把目录写入二进制目录文件，所有进程以只读 mmap 共享文件内容，而不是
+    各自在堆中保存一份；父进程每隔 CATALOG_REFRESH_INTERVAL 秒重新加载目录并
+    替换目录文件，worker 检测到文件被替换后重新映射。预加载和目录文件只针对
+    默认数据源，其他命名数据源在 worker 中按需连接。
+    """
+    import uvicorn
+
+    from .http_server import create_app
+    from .workers import SnapshotFollower, WorkerPool, create_listen_socket
+
+    refresh_interval = float(os.getenv("CATALOG_REFRESH_INTERVAL", "300"))
+    snapshot_dir = tempfile.mkdtemp(prefix="sp-database-mcp-")
+    snapshot_path = os.path.join(snapshot_dir, "catalog.bin")
+
+    datasource = registry.default
+    catalog = datasource.catalog
+
+    # worker 的目录只通过目录文件刷新，不按 TTL 自行过期
+    catalog.ttl = math.inf
+
+    def publish(loaded: TableCatalog, version: int):
+        write_catalog_file(snapshot_path, loaded.tables(), version)
+        # 父进程也只保留映射，fork 出的 worker 继承同一个映射
+        catalog.invalidate()
+        catalog.attach(MappedCatalog(snapshot_path))
+
+    loaded = TableCatalog(ttl=math.inf)
+    print(f"已预加载 {asyncio.run(datasource.preload(loaded))} 个表")
+    publish(loaded, catalog.version + 1)
+
+    def refresh():
+        fresh = TableCatalog(ttl=math.inf)
+        # 数据源暂时不可用时保留旧目录，避免向 worker 发布空目录
+        if asyncio.run(datasource.preload(fresh)) == 0:
+            return
+        publish(fresh, catalog.version + 1)
+
+    sock = create_listen_socket(host, port)
+
+    def run_worker():
+        for forked in registry.datasources():
+            forked.after_fork()
+
+        follower = SnapshotFollower(snapshot_path)
+        follower.mark_current()
+
+        async def follow_snapshot():
+            while True:
+                await asyncio.sleep(SNAPSHOT_POLL_INTERVAL)
+                try:
+                    mapped = follower.poll()
+                except (OSError, CatalogFileError) as e:
+                    print(f"Error mapping catalog file {snapshot_path}: {e}")
+                    continue
+                if mapped is not None:
+                    catalog.attach(mapped)
+
+        background_tasks = [follow_snapshot, _evict_idle_datasources]
+        if STATS_DUMP_PATH:
+            # 各 worker 分别统计，STATS_DUMP_PATH 中可用 {pid} 区分文件
+            background_tasks.append(_dump_metrics)
+        app = create_app(server, background_tasks=background_tasks, stateless=True)
+        config = uvicorn.Config(app, log_level="info")
+        asyncio.run(uvicorn.Server(config).serve(sockets=[sock]))
+
+    print(f"启动 {worker_count} 个 worker，监听 http://{host}:{port}/mcp")
+    try:
+        WorkerPool(worker_count, run_worker).run(refresh, refresh_interval)
+    finally:
+        sock.close()
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+
+async def main(transport: str = "stdio", host: str = "127.0.0.1", port: int = 8000):
+    """主函数"""
+    # stdio 模式下标准输出是 JSON-RPC 消息流，连接、预热等提示和错误信息（包括
+    # 工作线程中的）改写到标准错误
+    stdout = sys.stdout
+    if transport == "http":
+        redirect = contextlib.nullcontext()
+    else:
+        redirect = contextlib.redirect_stdout(sys.stderr)
+
+    with redirect:
+        # 连接在后台进行，服务器立即开始响应 initialize
+        warm_up = asyncio.create_task(_warm_up())
+        flush = asyncio.create_task(_flush_usage_log())
+
+        # 启动服务器
+        try:
+            if transport == "http":
+                await _run_http(host, port)
+            else:
+                await _run_stdio(stdout)
+        finally:
+            warm_up.cancel()
+            flush.cancel()
+            try:
+                usage_log.save()
+            except Exception as e:
+                print(f"Error saving usage log: {e}")
+            if STATS_DUMP_PATH:
+                try:
+                    metrics.dump(STATS_DUMP_PATH)
+                except Exception as e:
+                    print(f"Error dumping stats: {e}")
 
 
 def cli_main():
     """命令行入口点"""
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(
+        prog="sp-database-mcp", description="SP Database MCP Server"
+    )
+    parser.add_argument(
+        "--transport",
+        choices=["stdio", "http"],
+        default=os.getenv("MCP_TRANSPORT", "stdio"),
+        help="传输方式：stdio(默认，单客户端) 或 http(Streamable HTTP/SSE，多客户端共享)",
+    )
+    parser.add_argument(
+        "--host", default=os.getenv("MCP_HOST", "127.0.0.1"), help="HTTP 监听地址"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=int(os.getenv("MCP_PORT", "8000")),
+        help="HTTP 监听端口",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("MCP_WORKERS", "1")),
+        help="HTTP 模式下的 worker 进程数，大于 1 时启用预加载 + fork 的多进程模式",
+    )
+    parser.add_argument(
+        "--write-catalog",
+        metavar="PATH",
+        help="加载默认数据源的全部表结构写入目录文件后退出，配合 CATALOG_FILE 使用",
+    )
+    parser.add_argument(
+        "--export-schema",
+        metavar="PATH",
+        help="按批读取默认数据库的全部表结构，流式写入 JSON Lines 文件后退出（- 为标准输出）",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=COMPRESSIONS,
+        help="导出文件的压缩方式，默认按扩展名（.gz/.zst）推断",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=500,
+        help="导出时每批读取的实体数",
+    )
+    args = parser.parse_args()
+
+    if args.export_schema:
+        _export_schema(args.export_schema, args.compression, args.batch_size)
+    elif args.write_catalog:
+        _write_catalog(args.write_catalog)
+    elif args.transport == "http" and args.workers > 1:
+        _init_clients()
+        _run_workers(args.host, args.port, args.workers)
+    else:
+        asyncio.run(main(args.transport, args.host, args.port))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,242 @@
+"""SQL 跟踪模块 - 按请求统计 SQL 语句的形状和耗时，发现重复执行的语句（N+1）
+
+SQLTracer 挂在运行统计（metrics.sql_tracer）上，由 SQL_TRACE 环境变量开启：每个
+工具调用或资源读取期间执行的语句按规范化后的 SQL（常量和参数替换为 ?，IN 列表
+合并为一项）分组，同一次请求中某个形状执行了 repeat_threshold 次以上时记录为
+疑似 N+1。assert_max_queries 用于测试中限制一段代码执行的 SQL 语句数。
+"""
+
+import contextlib
+import contextvars
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# (正则, 替换)，按顺序应用
+_NORMALIZE_PATTERNS = [
+    # 字符串常量
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    # 各种 paramstyle 的参数：%(name)s、%s、:name、$1
+    (re.compile(r"%\(\w+\)s|%s|(?<![:\w]):\w+|\$\d+"), "?"),
+    # 数字常量（不匹配 table_1 这样的标识符）
+    (re.compile(r"(?<![\w.])\d+(?:\.\d+)?\b"), "?"),
+    # IN (?, ?, ...) 合并为 IN (?)，批量查询的批大小不同也视为同一形状
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?)"),
+    (re.compile(r"\s+"), " "),
+]
+
+# 每个操作最多保留的 SQL 形状数和疑似 N+1 的记录数，超出后不再新增
+MAX_SHAPES_PER_OPERATION = 100
+MAX_FINDINGS = 100
+
+# 不属于任何请求的语句（后台预热、变更检测等）记入的操作名
+BACKGROUND = "(background)"
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(statement: str) -> str:
+    """把 SQL 语句规范化为形状：常量和参数替换为 ?，空白合并"""
+    for pattern, replacement in _NORMALIZE_PATTERNS:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+class CallTrace:
+    """一次请求（或一段代码）中执行的 SQL：形状 -> [执行次数, 总耗时毫秒]"""
+
+    __slots__ = ("statements", "shapes")
+
+    def __init__(self):
+        self.statements = 0
+        self.shapes: Dict[str, List[float]] = {}
+
+    def record(self, statement: str, elapsed_ms: float = 0.0):
+        self.statements += 1
+        shape = normalize_sql(statement)
+        entry = self.shapes.get(shape)
+        if entry is None:
+            entry = self.shapes[shape] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += elapsed_ms
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """执行次数达到 threshold 的形状，按次数从多到少排列"""
+        return sorted(
+            (
+                (shape, int(count))
+                for shape, (count, _) in self.shapes.items()
+                if count >= threshold
+            ),
+            key=lambda item: -item[1],
+        )
+
+    def summary(self) -> str:
+        lines = [f"共执行 {self.statements} 条 SQL："]
+        for shape, (count, _) in sorted(self.shapes.items(), key=lambda i: -i[1][0]):
+            lines.append(f"  {int(count)} × {shape}")
+        return "\n".join(lines)
+
+
+class _OperationTrace:
+    """一种操作在所有请求中的 SQL 统计"""
+
+    __slots__ = ("calls", "statements", "max_statements", "shapes")
+
+    def __init__(self):
+        self.calls = 0
+        self.statements = 0
+        self.max_statements = 0
+        # 形状 -> [执行次数, 总耗时毫秒, 单次请求中的最多执行次数]
+        self.shapes: Dict[str, List[float]] = {}
+
+    def add(self, trace: CallTrace):
+        self.calls += 1
+        self.statements += trace.statements
+        self.max_statements = max(self.max_statements, trace.statements)
+        for shape, (count, elapsed_ms) in trace.shapes.items():
+            entry = self.shapes.get(shape)
+            if entry is None:
+                if len(self.shapes) >= MAX_SHAPES_PER_OPERATION:
+                    continue
+                entry = self.shapes[shape] = [0, 0.0, 0]
+            entry[0] += count
+            entry[1] += elapsed_ms
+            entry[2] = max(entry[2], count)
+
+    def to_dict(self, top: int) -> Dict[str, Any]:
+        ranked = sorted(self.shapes.items(), key=lambda item: -item[1][1])[:top]
+        return {
+            "calls": self.calls,
+            "statements": self.statements,
+            "statements_per_call": (
+                round(self.statements / self.calls, 2) if self.calls else 0.0
+            ),
+            "max_statements_per_call": self.max_statements,
+            "shapes": [
+                {
+                    "sql": shape,
+                    "count": int(count),
+                    "total_ms": round(elapsed_ms, 3),
+                    "max_per_call": int(max_per_call),
+                }
+                for shape, (count, elapsed_ms, max_per_call) in ranked
+            ],
+        }
+
+
+# 当前请求的 SQL 记录
+_current: contextvars.ContextVar[Optional[CallTrace]] = contextvars.ContextVar(
+    "current_sql_trace", default=None
+)
+
+
+class SQLTracer:
+    """按操作汇总 SQL 形状，记录同一请求中重复执行的形状（疑似 N+1）"""
+
+    def __init__(self, repeat_threshold: int = 3, top_shapes: int = 10):
+        if repeat_threshold < 2:
+            raise ValueError("repeat_threshold must be at least 2")
+        self.repeat_threshold = repeat_threshold
+        self.top_shapes = top_shapes
+        self.reset()
+
+    def reset(self):
+        self._operations: Dict[str, _OperationTrace] = {}
+        # (操作, 形状) -> [出现的请求数, 单次请求中的最多执行次数]
+        self._findings: Dict[Tuple[str, str], List[int]] = {}
+
+    def begin(self) -> contextvars.Token:
+        """开始记录一次请求，返回传给 end 的 token"""
+        return _current.set(CallTrace())
+
+    def end(self, operation: str, token: contextvars.Token):
+        """结束一次请求，把记录并入操作的统计"""
+        trace = _current.get()
+        _current.reset(token)
+        if trace is None or not trace.statements:
+            return
+        self._add(operation, trace)
+        for shape, count in trace.repeated(self.repeat_threshold):
+            finding = self._findings.get((operation, shape))
+            if finding is None:
+                if len(self._findings) >= MAX_FINDINGS:
+                    continue
+                finding = self._findings[(operation, shape)] = [0, 0]
+            finding[0] += 1
+            finding[1] = max(finding[1], count)
+
+    def _add(self, operation: str, trace: CallTrace):
+        stats = self._operations.get(operation)
+        if stats is None:
+            stats = self._operations[operation] = _OperationTrace()
+        stats.add(trace)
+
+    def record(self, statement: str, elapsed_ms: float):
+        """记录一条 SQL，请求之外执行的语句逐条记入 BACKGROUND"""
+        trace = _current.get()
+        if trace is not None:
+            trace.record(statement, elapsed_ms)
+            return
+        single = CallTrace()
+        single.record(statement, elapsed_ms)
+        self._add(BACKGROUND, single)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "repeat_threshold": self.repeat_threshold,
+            "operations": {
+                name: stats.to_dict(self.top_shapes)
+                for name, stats in sorted(self._operations.items())
+            },
+            "n_plus_one": [
+                {
+                    "operation": operation,
+                    "sql": shape,
+                    "calls": calls,
+                    "max_repeats": max_repeats,
+                }
+                for (operation, shape), (calls, max_repeats) in sorted(
+                    self._findings.items(), key=lambda item: -item[1][1]
+                )
+            ],
+        }
+
+
+@contextlib.contextmanager
+def assert_max_queries(
+    max_queries: Optional[int] = None,
+    max_repeats: Optional[int] = None,
+    engine: Any = None,
+) -> Iterator[CallTrace]:
+    """测试辅助：限制代码块执行的 SQL 语句数
+
+    执行超过 max_queries 条，或同一形状执行超过 max_repeats 次时抛出
+    AssertionError，错误信息列出各形状的执行次数。默认统计所有 engine（包括
+    工作线程中执行的语句），可用 engine 只统计一个。代码块本身抛出异常时不做检查。
+
+        with assert_max_queries(3, max_repeats=1):
+            client.get_table_info("orders")
+    """
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    trace = CallTrace()
+
+    def on_execute(conn, cursor, statement, *args):
+        trace.record(statement)
+
+    target = engine if engine is not None else Engine
+    event.listen(target, "before_cursor_execute", on_execute)
+    try:
+        yield trace
+    finally:
+        event.remove(target, "before_cursor_execute", on_execute)
+
+    problems = []
+    if max_queries is not None and trace.statements > max_queries:
+        problems.append(f"执行了 {trace.statements} 条 SQL，超过上限 {max_queries}")
+    if max_repeats is not None:
+        for shape, count in trace.repeated(max_repeats + 1):
+            problems.append(f"同一形状执行了 {count} 次（上限 {max_repeats}）: {shape}")
+    if problems:
+        raise AssertionError("\n".join(problems + [trace.summary()]))
@@ -0,0 +1,70 @@
+"""资源订阅模块 - 记录客户端订阅的资源，并检测资源内容变化"""
+
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set
+
+
+class SubscriptionRegistry:
+    """资源 URI 到订阅会话的映射"""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Hashable]] = {}
+
+    def subscribe(self, uri: str, session: Hashable):
+        """订阅资源"""
+        self._subscribers.setdefault(uri, set()).add(session)
+
+    def unsubscribe(self, uri: str, session: Hashable):
+        """取消订阅资源，没有订阅者的资源会被移除"""
+        sessions = self._subscribers.get(uri)
+        if sessions is None:
+            return
+        sessions.discard(session)
+        if not sessions:
+            del self._subscribers[uri]
+
+    def remove_session(self, session: Hashable):
+        """移除会话的全部订阅（例如会话已断开）"""
+        for uri in list(self._subscribers):
+            self.unsubscribe(uri, session)
+
+    def subscribers(self, uri: str) -> List[Hashable]:
+        """获取资源的订阅会话"""
+        return list(self._subscribers.get(uri, ()))
+
+    def uris(self) -> List[str]:
+        """当前被订阅的资源 URI"""
+        return list(self._subscribers)
+
+    def __bool__(self) -> bool:
+        return bool(self._subscribers)
+
+
+class ChangeDetector:
+    """基于指纹（updated_at 水位或内容哈希）检测资源变化"""
+
+    def __init__(self):
+        self._fingerprints: Dict[str, Optional[Any]] = {}
+
+    def seed(self, fingerprints: Dict[str, Optional[Any]]):
+        """记录资源的初始指纹，之后的变化才会被报告
+
+        已在跟踪的资源保留原来的指纹：后来的订阅者不会把尚未报告的变化当作基线，
+        使先订阅的会话漏掉通知。
+        """
+        for key, fingerprint in fingerprints.items():
+            self._fingerprints.setdefault(key, fingerprint)
+
+    def detect(self, fingerprints: Dict[str, Optional[Any]]) -> List[str]:
+        """比较新指纹与上次记录的指纹，返回发生变化的资源"""
+        changed = [
+            key
+            for key, fingerprint in fingerprints.items()
+            if key in self._fingerprints and self._fingerprints[key] != fingerprint
+        ]
+        self._fingerprints.update(fingerprints)
+        return changed
+
+    def forget(self, keys: Iterable[str]):
+        """不再跟踪指定资源"""
+        for key in keys:
+            self._fingerprints.pop(key, None)
@@ -0,0 +1,115 @@
+"""系统字段识别模块 - 为只能通过数据库元数据获取的表标记 is_system
+
+低代码实体的系统字段由 da_entity_attribute.is_system 标明；普通数据库表没有
+这类信息，按字段名规则识别创建人、更新时间、逻辑删除标记等系统字段。
+
+规则在创建 SystemFieldClassifier 时编译一次：完全匹配的字段名放入集合，前缀和
+后缀各自组成元组交给 str.startswith / str.endswith（在 C 中逐个比较，比等价的
+正则表达式快），全部正则表达式合并为一个。默认规则不含正则表达式，每个字段只需
+一次集合查找和两次前后缀比较。
+"""
+
+import json
+import os
+import re
+from typing import Optional
+
+from .models import SystemFieldRules
+
+DEFAULT_RULES = SystemFieldRules(
+    exact=[
+        # 时间相关
+        "created_at",
+        "updated_at",
+        "deleted_at",
+        "create_time",
+        "update_time",
+        "delete_time",
+        "created_time",
+        "updated_time",
+        "deleted_time",
+        # 操作人相关
+        "created_by",
+        "updated_by",
+        "deleted_by",
+        "create_user",
+        "update_user",
+        "delete_user",
+        "creator",
+        "updater",
+        "deleter",
+        # 删除标记
+        "is_deleted",
+        "del_flag",
+        "delete_flag",
+        "deleted",
+        "is_delete",
+        # 版本控制
+        "system_version",
+        "version",
+        "revision",
+        # 低代码平台字段
+        "system_event",
+        "data_source",
+        "owner_org_code",
+        "corp_id",
+        "latest",
+        "app_belong",
+        "access_modifier",
+        "gmt_create",
+        "gmt_modified",
+    ],
+    prefixes=["sys_", "effective_"],
+)
+
+
+class SystemFieldClassifier:
+    """按编译后的规则判断字段是否为系统字段"""
+
+    __slots__ = ("_exact", "_prefixes", "_suffixes", "_regex")
+
+    def __init__(self, rules: SystemFieldRules = DEFAULT_RULES):
+        self._exact = frozenset(name.lower() for name in rules.exact)
+        self._prefixes = tuple(prefix.lower() for prefix in rules.prefixes)
+        self._suffixes = tuple(suffix.lower() for suffix in rules.suffixes)
+        self._regex = (
+            re.compile(
+                "|".join(f"(?:{pattern})" for pattern in rules.patterns),
+                re.IGNORECASE,
+            ).match
+            if rules.patterns
+            else None
+        )
+
+    def is_system(self, column_name: str) -> bool:
+        name = column_name.lower()
+        return (
+            name in self._exact
+            or name.startswith(self._prefixes)
+            or name.endswith(self._suffixes)
+            or (self._regex is not None and self._regex(name) is not None)
+        )
+
+    @classmethod
+    def from_env(cls) -> "SystemFieldClassifier":
+        """根据环境变量创建分类器
+
+        SYSTEM_FIELD_RULES 指向 JSON 规则文件（字段见 SystemFieldRules）时，
+        使用文件中的规则代替默认规则。
+        """
+        path = os.getenv("SYSTEM_FIELD_RULES")
+        if not path:
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            return cls(SystemFieldRules(**json.load(f)))
+
+
+_default_classifier: Optional[SystemFieldClassifier] = None
+
+
+def default_classifier() -> SystemFieldClassifier:
+    """进程内共享的分类器，首次使用时按环境变量创建"""
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = SystemFieldClassifier.from_env()
+    return _default_classifier
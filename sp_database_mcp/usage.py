@@ -0,0 +1,154 @@
+"""表使用统计模块 - 记录各表的访问次数和最近访问时间，启动时据此预热缓存"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+# 访问次数的半衰期（秒）：一周前的一次访问只算半次
+DEFAULT_HALF_LIFE = 7 * 24 * 3600
+
+# 持久化时最多保留的条目数，分数最低的会被丢弃
+DEFAULT_MAX_ENTRIES = 1000
+
+
+class UsageLog:
+    """表访问记录：(数据源, 表名) -> [访问次数, 最近访问时间]
+
+    记录只在内存中累积，调用 save() 时才写入文件。
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        half_life: float = DEFAULT_HALF_LIFE,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.half_life = half_life
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[str, str], List[float]] = {}
+        self._dirty = False
+        self._loaded = False
+
+    def record(self, datasource: str, table_name: str, now: Optional[float] = None):
+        """记录一次表访问"""
+        now = now if now is not None else time.time()
+        entry = self._entries.setdefault((datasource, table_name), [0, now])
+        entry[0] += 1
+        entry[1] = max(entry[1], now)
+        self._dirty = True
+
+    def score(self, count: float, last_used: float, now: float) -> float:
+        """访问次数按最近访问时间衰减后的分数"""
+        age = max(now - last_used, 0)
+        return count * 0.5 ** (age / self.half_life)
+
+    def top(self, datasource: str, n: int, now: Optional[float] = None) -> List[str]:
+        """数据源中最常用的 n 个表，按分数从高到低排列"""
+        now = now if now is not None else time.time()
+        ranked = sorted(
+            (
+                (-self.score(count, last_used, now), table_name)
+                for (ds_name, table_name), (count, last_used) in self._entries.items()
+                if ds_name == datasource
+            )
+        )
+        return [table_name for _, table_name in ranked[:n]]
+
+    def load(self):
+        """从文件加载访问记录，与内存中已有的记录合并；文件不存在或损坏时忽略
+
+        只在第一次调用时读取文件。
+        """
+        if not self.path or self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            tables = data["tables"]
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error loading usage log {self.path}: {e}")
+            return
+
+        for item in tables:
+            try:
+                key = (item["datasource"], item["table"])
+                count, last_used = int(item["count"]), float(item["last_used"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            entry = self._entries.setdefault(key, [0, last_used])
+            entry[0] += count
+            entry[1] = max(entry[1], last_used)
+
+    def save(self, now: Optional[float] = None):
+        """有新记录时原子地写入文件（先写临时文件再替换）"""
+        if not self.path or not self._dirty:
+            return
+        now = now if now is not None else time.time()
+        # 先合并文件中已有的记录，避免覆盖之前的访问记录
+        self.load()
+
+        entries = sorted(
+            self._entries.items(),
+            key=lambda item: -self.score(item[1][0], item[1][1], now),
+        )[: self.max_entries]
+        self._entries = dict(entries)
+
+        data = {
+            "version": 1,
+            "tables": [
+                {
+                    "datasource": datasource,
+                    "table": table_name,
+                    "count": int(count),
+                    "last_used": last_used,
+                }
+                for (datasource, table_name), (count, last_used) in entries
+            ],
+        }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    @classmethod
+    def from_env(cls) -> "UsageLog":
+        """根据 USAGE_LOG_PATH 创建访问记录，设置为空字符串时不持久化"""
+        default_path = os.path.join(
+            os.path.expanduser("~"), ".cache", "sp-database-mcp", "usage.json"
+        )
+        path = os.path.expanduser(os.getenv("USAGE_LOG_PATH", default_path))
+        return cls(path or None)
+
+
+async def prewarm(
+    table_names: Iterable[str],
+    load: Callable[[str], Awaitable[object]],
+    is_busy: Callable[[], bool],
+    delay: float = 0.2,
+) -> int:
+    """依次加载表结构到缓存，返回成功加载的表数量
+
+    每加载一个表后暂停 delay 秒；有交互请求正在处理时（is_busy 返回 True）
+    暂停加载，避免与工具调用争抢连接和 CPU。
+    """
+    loaded = 0
+    for table_name in table_names:
+        while is_busy():
+            await asyncio.sleep(delay)
+        try:
+            if await load(table_name):
+                loaded += 1
+        except Exception as e:
+            print(f"Error prewarming table {table_name}: {e}")
+        await asyncio.sleep(delay)
+    return loaded
@@ -0,0 +1,145 @@
+"""多进程服务模块 - 父进程预加载表目录后 fork 出多个 worker 共享监听 socket
+
+父进程加载一次表目录并写入目录文件，然后 fork 出 N 个 worker。worker 以只读
+mmap 共享同一个目录文件，并在同一个监听 socket 上接受连接。父进程定期刷新目录
+并替换目录文件，worker 发现文件被替换后重新映射。
+"""
+
+import gc
+import os
+import signal
+import socket
+import time
+from typing import Any, Callable, Optional, Set
+
+from .catalog_file import MappedCatalog
+
+
+class SnapshotFollower:
+    """worker 侧的目录文件跟踪器，文件被替换后返回新内容
+
+    reader 负责打开文件，默认以 MappedCatalog 映射 write_catalog_file 写入的文件。
+    """
+
+    def __init__(self, path: str, reader: Callable[[str], Any] = MappedCatalog):
+        self.path = path
+        self.reader = reader
+        self._stamp: Optional[tuple] = None
+
+    def _current_stamp(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        # os.replace 会生成新的 inode，配合 mtime 判断文件是否被替换
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def mark_current(self):
+        """将当前快照视为已加载（例如 worker 刚从父进程 fork 出来）"""
+        self._stamp = self._current_stamp()
+
+    def poll(self) -> Optional[Any]:
+        """快照有更新时返回新快照，否则返回 None"""
+        stamp = self._current_stamp()
+        if stamp is None or stamp == self._stamp:
+            return None
+        snapshot = self.reader(self.path)
+        self._stamp = stamp
+        return snapshot
+
+
+def create_listen_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """创建由所有 worker 共享的监听 socket"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class WorkerPool:
+    """父进程侧的 worker 管理：fork、重启退出的 worker、定期刷新目录"""
+
+    def __init__(self, worker_count: int, run_worker: Callable[[], None]):
+        if worker_count < 1:
+            raise ValueError("worker_count must be at least 1")
+        self.worker_count = worker_count
+        self.run_worker = run_worker
+        self.pids: Set[int] = set()
+        self._stopping = False
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            # worker 进程：恢复默认信号处理，运行结束后直接退出
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            exit_code = 0
+            try:
+                self.run_worker()
+            except BaseException as e:
+                print(f"Worker {os.getpid()} exited with error: {e}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        self.pids.add(pid)
+
+    def _reap(self):
+        """回收已退出的 worker，未在停止过程中时补齐数量"""
+        for pid in list(self.pids):
+            finished, _ = os.waitpid(pid, os.WNOHANG)
+            if finished:
+                self.pids.discard(pid)
+                if not self._stopping:
+                    print(f"Worker {pid} 已退出，重新启动")
+                    self._spawn()
+
+    def _handle_stop(self, signum, frame):
+        self._stopping = True
+
+    def run(self, refresh: Callable[[], None], refresh_interval: float):
+        """启动 worker 并阻塞看护，直到收到 SIGTERM/SIGINT"""
+        # 冻结父进程已有的对象，避免 worker 中的 GC 扫描触发写时复制
+        gc.freeze()
+        for _ in range(self.worker_count):
+            self._spawn()
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        next_refresh = time.monotonic() + refresh_interval
+        try:
+            while not self._stopping:
+                time.sleep(0.5)
+                self._reap()
+                if time.monotonic() >= next_refresh:
+                    try:
+                        refresh()
+                    except Exception as e:
+                        print(f"Error refreshing catalog: {e}")
+                    next_refresh = time.monotonic() + refresh_interval
+        finally:
+            self.stop()
+
+    def stop(self, timeout: float = 10.0):
+        """通知所有 worker 退出并等待"""
+        self._stopping = True
+        for pid in self.pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.monotonic() + timeout
+        while self.pids and time.monotonic() < deadline:
+            for pid in list(self.pids):
+                finished, _ = os.waitpid(pid, os.WNOHANG)
+                if finished:
+                    self.pids.discard(pid)
+            time.sleep(0.05)
+
+        for pid in self.pids:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self.pids.clear()
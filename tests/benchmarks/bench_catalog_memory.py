@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""表目录内存基准 - 用 tracemalloc 对比 TableInfo 对象、紧凑存储和映射目录文件占用的堆内存
+
+用法:
+    python tests/benchmarks/bench_catalog_memory.py --tables 2000 --columns 50
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from sp_database_mcp.catalog_file import MappedCatalog, write_catalog_file
+from sp_database_mcp.compact import CompactTable, StringPool
+from sp_database_mcp.models import ColumnInfo, TableInfo
+
+DATA_TYPES = ["varchar(100)", "varchar(255)", "bigint", "int", "datetime", "text"]
+SYSTEM_FIELDS = ["id", "created_at", "updated_at", "created_by", "updated_by", "tenant_id"]
+
+
+def make_tables(tables: int, columns: int):
+    """生成模拟的表结构；与从数据库读出的行一样，每个字符串都是新创建的对象"""
+    result = []
+    for i in range(tables):
+        column_infos = []
+        for j in range(columns):
+            code = SYSTEM_FIELDS[j] if j < len(SYSTEM_FIELDS) else f"field_{j}"
+            column_infos.append(
+                ColumnInfo(
+                    name="".join(["字段", str(j)]),
+                    type="".join(DATA_TYPES[j % len(DATA_TYPES)]),
+                    code="".join(code),
+                    nullable=j % 2 == 0,
+                    default=None,
+                    comment="".join(["字段", str(j), " (", code, ")"]),
+                    is_primary_key=j == 0,
+                    max_length=100 if j % 3 == 0 else None,
+                    modifier="".join("admin"),
+                    is_system=j < len(SYSTEM_FIELDS),
+                )
+            )
+        result.append(
+            TableInfo(name=f"table_{i}", comment=f"第 {i} 个表", columns=column_infos)
+        )
+    return result
+
+
+def measure(build):
+    """返回 (构建结果, 构建结果占用的字节数)"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比表目录的内存占用")
+    parser.add_argument("--tables", type=int, default=2000)
+    parser.add_argument("--columns", type=int, default=50)
+    args = parser.parse_args()
+    total = args.tables * args.columns
+
+    table_infos, model_bytes = measure(lambda: make_tables(args.tables, args.columns))
+
+    def build_compact():
+        pool = StringPool()
+        return [CompactTable.from_table_info(t, pool) for t in table_infos]
+
+    compact_tables, compact_bytes = measure(build_compact)
+
+    print(f"{args.tables} 个表 / {total} 个字段:")
+    print(f"  TableInfo 对象 {model_bytes / total:8.1f} 字节/字段  ({model_bytes / 2**20:.1f} MiB)")
+    print(f"  紧凑存储       {compact_bytes / total:8.1f} 字节/字段  ({compact_bytes / 2**20:.1f} MiB)")
+    print(f"  节省           {1 - compact_bytes / model_bytes:8.1%}")
+
+    started = time.perf_counter()
+    for table in compact_tables:
+        table.to_table_info()
+    elapsed = time.perf_counter() - started
+    print(f"  还原 TableInfo {elapsed / args.tables * 1e6:8.1f} µs/表")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "catalog.bin")
+        write_catalog_file(path, (("database", t) for t in table_infos))
+        mapped, mapped_bytes = measure(lambda: MappedCatalog(path))
+        print(
+            f"  映射目录文件   {mapped_bytes / total:8.1f} 字节/字段"
+            f"  (堆内存，文件 {os.path.getsize(path) / 2**20:.1f} MiB 由各进程共享页缓存)"
+        )
+
+        started = time.perf_counter()
+        for t in table_infos:
+            mapped.get_table_info("database", t.name)
+        elapsed = time.perf_counter() - started
+        print(f"  查找并解码     {elapsed / args.tables * 1e6:8.1f} µs/表")
+        mapped.close()
+
+
+if __name__ == "__main__":
+    main()
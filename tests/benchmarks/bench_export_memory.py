@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""表结构导出内存基准 - 对比先加载全部表结构再写出与流式导出 JSONL 的峰值内存
+
+用法:
+    python tests/benchmarks/bench_export_memory.py --entities 1000 4000 --attributes 30
+
+对每个规模用 synthetic_schema 生成临时的低代码 SQLite 数据库，用 tracemalloc 分别测量
+先收集全部 TableInfo 再写出和 export_schema() 的峰值堆内存及耗时。流式导出的峰值
+应只随 --batch-size 变化，不随实体数增长。
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from synthetic_schema import create_sqlite_schema
+
+from sp_database_mcp.database import DatabaseClient
+from sp_database_mcp.export import export_schema, write_jsonl
+
+
+def measure(func):
+    """返回 (峰值堆内存字节数, 耗时秒数)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比表结构导出的峰值内存")
+    parser.add_argument("--entities", type=int, nargs="+", default=[1000, 4000])
+    parser.add_argument(
+        "--attributes", type=int, default=30, help="每个实体的平均字段数"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    for entities in args.entities:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "lowcode.db")
+            create_sqlite_schema(
+                db_path,
+                entities=entities,
+                attributes=entities * args.attributes,
+                seed=args.seed,
+            )
+            client = DatabaseClient(f"sqlite:///{db_path}")
+            client.get_all_tables()  # 预热反射缓存，不计入测量
+            out_path = os.path.join(tmp_dir, "schema.jsonl.gz")
+
+            def load_then_write():
+                tables = list(client.iter_table_infos(batch_size=args.batch_size))
+                with open(out_path, "wb") as f:
+                    write_jsonl(tables, f, "gzip")
+
+            load_peak, load_time = measure(load_then_write)
+            export_peak, export_time = measure(
+                lambda: export_schema(client, out_path, batch_size=args.batch_size)
+            )
+            size = os.path.getsize(out_path)
+            client.close()
+
+        print(f"{entities} 个实体 / {entities * args.attributes} 个字段:")
+        print(
+            f"  全部加载后写出       峰值 {load_peak / 2**20:7.1f} MiB"
+            f"  {load_time:6.2f} s"
+        )
+        print(
+            f"  export_schema (gzip) 峰值 {export_peak / 2**20:7.1f} MiB"
+            f"  {export_time:6.2f} s  文件 {size / 2**20:.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""模型构建基准 - 对比 pydantic 校验构建与跳过校验的快速构建 ColumnInfo/TableInfo 的耗时
+
+用法:
+    python tests/benchmarks/bench_model_construct.py --entities 2000 --attributes 100
+
+生成一个包含低代码 schema 表的临时 SQLite 数据库，分别测量：
+- 仅由查询结果行构建模型（不含 SQL 执行）的耗时
+- 通过 DatabaseClient.get_table_info 加载全部实体的端到端耗时
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from sqlalchemy import text
+
+from sp_database_mcp import database
+from sp_database_mcp.database import DatabaseClient, _schema_column_fields
+from sp_database_mcp.models import ColumnInfo, TableInfo, trusted_column
+
+DATA_TYPES = ["varchar", "bigint", "int", "decimal", "datetime", "text", "boolean"]
+
+
+def create_schema(db_path: str, entities: int, attributes: int):
+    """生成 entities 个实体、每个实体 attributes 个字段的低代码 schema 表"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE da_logic_entity (
+            id INTEGER PRIMARY KEY, name TEXT, code TEXT, table_name TEXT,
+            description TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE da_entity_attribute (
+            id INTEGER PRIMARY KEY, entity_id INTEGER, name TEXT, code TEXT,
+            column_name TEXT, data_type TEXT, data_length INTEGER,
+            primary_key BOOLEAN, required BOOLEAN, default_value TEXT,
+            description TEXT, ref_entity_id INTEGER, ref_type TEXT,
+            updated_by TEXT, is_system BOOLEAN
+        )
+    """)
+    conn.execute("CREATE INDEX idx_attribute_entity ON da_entity_attribute (entity_id)")
+    conn.executemany(
+        "INSERT INTO da_logic_entity VALUES (?, ?, ?, ?, ?)",
+        (
+            (i, f"实体{i}", f"entity_{i}", f"entity_{i}", f"第 {i} 个实体")
+            for i in range(1, entities + 1)
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO da_entity_attribute VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            (
+                None,
+                entity_id,
+                f"字段{j}",
+                f"field_{j}",
+                f"field_{j}",
+                DATA_TYPES[j % len(DATA_TYPES)],
+                100 if j % 3 == 0 else None,
+                j == 0,
+                j % 2 == 0,
+                None,
+                f"字段 {j} 的说明" if j % 4 == 0 else None,
+                None,
+                None,
+                "admin",
+                j < 5,
+            )
+            for entity_id in range(1, entities + 1)
+            for j in range(attributes)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+@contextmanager
+def validated_models():
+    """临时恢复为校验构建，作为对比基线"""
+    trusted_column, trusted_table = database.trusted_column, database.trusted_table
+    database.trusted_column = lambda fields: ColumnInfo(**fields)
+    database.trusted_table = TableInfo
+    try:
+        yield
+    finally:
+        database.trusted_column, database.trusted_table = trusted_column, trusted_table
+
+
+def timed(func) -> float:
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比 ColumnInfo/TableInfo 的构建耗时")
+    parser.add_argument("--entities", type=int, default=2000)
+    parser.add_argument("--attributes", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "schema.db")
+        create_schema(db_path, args.entities, args.attributes)
+        client = DatabaseClient(f"sqlite:///{db_path}")
+        total = args.entities * args.attributes
+
+        with client.engine.connect() as conn:
+            rows = [
+                row._mapping
+                for row in conn.execute(
+                    text("SELECT * FROM da_entity_attribute")
+                ).fetchall()
+            ]
+        fields = [_schema_column_fields(row) for row in rows]
+
+        validated = timed(lambda: [ColumnInfo(**f) for f in fields])
+        constructed = timed(lambda: [trusted_column(f) for f in fields])
+        print(f"构建 {total} 个 ColumnInfo（不含 SQL）:")
+        print(f"  校验构建      {validated * 1000:8.1f} ms")
+        print(f"  跳过校验      {constructed * 1000:8.1f} ms  ({validated / constructed:.1f}x)")
+
+        codes = [f"entity_{i}" for i in range(1, args.entities + 1)]
+
+        def load_all():
+            for code in codes:
+                client.get_table_info(code)
+
+        with validated_models():
+            validated = timed(load_all)
+        constructed = timed(load_all)
+        print(f"get_table_info 加载 {args.entities} 个实体 / {total} 个字段:")
+        print(f"  校验构建      {validated * 1000:8.1f} ms")
+        print(f"  跳过校验      {constructed * 1000:8.1f} ms  ({validated / constructed:.1f}x)")
+
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""输出格式基准 - 各格式渲染表结构的字节数、估计 token 数和耗时
+
+用法:
+    python tests/benchmarks/bench_output_formats.py --tables 200 --attributes 80
+
+随机生成低代码风格的表结构，分别用 markdown、缩进 JSON（资源读取的默认格式）
+和 format 参数支持的各种格式渲染，报告相对 markdown 和缩进 JSON 节省的字节数；JSON 同时
+对比 orjson 与标准库 json 的序列化耗时。
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from sp_database_mcp import formats
+from sp_database_mcp.formats import RENDERERS
+from sp_database_mcp.models import ColumnInfo, TableInfo
+from sp_database_mcp.paging import estimate_tokens
+from sp_database_mcp.server import _format_table_info, _format_table_json
+
+DATA_TYPES = ["varchar", "bigint", "int", "decimal", "datetime", "text", "boolean"]
+SYSTEM_FIELDS = [("创建时间", "created_at"), ("更新人", "updated_by"), ("删除标记", "is_deleted")]
+
+
+def generate_tables(count: int, attributes: int, seed: int = 0):
+    rng = random.Random(seed)
+    tables = []
+    for i in range(count):
+        columns = [
+            ColumnInfo(
+                name=f"字段{j}",
+                type=rng.choice(DATA_TYPES),
+                code=f"field_{j}",
+                nullable=rng.random() < 0.7,
+                comment=f"字段{j} (field_{j}) - 第 {j} 个属性" if j % 3 == 0 else None,
+                is_primary_key=j == 0,
+                max_length=rng.choice([None, 64, 255]),
+                modifier="admin",
+            )
+            for j in range(attributes)
+        ]
+        columns += [
+            ColumnInfo(name=name, type="datetime", code=code, nullable=True, is_system=True)
+            for name, code in SYSTEM_FIELDS
+        ]
+        tables.append(
+            TableInfo(name=f"entity_{i}", comment=f"实体{i} - 第 {i} 个实体", columns=columns)
+        )
+    return tables
+
+
+def measure(render, tables):
+    started = time.perf_counter()
+    outputs = [render(table) for table in tables]
+    elapsed = time.perf_counter() - started
+    size = sum(len(output.encode("utf-8")) for output in outputs)
+    tokens = sum(estimate_tokens(output) for output in outputs)
+    return size, tokens, elapsed / len(tables)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比各输出格式的体积和渲染耗时")
+    parser.add_argument("--tables", type=int, default=200)
+    parser.add_argument("--attributes", type=int, default=80)
+    args = parser.parse_args()
+
+    tables = generate_tables(args.tables, args.attributes)
+    renderers = [("markdown", _format_table_info), ("json indent=2", _format_table_json)]
+    renderers += [(fmt, render) for fmt, (render, _) in RENDERERS.items()]
+
+    results = [(name, *measure(render, tables)) for name, render in renderers]
+    markdown_size, json_size = results[0][1], results[1][1]
+    print(f"{args.tables} 个表 × {args.attributes + len(SYSTEM_FIELDS)} 个字段（每表平均）:")
+    for name, size, tokens, per_table in results:
+        print(
+            f"  {name:<14}{size / args.tables:>8.0f} 字节 {tokens / args.tables:>6.0f} tokens"
+            f" {per_table * 1e6:>6.0f} µs  比 markdown 节省 {1 - size / markdown_size:>5.0%}"
+            f"  比缩进 JSON 节省 {1 - size / json_size:>4.0%}"
+        )
+
+    if formats.orjson is not None:
+        values = [table.model_dump() for table in tables]
+        started = time.perf_counter()
+        for value in values:
+            formats.dumps(value)
+        fast = time.perf_counter() - started
+        started = time.perf_counter()
+        for value in values:
+            json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+        stdlib = time.perf_counter() - started
+        print(f"JSON 序列化（不含 model_dump）: orjson {fast * 1000:.1f} ms，"
+              f"标准库 {stdlib * 1000:.1f} ms（{stdlib / fast:.1f}x）")
+    else:
+        print("未安装 orjson，JSON 使用标准库序列化")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""系统字段识别基准 - 对比编译后的规则与逐条匹配规则列表的每字段耗时
+
+用法:
+    python tests/benchmarks/bench_system_fields.py --columns 200000
+
+逐条匹配是之前各调用方自行实现的方式：依次检查每条规则。编译后的分类器只做
+一次集合查找和一次正则匹配。同时给出构建一个 ColumnInfo 的耗时作为参照，
+衡量识别系统字段在批量加载中的占比。
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from sp_database_mcp.models import trusted_column
+from sp_database_mcp.system_fields import DEFAULT_RULES, SystemFieldClassifier
+
+BUSINESS_WORDS = ["order", "customer", "amount", "status", "title", "owner", "price"]
+
+
+def column_names(count: int, system_ratio: float, seed: int = 0):
+    """生成字段名，其中约 system_ratio 比例为系统字段"""
+    rng = random.Random(seed)
+    names = []
+    for i in range(count):
+        if rng.random() < system_ratio:
+            names.append(rng.choice(DEFAULT_RULES.exact))
+        else:
+            names.append(f"{rng.choice(BUSINESS_WORDS)}_{rng.choice(BUSINESS_WORDS)}_{i % 50}")
+    return names
+
+
+def naive_is_system(column_name: str) -> bool:
+    """逐条检查规则（未编译）"""
+    name = column_name.lower()
+    for exact in DEFAULT_RULES.exact:
+        if name == exact:
+            return True
+    for prefix in DEFAULT_RULES.prefixes:
+        if name.startswith(prefix):
+            return True
+    for suffix in DEFAULT_RULES.suffixes:
+        if name.endswith(suffix):
+            return True
+    for pattern in DEFAULT_RULES.patterns:
+        if re.match(pattern, name):
+            return True
+    return False
+
+
+def per_column_ns(func, names) -> float:
+    started = time.perf_counter()
+    for name in names:
+        func(name)
+    return (time.perf_counter() - started) / len(names) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比系统字段识别的每字段耗时")
+    parser.add_argument("--columns", type=int, default=200000)
+    parser.add_argument("--system-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    names = column_names(args.columns, args.system_ratio)
+    classifier = SystemFieldClassifier()
+    assert [classifier.is_system(n) for n in names] == [naive_is_system(n) for n in names]
+
+    naive = per_column_ns(naive_is_system, names)
+    compiled = per_column_ns(classifier.is_system, names)
+
+    def construct(name):
+        trusted_column(
+            {
+                "name": name,
+                "type": "varchar",
+                "code": name,
+                "nullable": True,
+                "default": None,
+                "comment": None,
+                "is_primary_key": False,
+                "is_foreign_key": False,
+                "max_length": None,
+                "modifier": None,
+                "is_system": False,
+            }
+        )
+
+    construct_ns = per_column_ns(construct, names)
+
+    print(f"识别 {args.columns} 个字段（系统字段约占 {args.system_ratio:.0%}）:")
+    print(f"  逐条匹配规则  {naive:8.0f} ns/字段")
+    print(f"  编译后的规则  {compiled:8.0f} ns/字段  ({naive / compiled:.1f}x)")
+    print(f"  参照：构建 ColumnInfo {construct_ns:8.0f} ns/字段")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,556 @@
+#!/usr/bin/env python3
+"""MCP 工具基准 - 在不同规模的合成低代码 schema 上测量各工具和资源处理函数的延迟
+
+用法:
+    python tests/benchmarks/bench_tools.py --sizes 100 1000 --output bench-results.json
+
+对每个规模用 synthetic_schema 生成带物理表的 SQLite 数据库，分别以数据库和 API
+两种数据源（--sources）在进程内直接调用 handle_call_tool（get_table_info、search_tables、list_all_tables、
+get_table_documentation）、handle_read_resource 和 handle_list_resources：
+
+- cold：每次调用前清空数据源的表目录缓存，测量从数据库加载的路径
+- warm：先调用一次填充缓存，之后重复调用，测量命中缓存的路径
+
+API 数据源由 schema_api.SchemaAPI 以同一个数据库提供，通过 httpx.MockTransport
+在进程内访问，不经过网络；--api-latency-ms 和 --api-jitter-ms 为每个请求注入延迟。
+
+每个场景记录调用次数、延迟的 p50/p95/p99/平均/最大值（毫秒）、每次调用执行的
+SQL 语句数和 HTTP 请求数，以及单独一轮调用中的峰值堆内存（tracemalloc，不计入
+延迟）。测量前先调用一次，排除 SQL 编译缓存等进程级的一次性开销；延迟测 --rounds
+轮（期间关闭 GC），每个百分位数取各轮中的最小值，减少调度抖动的影响。表名、搜索关键词都由 --seed 决定，同样的参数在同一台机器上的结果可以
+直接比较；--output 把结果保存为 JSON。
+
+回归检查：--baseline 按基线文件中记录的参数重新运行，逐项与基线比较，超出容差
+的指标会被列出并以退出码 1 结束；--update-baseline 用本次结果重写基线文件。
+SQL/HTTP 请求数和峰值内存与机器无关，总是检查；延迟只在基线由同一台机器记录
+（meta.host 相同）时检查，--gate-latency 强制检查，--no-gate-latency 跳过。
+全程只使用本地生成的 SQLite 数据库，不需要网络。
+
+    python tests/benchmarks/bench_tools.py --baseline tests/benchmarks/baseline.json
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import httpx
+from schema_api import SchemaAPI
+from sqlalchemy import event
+from synthetic_schema import BUSINESS_OBJECTS, create_sqlite_schema
+
+from sp_database_mcp import server
+from sp_database_mcp.api_client import APIClient
+from sp_database_mcp.database import DatabaseClient
+from sp_database_mcp.datasources import (
+    DEFAULT_DATASOURCE,
+    DataSource,
+    DataSourceRegistry,
+)
+from sp_database_mcp.models import DataSourceConfig
+from sp_database_mcp.usage import UsageLog
+
+MODES = ("cold", "warm")
+SOURCES = ("database", "api")
+
+# 回归检查的默认容差：延迟和内存为允许的相对增长，SQL 和 HTTP 请求数为允许
+# 增加的绝对数量；延迟和内存另有允许增长的绝对下限，避免很小的数值因抖动被判
+# 为回归
+DEFAULT_TOLERANCES = {
+    "latency": 1.0,
+    "latency_floor_ms": 2.0,
+    "queries": 0.0,
+    "http_requests": 0.0,
+    "memory": 0.5,
+    "memory_floor_kib": 256.0,
+}
+
+# 指标 -> 容差类型；p99、平均值和最大值只记录，不参与回归检查。延迟的绝对值
+# 随机器变化，只与同一台机器记录的基线比较（见 host_id）
+_GATED_METRICS = {
+    "p50_ms": "latency",
+    "p95_ms": "latency",
+    "queries_per_call": "queries",
+    "http_requests_per_call": "http_requests",
+    "peak_kib": "memory",
+}
+
+
+def host_id() -> str:
+    """标识测量机器：主机名、CPU 架构和核数、操作系统和 Python 版本"""
+    return "/".join(
+        [
+            platform.node(),
+            platform.machine(),
+            str(os.cpu_count()),
+            platform.platform(),
+            platform.python_version(),
+        ]
+    )
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """已排序数据的第 q 百分位数（线性插值）"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    weight = position - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+
+
+def summarize(
+    latencies: List[float], queries: int, http_requests: int = 0
+) -> Dict[str, float]:
+    """把每次调用的耗时（秒）、SQL 语句总数和 HTTP 请求总数汇总为一个场景的指标"""
+    values = sorted(latency * 1000 for latency in latencies)
+    calls = len(values)
+    return {
+        "calls": calls,
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "mean_ms": round(sum(values) / calls, 3) if calls else 0.0,
+        "max_ms": round(values[-1], 3) if calls else 0.0,
+        "queries_per_call": round(queries / calls, 2) if calls else 0.0,
+        "http_requests_per_call": round(http_requests / calls, 2) if calls else 0.0,
+    }
+
+
+class QueryCounter:
+    """统计 engine 上执行的 SQL 语句数；engine 为 None（API 数据源）时始终为 0"""
+
+    def __init__(self, engine=None):
+        self.count = 0
+        if engine is not None:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+class HttpCounter:
+    """统计 httpx.AsyncClient 发出的请求数（API 数据源的请求）"""
+
+    def __init__(self):
+        self.count = 0
+
+    @contextmanager
+    def installed(self):
+        send = httpx.AsyncClient.send
+
+        async def counting_send(client, request, **kwargs):
+            self.count += 1
+            return await send(client, request, **kwargs)
+
+        httpx.AsyncClient.send = counting_send
+        try:
+            yield self
+        finally:
+            httpx.AsyncClient.send = send
+
+
+def _scenarios(
+    table_names: List[str], keywords: List[str], uri_scheme: str = "database"
+) -> Dict[str, Callable[[int], Awaitable[Any]]]:
+    """场景名 -> 以调用序号为参数的调用函数；每个场景轮流使用抽样的表名"""
+
+    def table(i: int) -> str:
+        return table_names[i % len(table_names)]
+
+    return {
+        "get_table_info": lambda i: server.handle_call_tool(
+            "get_table_info", {"table_name": table(i)}
+        ),
+        "search_tables": lambda i: server.handle_call_tool(
+            "search_tables", {"keyword": keywords[i % len(keywords)]}
+        ),
+        "list_all_tables": lambda i: server.handle_call_tool("list_all_tables", {}),
+        "get_table_documentation": lambda i: server.handle_call_tool(
+            "get_table_documentation", {"table_name": table(i)}
+        ),
+        "read_resource": lambda i: server.handle_read_resource(
+            f"{uri_scheme}://table/{table(i)}"
+        ),
+        "list_resources": lambda i: server.handle_list_resources(None),
+    }
+
+
+async def _run_scenario(
+    call: Callable[[int], Awaitable[Any]],
+    datasource: DataSource,
+    counters: Tuple[QueryCounter, HttpCounter],
+    mode: str,
+    iterations: int,
+    rounds: int = 3,
+) -> Dict[str, float]:
+    queries, http = counters
+
+    async def warm_up():
+        for i in range(iterations):
+            await call(i)  # 每个参数先调用一次填充缓存
+
+    async def run(i: int):
+        if mode == "cold":
+            datasource.catalog.invalidate()
+        await call(i)
+
+    await run(0)
+    if mode == "warm":
+        await warm_up()
+
+    summaries = []
+    for _ in range(rounds):
+        # 与 timeit 一样，测量期间关闭 GC
+        gc.collect()
+        gc.disable()
+        latencies = []
+        query_count = http_count = 0
+        try:
+            for i in range(iterations):
+                before = (queries.count, http.count)
+                started = time.perf_counter()
+                await run(i)
+                latencies.append(time.perf_counter() - started)
+                query_count += queries.count - before[0]
+                http_count += http.count - before[1]
+        finally:
+            gc.enable()
+        summaries.append(summarize(latencies, query_count, http_count))
+    # 延迟取各轮中的最小值；SQL 和 HTTP 请求数每轮相同，取第一轮
+    metrics = summaries[0]
+    for metric in ("p50_ms", "p95_ms", "p99_ms", "mean_ms", "max_ms"):
+        metrics[metric] = min(summary[metric] for summary in summaries)
+
+    # 峰值内存单独测一轮，tracemalloc 的开销不计入延迟
+    if mode == "cold":
+        datasource.catalog.invalidate()
+    gc.collect()
+    tracemalloc.start()
+    for i in range(iterations):
+        await run(i)
+    metrics["peak_kib"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    tracemalloc.stop()
+    return metrics
+
+
+def _install(
+    db_path: str, source: str, api: Optional[SchemaAPI] = None
+) -> Tuple[DataSource, QueryCounter]:
+    """把服务器的数据源注册表替换为只包含基准数据源的注册表
+
+    source 为 "api" 时数据源只有经 api 的 MockTransport 访问的 APIClient。
+    """
+    config = DataSourceConfig(name=DEFAULT_DATASOURCE, pinned=True)
+    if source == "api":
+        client = APIClient("http://schema-api.test", transport=api.transport())
+        datasource = DataSource(config, api_client=client)
+        counter = QueryCounter()
+    else:
+        client = DatabaseClient(f"sqlite:///{db_path}")
+        datasource = DataSource(config, db_client=client)
+        counter = QueryCounter(client.engine)
+    registry = DataSourceRegistry()
+    registry.register(datasource)
+    server.registry = registry
+    # 基准不写入用户的表访问记录
+    server.usage_log = UsageLog(None)
+    return datasource, counter
+
+
+async def bench_size(
+    db_path: str,
+    table_names: List[str],
+    keywords: List[str],
+    iterations: int,
+    scenarios: Optional[List[str]] = None,
+    rounds: int = 3,
+    source: str = "database",
+    api_latency_ms: float = 0.0,
+    api_jitter_ms: float = 0.0,
+) -> Dict[str, Dict[str, float]]:
+    """对一个数据库以指定数据源运行全部场景，返回 {"场景/模式": 指标}"""
+    api = SchemaAPI(db_path, api_latency_ms, api_jitter_ms) if source == "api" else None
+    datasource, counter = _install(db_path, source, api)
+    uri_scheme = "api" if source == "api" else "database"
+    results = {}
+    try:
+        with HttpCounter().installed() as http:
+            for name, call in _scenarios(table_names, keywords, uri_scheme).items():
+                if scenarios and name not in scenarios:
+                    continue
+                for mode in MODES:
+                    results[f"{name}/{mode}"] = await _run_scenario(
+                        call, datasource, (counter, http), mode, iterations, rounds
+                    )
+    finally:
+        await datasource.close()
+        if api is not None:
+            api.close()
+    return results
+
+
+def run_suite(
+    sizes: List[int],
+    attributes: int = 30,
+    iterations: int = 20,
+    seed: int = 0,
+    scenarios: Optional[List[str]] = None,
+    rounds: int = 3,
+    sources: Optional[List[str]] = None,
+    api_latency_ms: float = 0.0,
+    api_jitter_ms: float = 0.0,
+) -> Dict[str, Any]:
+    """生成各规模的 schema 并运行基准，返回可序列化为 JSON 的结果
+
+    结果的键为 "规模/数据源/场景/模式"。
+    """
+    sources = sources or list(SOURCES)
+    results: Dict[str, Any] = {}
+    for size in sizes:
+        rng = random.Random(seed)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "lowcode.db")
+            create_sqlite_schema(
+                db_path,
+                entities=size,
+                attributes=size * attributes,
+                seed=seed,
+                physical_tables=True,
+            )
+            client = DatabaseClient(f"sqlite:///{db_path}")
+            table_names = rng.sample(
+                [n for n in client.get_all_tables() if not n.startswith("da_")],
+                min(iterations, size),
+            )
+            client.close()
+            keywords = [code for _, code in rng.sample(BUSINESS_OBJECTS, 3)]
+
+            for source in sources:
+                source_results = asyncio.run(
+                    bench_size(
+                        db_path,
+                        table_names,
+                        keywords,
+                        iterations,
+                        scenarios,
+                        rounds,
+                        source,
+                        api_latency_ms,
+                        api_jitter_ms,
+                    )
+                )
+                for key, metrics in source_results.items():
+                    results[f"{size}/{source}/{key}"] = metrics
+
+    return {
+        "meta": {
+            "sizes": sizes,
+            "sources": sources,
+            "api_latency_ms": api_latency_ms,
+            "api_jitter_ms": api_jitter_ms,
+            "attributes_per_entity": attributes,
+            "iterations": iterations,
+            "rounds": rounds,
+            "seed": seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "host": host_id(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def print_results(report: Dict[str, Any]):
+    print(
+        f"{'场景':<44} {'p50':>9} {'p95':>9} {'p99':>9} {'mean':>9}"
+        f" {'SQL/次':>7} {'HTTP/次':>7} {'峰值KiB':>9}"
+    )
+    for key, m in report["results"].items():
+        print(
+            f"{key:<44} {m['p50_ms']:9.2f} {m['p95_ms']:9.2f} {m['p99_ms']:9.2f}"
+            f" {m['mean_ms']:9.2f} {m['queries_per_call']:7.1f}"
+            f" {m['http_requests_per_call']:7.1f} {m['peak_kib']:9.1f}"
+        )
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    tolerances: Optional[Dict[str, Optional[float]]] = None,
+    gate_latency: Optional[bool] = None,
+) -> List[str]:
+    """逐项比较本次结果与基线，返回超出容差的回归描述（为空表示通过）
+
+    容差为 None 的类型不参与比较；基线中有而本次缺少的场景视为回归。gate_latency
+    为 None 时只在基线与本次结果由同一台机器测得（meta.host 相同）时比较延迟。
+    """
+    limits = {**DEFAULT_TOLERANCES, **baseline.get("tolerances", {})}
+    limits.update(tolerances or {})
+    if gate_latency is None:
+        gate_latency = same_host(baseline, current)
+    if not gate_latency:
+        limits["latency"] = None
+    floor_ms = limits["latency_floor_ms"] or 0.0
+    floor_kib = limits["memory_floor_kib"] or 0.0
+
+    regressions = []
+    for key, expected in baseline["results"].items():
+        actual = current["results"].get(key)
+        if actual is None:
+            regressions.append(f"{key}: 缺少该场景的结果")
+            continue
+        for metric, kind in _GATED_METRICS.items():
+            tolerance = limits.get(kind)
+            if tolerance is None or metric not in expected or metric not in actual:
+                continue
+            old, new = expected[metric], actual[metric]
+            if kind in ("queries", "http_requests"):
+                allowed = old + tolerance
+            elif kind == "latency":
+                allowed = max(old * (1 + tolerance), old + floor_ms)
+            else:
+                allowed = max(old * (1 + tolerance), old + floor_kib)
+            if new > allowed:
+                regressions.append(
+                    f"{key} {metric}: {new:g} > 允许值 {allowed:g}（基线 {old:g}）"
+                )
+    return regressions
+
+
+def same_host(baseline: Dict[str, Any], current: Dict[str, Any]) -> bool:
+    """基线和本次结果是否由同一台机器测得（没有记录机器的基线视为不同）"""
+    host = baseline.get("meta", {}).get("host")
+    return host is not None and host == current.get("meta", {}).get("host")
+
+
+def _parse_tolerance(value: str) -> Tuple[str, Optional[float]]:
+    """解析 --tolerance 类型=数值，数值为 none 时不检查该类型"""
+    kind, _, number = value.partition("=")
+    if kind not in DEFAULT_TOLERANCES or not number:
+        raise argparse.ArgumentTypeError(
+            f"容差格式为 类型=数值，类型可选: {', '.join(DEFAULT_TOLERANCES)}"
+        )
+    if number.lower() == "none":
+        return kind, None
+    return kind, float(number)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="测量各 MCP 工具的冷/热延迟和 SQL 数")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument(
+        "--attributes", type=int, default=30, help="每个实体的平均字段数"
+    )
+    parser.add_argument("--iterations", type=int, default=20, help="每个场景的调用次数")
+    parser.add_argument(
+        "--rounds", type=int, default=3, help="延迟测量轮数，百分位数取各轮最小值"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scenarios", nargs="+", help="只运行指定的场景")
+    parser.add_argument(
+        "--sources", nargs="+", choices=SOURCES, help="数据源，默认全部"
+    )
+    parser.add_argument(
+        "--api-latency-ms", type=float, default=0.0, help="模拟 API 每个请求的延迟"
+    )
+    parser.add_argument(
+        "--api-jitter-ms", type=float, default=0.0, help="模拟 API 延迟的抖动范围"
+    )
+    parser.add_argument("--output", help="把结果写入 JSON 文件")
+    parser.add_argument(
+        "--baseline", help="与基线文件比较，按基线记录的参数运行，有回归时退出码为 1"
+    )
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="用本次结果重写 --baseline 文件"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=_parse_tolerance,
+        action="append",
+        default=[],
+        metavar="KIND=VALUE",
+        help="覆盖回归容差，例如 latency=0.5、queries=0、memory=none",
+    )
+    parser.add_argument(
+        "--gate-latency",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="是否检查延迟，默认只在基线由同一台机器记录时检查",
+    )
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline and not args.update_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        meta = baseline["meta"]
+        args.sizes, args.attributes = meta["sizes"], meta["attributes_per_entity"]
+        args.iterations, args.seed = meta["iterations"], meta["seed"]
+        args.rounds = meta.get("rounds", args.rounds)
+        args.api_latency_ms = meta.get("api_latency_ms", 0.0)
+        args.api_jitter_ms = meta.get("api_jitter_ms", 0.0)
+        args.sources = args.sources or meta.get("sources", list(SOURCES))
+        # 只运行部分数据源或场景时只与这些场景的基线比较
+        baseline["results"] = {
+            key: metrics
+            for key, metrics in baseline["results"].items()
+            if key.split("/")[1] in args.sources
+            and (not args.scenarios or key.split("/")[2] in args.scenarios)
+        }
+
+    report = run_suite(
+        args.sizes,
+        args.attributes,
+        args.iterations,
+        args.seed,
+        args.scenarios,
+        args.rounds,
+        args.sources,
+        args.api_latency_ms,
+        args.api_jitter_ms,
+    )
+    print_results(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+
+    if args.baseline and args.update_baseline:
+        report["tolerances"] = {**DEFAULT_TOLERANCES, **dict(args.tolerance)}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"基线已更新: {args.baseline}")
+    elif baseline is not None:
+        gate_latency = args.gate_latency
+        if gate_latency is None:
+            gate_latency = same_host(baseline, report)
+            if not gate_latency:
+                print("基线不是在本机记录的，跳过延迟检查（--gate-latency 强制检查）")
+        regressions = compare(baseline, report, dict(args.tolerance), gate_latency)
+        if regressions:
+            print(f"发现 {len(regressions)} 项性能回归:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"与基线 {args.baseline} 相比没有超出容差的回归")
+
+
+if __name__ == "__main__":
+    main()
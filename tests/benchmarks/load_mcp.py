@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""MCP 负载测试 - 启动真实的服务器，多个客户端会话并发回放加权的调用分布
+
+用法:
+    python tests/benchmarks/load_mcp.py --clients 8 --duration 30
+    python tests/benchmarks/load_mcp.py --transport http --clients 32 --duration 60 \\
+        --workload tests/benchmarks/workload.json --output load-results.json
+
+服务器由 sp-database-mcp 入口启动（不在 PATH 中时使用 python -m
+sp_database_mcp.server，也可用 --command 指定）：
+
+- stdio：每个客户端会话各自启动一个服务器进程，与桌面端智能体的使用方式相同
+- http：启动一个 Streamable HTTP 服务器进程（--server-workers 个 worker），
+  所有客户端会话连接同一个服务器
+
+未指定 --database-url 时用 synthetic_schema 生成 --entities 个实体的临时 SQLite
+数据库。所有会话完成 initialize 后同时开始计时，每个会话按 workload 文件中的权重
+随机选择调用（随机数由 --seed 和会话序号决定），直到 --duration 秒或每个会话
+完成 --requests 次调用。
+
+workload 文件为 JSON，calls 中每项有 weight 和 tool（及 arguments）或 resource
+之一；参数和 URI 中的 {table}、{keyword} 替换为抽样的表名和搜索关键词，可在文件
+中用 tables、keywords 指定。
+
+结果包括吞吐量、整体和各调用的 p50/p95/p99 延迟、错误数，以及每隔
+--sample-interval 秒采样的服务器进程（全部子进程合计）CPU 使用率和 RSS。进程
+信息使用 psutil（如已安装），否则读取 /proc。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shlex
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bench_tools import percentile
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+from synthetic_schema import BUSINESS_OBJECTS, create_sqlite_schema
+
+from sp_database_mcp.database import DatabaseClient
+
+DEFAULT_WORKLOAD = Path(__file__).parent / "workload.json"
+
+
+def load_workload(path: str) -> Dict[str, Any]:
+    """读取并校验 workload 文件"""
+    with open(path, encoding="utf-8") as f:
+        workload = json.load(f)
+    calls = workload.get("calls")
+    if not calls:
+        raise ValueError(f"{path}: calls 不能为空")
+    for index, call in enumerate(calls):
+        if ("tool" in call) == ("resource" in call):
+            raise ValueError(f"{path}: calls[{index}] 需要 tool 或 resource 之一")
+        if not call.get("weight", 0) > 0:
+            raise ValueError(f"{path}: calls[{index}] 的 weight 必须大于 0")
+        call.setdefault("name", call.get("tool") or "read_resource")
+    return workload
+
+
+def fill(value: Any, table: str, keyword: str) -> Any:
+    """替换参数中的 {table} 和 {keyword}"""
+    if isinstance(value, str):
+        return value.replace("{table}", table).replace("{keyword}", keyword)
+    if isinstance(value, dict):
+        return {k: fill(v, table, keyword) for k, v in value.items()}
+    if isinstance(value, list):
+        return [fill(v, table, keyword) for v in value]
+    return value
+
+
+class Workload:
+    """按权重随机选择调用"""
+
+    def __init__(
+        self, calls: List[Dict[str, Any]], tables: List[str], keywords: List[str]
+    ):
+        if not tables or not keywords:
+            raise ValueError("workload 需要至少一个表名和一个搜索关键词")
+        self.calls = calls
+        self.weights = [call["weight"] for call in calls]
+        self.tables = tables
+        self.keywords = keywords
+
+    def pick(self, rng: random.Random) -> Dict[str, Any]:
+        """返回一次调用：{"name", "tool", "arguments"} 或 {"name", "resource"}"""
+        call = rng.choices(self.calls, self.weights)[0]
+        table, keyword = rng.choice(self.tables), rng.choice(self.keywords)
+        if "resource" in call:
+            resource = fill(call["resource"], table, keyword)
+            return {"name": call["name"], "resource": resource}
+        return {
+            "name": call["name"],
+            "tool": call["tool"],
+            "arguments": fill(call.get("arguments", {}), table, keyword),
+        }
+
+
+class ProcessSampler:
+    """定期采样当前进程全部子进程（服务器）的合计 CPU 使用率和 RSS"""
+
+    def __init__(self):
+        try:
+            import psutil
+        except ImportError:
+            psutil = None
+        self._psutil = psutil
+        self._clock_ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+        self._cpu_times: Dict[int, float] = {}
+        self._last = time.perf_counter()
+        self.samples: List[Dict[str, float]] = []
+
+    @property
+    def available(self) -> bool:
+        return self._psutil is not None or os.path.isdir("/proc/self")
+
+    def _children(self) -> Dict[int, Tuple[float, int]]:
+        """子进程 pid -> (累计 CPU 秒数, RSS 字节数)"""
+        if self._psutil is not None:
+            stats = {}
+            for child in self._psutil.Process().children(recursive=True):
+                try:
+                    cpu = child.cpu_times()
+                    stats[child.pid] = (cpu.user + cpu.system, child.memory_info().rss)
+                except self._psutil.Error:
+                    continue
+            return stats
+
+        parents, stats = {}, {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # comm 可能含空格，从最后一个 ")" 之后开始按空格分割
+                    fields = f.read().rsplit(")", 1)[1].split()
+            except OSError:
+                continue
+            pid = int(entry)
+            parents[pid] = int(fields[1])
+            cpu = (int(fields[11]) + int(fields[12])) / self._clock_ticks
+            stats[pid] = (cpu, int(fields[21]) * os.sysconf("SC_PAGE_SIZE"))
+
+        children, pending = set(), [os.getpid()]
+        while pending:
+            parent = pending.pop()
+            for pid, ppid in parents.items():
+                if ppid == parent and pid not in children:
+                    children.add(pid)
+                    pending.append(pid)
+        return {pid: stats[pid] for pid in children}
+
+    def sample(self, elapsed: float):
+        now = time.perf_counter()
+        children = self._children()
+        cpu_delta = sum(
+            cpu - self._cpu_times.get(pid, cpu) for pid, (cpu, _) in children.items()
+        )
+        wall = now - self._last
+        self.samples.append(
+            {
+                "t": round(elapsed, 2),
+                "cpu_percent": round(cpu_delta / wall * 100, 1) if wall > 0 else 0.0,
+                "rss_mib": round(sum(rss for _, rss in children.values()) / 2**20, 1),
+                "processes": len(children),
+            }
+        )
+        self._cpu_times = {pid: cpu for pid, (cpu, _) in children.items()}
+        self._last = now
+
+    def reset(self):
+        """以当前的 CPU 时间为起点，丢弃之前的样本"""
+        self._cpu_times = {pid: cpu for pid, (cpu, _) in self._children().items()}
+        self._last = time.perf_counter()
+        self.samples = []
+
+
+def server_command(command: Optional[str] = None) -> List[str]:
+    if command:
+        return shlex.split(command)
+    entry_point = shutil.which("sp-database-mcp")
+    if entry_point:
+        return [entry_point]
+    return [sys.executable, "-m", "sp_database_mcp.server"]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_for_port(port: int, proc: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"HTTP 服务器启动失败，退出码 {proc.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"HTTP 服务器在 {timeout:g} 秒内没有开始监听端口 {port}")
+
+
+@asynccontextmanager
+async def _session(transport: str, command: List[str], env: Dict[str, str], url: str):
+    if transport == "stdio":
+        params = StdioServerParameters(command=command[0], args=command[1:], env=env)
+        client = stdio_client(params, errlog=subprocess.DEVNULL)
+    else:
+        client = streamablehttp_client(url)
+    async with client as streams:
+        async with ClientSession(streams[0], streams[1]) as session:
+            await session.initialize()
+            yield session
+
+
+async def _call(session: ClientSession, call: Dict[str, Any]) -> bool:
+    """执行一次调用，返回是否成功"""
+    try:
+        if "resource" in call:
+            await session.read_resource(call["resource"])
+            return True
+        result = await session.call_tool(call["tool"], call["arguments"])
+        return not result.isError
+    except Exception:
+        return False
+
+
+async def _run_client(
+    index: int,
+    open_session,
+    workload: Workload,
+    seed: int,
+    ready: asyncio.Queue,
+    start: asyncio.Event,
+    limits: Tuple[float, Optional[int]],
+    think_time: float,
+) -> List[Tuple[float, float, str, bool]]:
+    """一个客户端会话，返回 [(开始时刻, 延迟秒数, 调用名, 是否成功)]"""
+    duration, max_requests = limits
+    rng = random.Random(f"{seed}/{index}")
+    records = []
+    async with open_session() as session:
+        await ready.put(index)
+        await start.wait()
+        started = time.perf_counter()
+        while time.perf_counter() - started < duration and (
+            max_requests is None or len(records) < max_requests
+        ):
+            call = workload.pick(rng)
+            call_started = time.perf_counter()
+            ok = await _call(session, call)
+            records.append(
+                (
+                    call_started - started,
+                    time.perf_counter() - call_started,
+                    call["name"],
+                    ok,
+                )
+            )
+            if think_time:
+                await asyncio.sleep(think_time)
+    return records
+
+
+def _latency_metrics(latencies: List[float], errors: int) -> Dict[str, float]:
+    values = sorted(latency * 1000 for latency in latencies)
+    return {
+        "calls": len(values),
+        "errors": errors,
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "mean_ms": round(sum(values) / len(values), 3) if values else 0.0,
+        "max_ms": round(values[-1], 3) if values else 0.0,
+    }
+
+
+def summarize_run(
+    records: List[Tuple[float, float, str, bool]],
+    elapsed: float,
+    samples: List[Dict[str, float]],
+) -> Dict[str, Any]:
+    """汇总全部会话的调用记录和进程采样"""
+    operations: Dict[str, List[Tuple[float, bool]]] = {}
+    for _, latency, name, ok in records:
+        operations.setdefault(name, []).append((latency, ok))
+
+    summary = _latency_metrics(
+        [r[1] for r in records], sum(1 for r in records if not r[3])
+    )
+    summary["elapsed_s"] = round(elapsed, 3)
+    summary["throughput_per_s"] = round(len(records) / elapsed, 1) if elapsed else 0.0
+
+    # 每个采样区间内开始的调用数
+    timeline, previous = [], 0.0
+    for sample in samples:
+        calls = sum(1 for r in records if previous <= r[0] < sample["t"])
+        timeline.append({**sample, "calls": calls})
+        previous = sample["t"]
+
+    return {
+        "summary": summary,
+        "operations": {
+            name: _latency_metrics(
+                [latency for latency, _ in calls], sum(1 for _, ok in calls if not ok)
+            )
+            for name, calls in sorted(operations.items())
+        },
+        "timeline": timeline,
+    }
+
+
+async def run_load(
+    workload: Workload,
+    clients: int,
+    transport: str = "stdio",
+    command: Optional[List[str]] = None,
+    env: Optional[Dict[str, str]] = None,
+    duration: float = 30.0,
+    requests: Optional[int] = None,
+    think_time: float = 0.0,
+    seed: int = 0,
+    sample_interval: float = 1.0,
+    server_workers: int = 1,
+) -> Dict[str, Any]:
+    """启动服务器并运行负载，返回 summarize_run 的结果"""
+    command = command or server_command()
+    env = env if env is not None else dict(os.environ)
+    server_proc, url = None, ""
+    if transport == "http":
+        port = _free_port()
+        server_proc = subprocess.Popen(
+            command
+            + ["--transport", "http", "--port", str(port)]
+            + ["--workers", str(server_workers)],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        url = f"http://127.0.0.1:{port}/mcp"
+
+    sampler = ProcessSampler()
+    ready: asyncio.Queue = asyncio.Queue()
+    start = asyncio.Event()
+    limits = (duration if requests is None else float("inf"), requests)
+    try:
+        if server_proc is not None:
+            await _wait_for_port(port, server_proc)
+        tasks = [
+            asyncio.create_task(
+                _run_client(
+                    index,
+                    lambda: _session(transport, command, env, url),
+                    workload,
+                    seed,
+                    ready,
+                    start,
+                    limits,
+                    think_time,
+                )
+            )
+            for index in range(clients)
+        ]
+        # 全部会话完成 initialize 后同时开始，服务器启动不计入结果
+        for _ in range(clients):
+            getter = asyncio.create_task(ready.get())
+            done, _ = await asyncio.wait(
+                [getter, *tasks], return_when=asyncio.FIRST_COMPLETED
+            )
+            if getter not in done:
+                getter.cancel()
+                for task in done:
+                    task.result()  # 会话在开始前失败时抛出异常
+
+        sampler.reset()
+        started = time.perf_counter()
+        start.set()
+        pending = set(tasks)
+        while pending:
+            _, pending = await asyncio.wait(pending, timeout=sample_interval)
+            # 会话结束后服务器进程随之退出，只采样运行中的区间
+            if pending and sampler.available:
+                sampler.sample(time.perf_counter() - started)
+        records = [record for task in tasks for record in task.result()]
+        # 到最后一次调用完成为止，不计入会话关闭的时间
+        elapsed = max((r[0] + r[1] for r in records), default=0.0)
+    finally:
+        if server_proc is not None:
+            server_proc.terminate()
+            server_proc.wait()
+    return summarize_run(records, elapsed, sampler.samples)
+
+
+def print_report(report: Dict[str, Any]):
+    summary = report["summary"]
+    print(
+        f"共 {summary['calls']} 次调用，{summary['errors']} 次失败，"
+        f"{summary['elapsed_s']:.1f} s，吞吐量 {summary['throughput_per_s']:.1f} 次/s"
+    )
+    print(f"{'调用':<28} {'次数':>7} {'失败':>5} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, m in [("(全部)", summary), *report["operations"].items()]:
+        print(
+            f"{name:<28} {m['calls']:7d} {m['errors']:5d} {m['p50_ms']:9.2f}"
+            f" {m['p95_ms']:9.2f} {m['p99_ms']:9.2f}"
+        )
+    if report["timeline"]:
+        print(f"\n{'t(s)':>7} {'调用':>7} {'CPU%':>7} {'RSS MiB':>9} {'进程':>5}")
+        for sample in report["timeline"]:
+            print(
+                f"{sample['t']:7.1f} {sample['calls']:7d} {sample['cpu_percent']:7.1f}"
+                f" {sample['rss_mib']:9.1f} {sample['processes']:5d}"
+            )
+
+
+def _sample_names(database_url: str, count: int, seed: int) -> List[str]:
+    client = DatabaseClient(database_url)
+    try:
+        names = [n for n in client.get_all_tables() if not n.startswith("da_")]
+    finally:
+        client.close()
+    return random.Random(seed).sample(names, min(count, len(names)))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="多客户端并发回放 MCP 调用的负载测试")
+    parser.add_argument("--clients", type=int, default=4, help="并发的客户端会话数")
+    parser.add_argument("--transport", choices=["stdio", "http"], default="stdio")
+    parser.add_argument("--duration", type=float, default=30.0, help="运行秒数")
+    parser.add_argument(
+        "--requests", type=int, help="每个会话的调用次数，指定时忽略 --duration"
+    )
+    parser.add_argument("--think-ms", type=float, default=0.0, help="两次调用之间的间隔")
+    parser.add_argument("--workload", default=str(DEFAULT_WORKLOAD))
+    parser.add_argument("--database-url", help="使用已有数据库，不生成合成 schema")
+    parser.add_argument("--entities", type=int, default=500, help="合成 schema 的实体数")
+    parser.add_argument(
+        "--attributes", type=int, default=30, help="合成 schema 每个实体的平均字段数"
+    )
+    parser.add_argument("--tables", type=int, default=200, help="抽样的表名数量")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument(
+        "--server-workers", type=int, default=1, help="http 模式的服务器 worker 数"
+    )
+    parser.add_argument("--command", help="启动服务器的命令，默认 sp-database-mcp")
+    parser.add_argument(
+        "--env", action="append", default=[], metavar="KEY=VALUE", help="服务器环境变量"
+    )
+    parser.add_argument("--output", help="把结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    workload_file = load_workload(args.workload)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database_url = args.database_url
+        if not database_url:
+            db_path = os.path.join(tmp_dir, "lowcode.db")
+            create_sqlite_schema(
+                db_path,
+                entities=args.entities,
+                attributes=args.entities * args.attributes,
+                seed=args.seed,
+                physical_tables=True,
+            )
+            database_url = f"sqlite:///{db_path}"
+        tables = workload_file.get("tables") or _sample_names(
+            database_url, args.tables, args.seed
+        )
+        keywords = workload_file.get("keywords") or [
+            code for _, code in BUSINESS_OBJECTS
+        ]
+        workload = Workload(workload_file["calls"], tables, keywords)
+
+        # 空字符串的变量不会被服务器的 .env 覆盖：不连接 API、不写入访问记录
+        env = {
+            **os.environ,
+            "DATABASE_URL": database_url,
+            "API_BASE_URL": "",
+            "USAGE_LOG_PATH": "",
+        }
+        env.update(item.split("=", 1) for item in args.env)
+
+        report = asyncio.run(
+            run_load(
+                workload,
+                args.clients,
+                args.transport,
+                server_command(args.command),
+                env,
+                args.duration,
+                args.requests,
+                args.think_ms / 1000,
+                args.seed,
+                args.sample_interval,
+                args.server_workers,
+            )
+        )
+
+    report["meta"] = {
+        "clients": args.clients,
+        "transport": args.transport,
+        "workload": args.workload,
+        "database_url": args.database_url or f"synthetic:{args.entities}",
+        "seed": args.seed,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""模拟 schema API - 用合成低代码 schema 提供 APIClient 访问的全部接口
+
+用法:
+    # 独立的 HTTP 服务器，配合 API_BASE_URL=http://127.0.0.1:8900 使用
+    python tests/benchmarks/schema_api.py --db /tmp/lowcode.db --port 8900 \\
+        --latency-ms 20 --jitter-ms 10 --error-rate 0.01
+
+    # 进程内使用，不经过网络
+    api = SchemaAPI("/tmp/lowcode.db", latency_ms=20)
+    client = APIClient("http://schema-api.test", transport=api.transport())
+
+数据来自 synthetic_schema 生成的 SQLite 数据库（不指定 --db 时按 --entities 等
+参数临时生成），提供：
+
+- GET /api/schema/entity/{code}、/api/schema/entity/by-id/{id}、
+  /api/schema/entity/{id}/attributes（低代码 schema 接口）
+- GET /api/database/tables、/api/database/tables/search?q=、
+  /api/database/tables/{name}、/api/database/tables/{name}/docs
+
+每个请求按 latency ± jitter 毫秒延迟后返回，并按 error_rate 的概率返回 500；
+随机数来自以 seed 初始化的 random.Random。stats 记录请求数、各接口的请求数、
+注入的错误数和同时处理中的最大请求数，用于观察连接复用和并发扇出。
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import httpx
+
+# (接口名, 路径正则)，按顺序匹配
+_ROUTES = [
+    ("entity_by_id", re.compile(r"^/api/schema/entity/by-id/(?P<id>[^/]+)$")),
+    ("attributes", re.compile(r"^/api/schema/entity/(?P<id>[^/]+)/attributes$")),
+    ("entity", re.compile(r"^/api/schema/entity/(?P<code>[^/]+)$")),
+    ("tables", re.compile(r"^/api/database/tables$")),
+    ("search", re.compile(r"^/api/database/tables/search$")),
+    ("docs", re.compile(r"^/api/database/tables/(?P<name>[^/]+)/docs$")),
+    ("table", re.compile(r"^/api/database/tables/(?P<name>[^/]+)$")),
+]
+
+_ENTITY_FIELDS = "id, name, code, table_name, description"
+
+
+class SchemaAPI:
+    """以 SQLite 中的合成 schema 为数据的模拟 API"""
+
+    def __init__(
+        self,
+        db_path: str,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self.stats: Dict[str, Any] = {
+            "requests": 0,
+            "errors": 0,
+            "in_flight": 0,
+            "max_in_flight": 0,
+            "routes": Counter(),
+        }
+
+    def close(self):
+        self._conn.close()
+
+    def _delay(self) -> float:
+        jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(self.latency_ms + jitter, 0.0) / 1000
+
+    async def respond(
+        self, method: str, path: str, params: Dict[str, str]
+    ) -> Tuple[int, Any]:
+        """处理一个请求，返回 (状态码, JSON 数据)"""
+        stats = self.stats
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        try:
+            delay = self._delay()
+            failed = self._rng.random() < self.error_rate
+            if delay:
+                await asyncio.sleep(delay)
+            if failed:
+                stats["errors"] += 1
+                return 500, {"error": "injected error"}
+            if method != "GET":
+                return 405, {"error": "method not allowed"}
+            for route, pattern in _ROUTES:
+                match = pattern.match(path)
+                if match:
+                    stats["routes"][route] += 1
+                    return getattr(self, f"_{route}")(params, **match.groupdict())
+            return 404, {"error": "not found"}
+        finally:
+            stats["in_flight"] -= 1
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        """httpx.MockTransport 的处理函数"""
+        status, payload = await self.respond(
+            request.method, request.url.path, dict(request.url.params)
+        )
+        return httpx.Response(status, json=payload)
+
+    def transport(self) -> httpx.MockTransport:
+        """进程内的 httpx 传输层，传给 APIClient(transport=...)"""
+        return httpx.MockTransport(self.handle)
+
+    def asgi_app(self):
+        """ASGI 应用，用 uvicorn 作为独立的 HTTP 服务器运行"""
+        from starlette.applications import Starlette
+        from starlette.responses import JSONResponse
+        from starlette.routing import Route
+
+        async def endpoint(request):
+            status, payload = await self.respond(
+                request.method, request.url.path, dict(request.query_params)
+            )
+            return JSONResponse(payload, status_code=status)
+
+        return Starlette(routes=[Route("/{path:path}", endpoint, methods=["GET"])])
+
+    # 各接口的实现，返回 (状态码, JSON 数据)
+
+    def _entity_row(self, column: str, value: Any) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            f"SELECT {_ENTITY_FIELDS} FROM da_logic_entity WHERE {column} = ?",
+            (value,),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def _entity(self, params, code: str):
+        entity = self._entity_row("code", code)
+        return (200, {"data": entity}) if entity else (404, {"data": None})
+
+    def _entity_by_id(self, params, id: str):
+        entity = self._entity_row("id", id)
+        return (200, {"data": entity}) if entity else (404, {"data": None})
+
+    def _attribute_rows(self, entity_ids: List[Any]) -> List[Dict[str, Any]]:
+        placeholders = ", ".join("?" * len(entity_ids))
+        return [
+            dict(row)
+            for row in self._conn.execute(
+                "SELECT * FROM da_entity_attribute"
+                f" WHERE entity_id IN ({placeholders}) ORDER BY entity_id, id",
+                entity_ids,
+            )
+        ]
+
+    def _attributes(self, params, id: str):
+        return 200, {"data": self._attribute_rows([id])}
+
+    def _tables(self, params):
+        rows = self._conn.execute("SELECT code FROM da_logic_entity ORDER BY id")
+        return 200, {"tables": [row[0] for row in rows]}
+
+    def _table_dicts(self, entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """把实体转换为传统表结构接口的格式"""
+        if not entities:
+            return []
+        attributes: Dict[Any, List[Dict[str, Any]]] = {e["id"]: [] for e in entities}
+        for attr in self._attribute_rows(list(attributes)):
+            attributes[attr["entity_id"]].append(attr)
+        ref_ids = sorted(
+            {a["ref_entity_id"] for attrs in attributes.values() for a in attrs}
+            - {None}
+        )
+        ref_tables = {}
+        if ref_ids:
+            placeholders = ", ".join("?" * len(ref_ids))
+            ref_tables = dict(
+                self._conn.execute(
+                    "SELECT id, table_name FROM da_logic_entity"
+                    f" WHERE id IN ({placeholders})",
+                    ref_ids,
+                ).fetchall()
+            )
+
+        tables = []
+        for entity in entities:
+            attrs = attributes[entity["id"]]
+            tables.append(
+                {
+                    "name": entity["code"],
+                    "comment": f"{entity['name']} - {entity['description']}"
+                    if entity["description"]
+                    else entity["name"],
+                    "columns": [
+                        {
+                            "name": attr["column_name"] or attr["code"],
+                            "type": attr["data_type"],
+                            "nullable": not attr["required"],
+                            "default": attr["default_value"],
+                            "comment": attr["name"],
+                            "is_primary_key": bool(attr["primary_key"]),
+                            "is_foreign_key": attr["ref_type"] == "foreign_key",
+                            "max_length": attr["data_length"],
+                        }
+                        for attr in attrs
+                    ],
+                    "indexes": [],
+                    "foreign_keys": [
+                        {
+                            "column": attr["column_name"] or attr["code"],
+                            "referenced_table": ref_tables[attr["ref_entity_id"]],
+                            "referenced_column": "id",
+                        }
+                        for attr in attrs
+                        if attr["ref_type"] == "foreign_key"
+                        and attr["ref_entity_id"] in ref_tables
+                    ],
+                }
+            )
+        return tables
+
+    def _search(self, params):
+        keyword = f"%{params.get('q', '')}%"
+        entities = [
+            dict(row)
+            for row in self._conn.execute(
+                f"SELECT {_ENTITY_FIELDS} FROM da_logic_entity"
+                " WHERE code LIKE ? OR name LIKE ? ORDER BY id",
+                (keyword, keyword),
+            )
+        ]
+        return 200, {"tables": self._table_dicts(entities)}
+
+    def _table(self, params, name: str):
+        entity = self._entity_row("code", name)
+        if not entity:
+            return 404, {"error": f"table {name} not found"}
+        return 200, self._table_dicts([entity])[0]
+
+    def _docs(self, params, name: str):
+        entity = self._entity_row("code", name)
+        if not entity:
+            return 404, {"error": f"table {name} not found"}
+        documentation = f"# {entity['name']}\n\n{entity['description'] or ''}\n"
+        return 200, {"documentation": documentation}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="运行模拟 schema API 服务器")
+    parser.add_argument("--db", help="synthetic_schema 生成的 SQLite 数据库")
+    parser.add_argument("--entities", type=int, default=1000, help="未指定 --db 时生成")
+    parser.add_argument(
+        "--attributes", type=int, default=30, help="未指定 --db 时每个实体的平均字段数"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = args.db
+        if not db_path:
+            from synthetic_schema import create_sqlite_schema
+
+            db_path = os.path.join(tmp_dir, "lowcode.db")
+            create_sqlite_schema(
+                db_path,
+                entities=args.entities,
+                attributes=args.entities * args.attributes,
+                seed=args.seed,
+            )
+        api = SchemaAPI(
+            db_path, args.latency_ms, args.jitter_ms, args.error_rate, args.seed
+        )
+        print(f"模拟 schema API: http://{args.host}:{args.port}")
+        try:
+            uvicorn.run(api.asgi_app(), host=args.host, port=args.port)
+        finally:
+            print(
+                f"共处理 {api.stats['requests']} 个请求，注入 {api.stats['errors']} 个"
+                f"错误，最大并发 {api.stats['max_in_flight']}"
+            )
+            api.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -15,74 +15,15 @@ sys.path.insert(0, project_root)
 
 try:
     from sp_database_mcp.database import DatabaseClient
+    from sp_database_mcp.system_fields import default_classifier
 except ImportError:
     print("❌ 无法导入 DatabaseClient，请检查项目结构")
     sys.exit(1)
 
 
 def is_system_field(column_name):
-    """判断是否为系统字段"""
-    # 定义常见的系统字段模式
-    system_field_patterns = [
-        # 时间相关
-        "created_at",
-        "updated_at",
-        "deleted_at",
-        "create_time",
-        "update_time",
-        "delete_time",
-        "created_time",
-        "updated_time",
-        "deleted_time",
-        # 操作人相关
-        "created_by",
-        "updated_by",
-        "deleted_by",
-        "create_user",
-        "update_user",
-        "delete_user",
-        "creator",
-        "updater",
-        "deleter",
-        # 删除标记
-        "is_deleted",
-        "del_flag",
-        "delete_flag",
-        "deleted",
-        "is_delete",
-        # 版本控制
-        "system_version",
-        "version",
-        "revision",
-        # 系统事件
-        "system_event",
-        "event_type",
-        # 数据源
-        "data_source",
-        "source",
-        # 生效相关
-        "effective_start_time",
-        "effective_end_time",
-        "effective_status",
-        "effective_condition",
-        "effective_condition_status",
-        # 组织相关（可能是系统级别）
-        "owner_org_code",
-        "corp_id",
-        # 其他系统字段
-        "latest",
-        "app_belong",
-        "access_modifier",
-    ]
-
-    column_lower = column_name.lower()
-
-    # 检查是否匹配系统字段模式
-    for pattern in system_field_patterns:
-        if pattern.lower() in column_lower:
-            return True
-
-    return False
+    """判断是否为系统字段（使用服务器内置的系统字段规则）"""
+    return default_classifier().is_system(column_name)
 
 
 def get_business_fields_info(client, table_name, show_system_fields=False):
@@ -104,7 +45,7 @@ def get_business_fields_info(client, table_name, show_system_fields=False):
         system_fields = []
 
         for col in table_info.columns:
-            if is_system_field(col.name):
+            if col.is_system:
                 system_fields.append(col)
             else:
                 business_fields.append(col)
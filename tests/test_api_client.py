@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""APIClient 的单元测试，使用 tests/benchmarks/schema_api.py 的模拟 API"""
+
+import asyncio
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sp_database_mcp.api_client import APIClient
+from tests.benchmarks.schema_api import SchemaAPI
+from tests.benchmarks.synthetic_schema import create_sqlite_schema
+
+
+@pytest.fixture(scope="module")
+def schema_db(tmp_path_factory):
+    db_path = tmp_path_factory.mktemp("schema_api") / "lowcode.db"
+    create_sqlite_schema(str(db_path), entities=20, attributes=200, fk_density=0.2)
+    return str(db_path)
+
+
+@pytest.fixture
+def api(schema_db):
+    api = SchemaAPI(schema_db)
+    yield api
+    api.close()
+
+
+def _client(api: SchemaAPI, **kwargs) -> APIClient:
+    return APIClient("http://schema-api.test", transport=api.transport(), **kwargs)
+
+
+def _table_with_foreign_keys(db_path: str) -> str:
+    conn = sqlite3.connect(db_path)
+    (code,) = conn.execute(
+        "SELECT e.code FROM da_logic_entity e JOIN da_entity_attribute a"
+        " ON a.entity_id = e.id WHERE a.ref_type = 'foreign_key' ORDER BY e.id"
+    ).fetchone()
+    conn.close()
+    return code
+
+
+@pytest.mark.asyncio
+async def test_get_table_info_from_schema_api(api, schema_db):
+    """测试通过 schema 接口获取表结构，每个外键额外请求一次引用的实体"""
+    client = _client(api)
+    table_name = _table_with_foreign_keys(schema_db)
+
+    table_info = await client.get_table_info(table_name)
+    assert table_info.name == table_name
+    assert table_info.columns[0].code == "id"
+    assert table_info.foreign_keys
+    routes = api.stats["routes"]
+    assert routes["entity"] == routes["attributes"] == 1
+    assert routes["entity_by_id"] == len(table_info.foreign_keys)
+
+    assert await client.get_table_info("missing_table") is None
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_traditional_endpoints(api):
+    """测试表列表、搜索和文档接口"""
+    client = _client(api)
+
+    tables = await client.get_all_tables()
+    assert len(tables) == 20
+    results = await client.search_tables(tables[0])
+    assert tables[0] in [t.name for t in results]
+    assert all(t.columns and t.columns[0].code for t in results)
+    documentation = await client.get_table_documentation(tables[0])
+    assert documentation.startswith("# ")
+    assert await client.get_table_documentation("missing_table") is None
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_injected_errors(schema_db):
+    """测试注入的 500 错误按请求失败处理"""
+    api = SchemaAPI(schema_db, error_rate=1.0)
+    client = _client(api)
+
+    assert await client.get_all_tables() == []
+    assert await client.get_table_info("any_table") is None
+    assert api.stats["errors"] == api.stats["requests"] == 3
+    await client.aclose()
+    api.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_with_latency(schema_db):
+    """测试注入延迟后并发请求同时处理，总耗时接近单个请求的延迟"""
+    api = SchemaAPI(schema_db, latency_ms=50, jitter_ms=10, seed=1)
+    client = _client(api)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(client.get_all_tables() for _ in range(10)))
+    elapsed = time.perf_counter() - started
+
+    assert all(len(tables) == 20 for tables in results)
+    assert api.stats["max_in_flight"] == 10
+    assert 0.04 <= elapsed < 0.3
+    await client.aclose()
+    api.close()
+
+
+@pytest.mark.asyncio
+async def test_asgi_app(api):
+    """测试作为 HTTP 服务器运行时的 ASGI 应用返回同样的数据"""
+    transport = httpx.ASGITransport(app=api.asgi_app())
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://schema-api.test"
+    ) as http:
+        response = await http.get("/api/database/tables")
+        assert response.status_code == 200
+        assert len(response.json()["tables"]) == 20
+        response = await http.get("/api/unknown")
+        assert response.status_code == 404
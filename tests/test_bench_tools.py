@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""MCP 工具基准运行器的单元测试"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sp_database_mcp import server
+from tests.benchmarks.bench_tools import compare, percentile, run_suite, summarize
+
+
+def test_percentile_and_summary():
+    """测试百分位数插值和场景指标汇总"""
+    values = [1.0, 2.0, 3.0, 4.0]
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 100) == 4.0
+    assert percentile([], 50) == 0.0
+
+    metrics = summarize([0.001, 0.003], queries=5)
+    assert metrics["calls"] == 2
+    assert metrics["p50_ms"] == 2.0
+    assert metrics["max_ms"] == 3.0
+    assert metrics["queries_per_call"] == 2.5
+
+
+def test_run_suite_cold_and_warm(monkeypatch):
+    """测试小规模 schema 上的冷/热场景：冷调用查询数据库或 API，热调用不执行 SQL"""
+    monkeypatch.setattr(server, "registry", server.registry)
+    monkeypatch.setattr(server, "usage_log", server.usage_log)
+
+    report = run_suite([12], attributes=10, iterations=3, seed=1, rounds=1)
+    results = report["results"]
+    assert report["meta"]["sizes"] == [12]
+    assert {key.split("/")[1] for key in results} == {"database", "api"}
+    assert {key.split("/")[2] for key in results} == {
+        "get_table_info",
+        "search_tables",
+        "list_all_tables",
+        "get_table_documentation",
+        "read_resource",
+        "list_resources",
+    }
+    for key, metrics in results.items():
+        assert metrics["calls"] == 3
+        if key.endswith("/warm"):
+            assert metrics["queries_per_call"] == 0
+        if "/api/" in key:
+            assert metrics["queries_per_call"] == 0
+    assert results["12/database/get_table_info/cold"]["queries_per_call"] > 0
+    assert results["12/api/get_table_info/cold"]["http_requests_per_call"] >= 2
+    assert results["12/api/get_table_info/warm"]["http_requests_per_call"] == 0
+
+
+def _report(host="bench-host", **metrics):
+    base = {"p50_ms": 1.0, "p95_ms": 2.0, "queries_per_call": 3.0, "peak_kib": 100.0}
+    return {
+        "meta": {"host": host},
+        "results": {"10/database/get_table_info/cold": {**base, **metrics}},
+    }
+
+
+def test_compare_against_baseline():
+    """测试回归检查：SQL 数增加即失败，延迟和内存在容差和绝对下限内通过"""
+    baseline = _report()
+    assert compare(baseline, _report()) == []
+    assert compare(baseline, _report(p50_ms=2.9, peak_kib=300.0)) == []
+
+    regressions = compare(baseline, _report(queries_per_call=4.0))
+    assert len(regressions) == 1 and "queries_per_call" in regressions[0]
+    assert compare(baseline, _report(p95_ms=50.0))
+    assert compare(baseline, _report(p95_ms=50.0), {"latency": None}) == []
+    # 其他机器记录的基线只比较 SQL/HTTP 请求数和内存，除非强制检查延迟
+    assert compare(baseline, _report(host="other", p95_ms=50.0)) == []
+    assert compare(baseline, _report(host="other", p95_ms=50.0), gate_latency=True)
+    assert compare(baseline, _report(host="other", queries_per_call=4.0))
+    assert compare(baseline, {"results": {}}) == [
+        "10/database/get_table_info/cold: 缺少该场景的结果"
+    ]
+
+    # 基线文件中记录的容差优先于默认值
+    baseline["tolerances"] = {"queries": 1.0}
+    assert compare(baseline, _report(queries_per_call=4.0)) == []
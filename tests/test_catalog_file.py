@@ -0,0 +1,185 @@
+"""二进制表目录文件测试"""
+
+import asyncio
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from sp_database_mcp.catalog import TableCatalog
+from sp_database_mcp.catalog_file import (
+    CatalogFileError,
+    MappedCatalog,
+    write_catalog_file,
+)
+from sp_database_mcp.models import ColumnFilter, ColumnInfo, TableInfo
+
+
+def _table(name: str) -> TableInfo:
+    return TableInfo(
+        name=name,
+        comment=f"{name} 表",
+        columns=[
+            ColumnInfo(
+                name="id",
+                type="bigint",
+                code="id",
+                nullable=False,
+                is_primary_key=True,
+                max_length=20,
+            ),
+            ColumnInfo(
+                name="负责人",
+                type="bigint",
+                code="owner_id",
+                nullable=True,
+                default="0",
+                comment="负责人 (owner_id)",
+                modifier="admin",
+                is_foreign_key=True,
+                is_system=True,
+            ),
+        ],
+        indexes=[{"name": "pk", "columns": ["id"], "unique": True}],
+        foreign_keys=[
+            {"column": "owner_id", "referenced_table": "user", "referenced_column": "id"}
+        ],
+    )
+
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    path = str(tmp_path / "catalog.bin")
+    write_catalog_file(
+        path,
+        [
+            ("database", _table("orders")),
+            ("database", _table("活动")),
+            ("database", _table("accounts")),
+            ("api", _table("orders")),
+        ],
+        version=7,
+    )
+    return path
+
+
+def test_round_trip_and_lookup(catalog_path):
+    """测试写入后按数据源类型和表名查找，解码结果与原对象一致"""
+    mapped = MappedCatalog(catalog_path)
+
+    assert mapped.version == 7
+    assert len(mapped) == 4
+    assert mapped.sources() == ["api", "database"]
+    assert mapped.table_names("database") == ["accounts", "orders", "活动"]
+    assert mapped.table_names("api") == ["orders"]
+    assert mapped.table_names("missing") == []
+
+    table_info = mapped.get_table_info("database", "活动")
+    assert table_info == _table("活动")
+    assert table_info.model_dump_json() == _table("活动").model_dump_json()
+    assert mapped.get_table_info("database", "order") is None
+    assert mapped.get_table_info("api", "accounts") is None
+
+    column_filter = ColumnFilter(exclude_system=True)
+    assert mapped.get_filtered_table_info(
+        "database", "活动", column_filter
+    ) == column_filter.apply(_table("活动"))
+
+
+def test_rejects_other_files(tmp_path):
+    """测试非目录文件被拒绝"""
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a catalog file" * 10)
+    with pytest.raises(CatalogFileError):
+        MappedCatalog(str(path))
+
+
+def test_table_catalog_reads_through_mapping(catalog_path):
+    """测试表目录优先读取映射文件，被失效的表改为通过 loader 重新加载"""
+    catalog = TableCatalog()
+    catalog.attach(MappedCatalog(catalog_path))
+    loaded = []
+
+    async def load_info(table_name):
+        loaded.append(table_name)
+        return TableInfo(name=table_name, columns=[])
+
+    async def load_names():
+        return ["orders"]
+
+    async def run():
+        assert catalog.version == 7
+        assert await catalog.get_table_names("database", load_names) == [
+            "accounts",
+            "orders",
+            "活动",
+        ]
+        assert await catalog.get_table_info("database", "orders", load_info) == (
+            _table("orders")
+        )
+        assert loaded == []
+
+        catalog.invalidate("database", "orders")
+        table_info = await catalog.get_table_info("database", "orders", load_info)
+        assert table_info.columns == []
+        assert loaded == ["orders"]
+
+        catalog.invalidate("database")
+        assert await catalog.get_table_names("database", load_names) == ["orders"]
+        # 其他数据源类型仍然读取映射文件
+        assert await catalog.get_table_info("api", "orders", load_info) == _table(
+            "orders"
+        )
+
+    asyncio.run(run())
+
+
+def test_attach_replaces_tables_loaded_on_demand(catalog_path, tmp_path):
+    """测试挂载新文件后，之前按需加载的表改为读取新文件（即使 ttl 为无穷大）"""
+    catalog = TableCatalog(ttl=float("inf"))
+    catalog.attach(MappedCatalog(catalog_path))
+
+    async def load_info(table_name):
+        return TableInfo(name=table_name, columns=[])
+
+    async def run():
+        # 旧文件中没有的表按需加载到内存
+        assert (await catalog.get_table_info("database", "b", load_info)).columns == []
+
+        path = str(tmp_path / "catalog-v2.bin")
+        write_catalog_file(path, [("database", _table("b"))], version=8)
+        catalog.attach(MappedCatalog(path))
+        assert catalog.version == 8
+        table_info = await catalog.get_table_info("database", "b", load_info)
+        assert table_info == _table("b")
+
+    asyncio.run(run())
+
+
+def test_write_catalog_command(tmp_path):
+    """测试 --write-catalog 命令写入默认数据源的目录文件"""
+    db_path = tmp_path / "test.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE activity (id INTEGER PRIMARY KEY, title TEXT)")
+    conn.execute("CREATE TABLE member (id INTEGER PRIMARY KEY)")
+    conn.commit()
+    conn.close()
+
+    path = str(tmp_path / "catalog.bin")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+    env.pop("API_BASE_URL", None)
+    subprocess.run(
+        [sys.executable, "-m", "sp_database_mcp.server", "--write-catalog", path],
+        env=env,
+        check=True,
+        capture_output=True,
+    )
+
+    mapped = MappedCatalog(path)
+    assert mapped.table_names("database") == ["activity", "member"]
+    assert [c.name for c in mapped.get_table_info("database", "activity").columns] == [
+        "id",
+        "title",
+    ]
@@ -0,0 +1,77 @@
+"""紧凑表结构存储测试"""
+
+from sqlalchemy.sql.elements import quoted_name
+
+from sp_database_mcp.compact import CompactTable, StringPool
+from sp_database_mcp.models import ColumnFilter, ColumnInfo, TableInfo
+
+
+def _table(name: str) -> TableInfo:
+    return TableInfo(
+        name=name,
+        comment=f"{name} 表",
+        columns=[
+            ColumnInfo(
+                name="id",
+                type="bigint",
+                code="id",
+                nullable=False,
+                is_primary_key=True,
+                is_system=True,
+                max_length=20,
+            ),
+            ColumnInfo(
+                name="创建时间",
+                type="datetime",
+                code="created_at",
+                nullable=True,
+                default="CURRENT_TIMESTAMP",
+                comment="创建时间 (created_at)",
+                modifier="admin",
+                is_foreign_key=True,
+            ),
+        ],
+        indexes=[{"name": "pk", "columns": ["id"], "unique": True}],
+        foreign_keys=[],
+    )
+
+
+def test_round_trip_matches_original():
+    """测试还原出的 TableInfo 与原对象一致，序列化结果相同"""
+    table_info = _table("orders")
+    restored = CompactTable.from_table_info(table_info, StringPool()).to_table_info()
+
+    assert restored == table_info
+    assert restored.model_dump_json() == table_info.model_dump_json()
+
+
+def test_tables_share_interned_strings():
+    """测试多个表的重复字符串只在字符串池中保存一份"""
+    pool = StringPool()
+    orders = CompactTable.from_table_info(_table("orders"), pool)
+    size = len(pool)
+    users = CompactTable.from_table_info(_table("users"), pool)
+
+    assert len(pool) == size
+    assert len(users) == 2
+    assert orders.column(1).type is users.column(1).type
+
+
+def test_accepts_str_subclasses():
+    """测试 str 子类（SQLAlchemy 反射出的 quoted_name）可以加入字符串池"""
+    pool = StringPool()
+    string_id = pool.add(quoted_name("Orders", quote=True))
+    assert type(pool.get(string_id)) is str
+    assert pool.get(string_id) == "Orders"
+
+
+def test_filtered_matches_filter_on_model():
+    """测试在紧凑存储上筛选与在 TableInfo 上筛选的结果一致"""
+    table_info = _table("orders")
+    table = CompactTable.from_table_info(table_info, StringPool())
+    for column_filter in (
+        ColumnFilter(exclude_system=True),
+        ColumnFilter(columns=["ID"]),
+        ColumnFilter(column_pattern="created_*"),
+    ):
+        assert table.filtered(column_filter) == column_filter.apply(table_info)
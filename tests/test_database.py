@@ -1,7 +1,7 @@
 """数据库客户端测试"""
 
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import MagicMock, Mock, patch
 from sp_database_mcp.database import DatabaseClient
 from sp_database_mcp.models import TableInfo, ColumnInfo
 
@@ -12,7 +12,7 @@ class TestDatabaseClient:
     @patch('sp_database_mcp.database.create_engine')
     def test_init_success(self, mock_create_engine):
         """测试成功初始化"""
-        mock_engine = Mock()
+        mock_engine = MagicMock()
         mock_create_engine.return_value = mock_engine
         
         client = DatabaseClient("sqlite:///test.db")
@@ -30,7 +30,7 @@ class TestDatabaseClient:
     def test_get_table_info(self, mock_table, mock_metadata, mock_create_engine):
         """测试获取表信息"""
         # Mock 设置
-        mock_engine = Mock()
+        mock_engine = MagicMock()
         mock_create_engine.return_value = mock_engine
         
         mock_column = Mock()
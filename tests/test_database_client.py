@@ -10,11 +10,14 @@ import tempfile
 from pathlib import Path
 
 import pytest
+from sqlalchemy import event
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from sp_database_mcp.catalog_file import MappedCatalog, write_catalog_file
+from sp_database_mcp.compact import CompactTable, StringPool
 from sp_database_mcp.database import DatabaseClient
-from sp_database_mcp.models import ColumnInfo, TableInfo
+from sp_database_mcp.models import ColumnFilter, ColumnInfo, TableInfo
 
 
 class TestDatabaseClient:
@@ -54,6 +57,62 @@ class TestDatabaseClient:
         # 清理
         os.unlink(db_path)
 
+    @pytest.fixture
+    def lowcode_db(self):
+        """创建包含低代码系统 schema 表的临时数据库"""
+        with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as f:
+            db_path = f.name
+
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            CREATE TABLE da_logic_entity (
+                id INTEGER PRIMARY KEY,
+                name VARCHAR(100),
+                code VARCHAR(100),
+                table_name VARCHAR(100),
+                description TEXT
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE da_entity_attribute (
+                id INTEGER PRIMARY KEY,
+                entity_id INTEGER,
+                name VARCHAR(100),
+                code VARCHAR(100),
+                column_name VARCHAR(100),
+                data_type VARCHAR(50),
+                primary_key BOOLEAN,
+                required BOOLEAN,
+                ref_entity_id INTEGER,
+                ref_type VARCHAR(50),
+                is_system BOOLEAN
+            )
+        """)
+        cursor.executemany(
+            "INSERT INTO da_logic_entity VALUES (?, ?, ?, ?, ?)",
+            [
+                (1, "活动", "activity", "activity", "活动主表"),
+                (2, "用户", "user", "user", None),
+            ],
+        )
+        cursor.executemany(
+            "INSERT INTO da_entity_attribute VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (1, 1, "主键", "id", "id", "bigint", 1, 1, None, None, 1),
+                (2, 1, "标题", "title", "title", "varchar", 0, 1, None, None, 0),
+                (3, 1, "负责人", "owner_id", "owner_id", "bigint", 0, 0, 2, "foreign_key", 0),
+            ],
+        )
+
+        conn.commit()
+        conn.close()
+
+        yield f"sqlite:///{db_path}"
+
+        os.unlink(db_path)
+
     def test_database_client_init(self, temp_db):
         """测试数据库客户端初始化"""
         client = DatabaseClient(temp_db)
@@ -81,6 +140,162 @@ class TestDatabaseClient:
         assert name_column is not None
         assert name_column.nullable is False
 
+    def test_probe_without_schema_tables(self, temp_db, capsys):
+        """测试非低代码数据库直接走元数据查询，不再执行失败的 schema 查询"""
+        client = DatabaseClient(temp_db)
+        assert client.has_schema_tables is False
+
+        table_info = client.get_table_info("test_table")
+        assert table_info is not None
+        assert "da_logic_entity" not in capsys.readouterr().out
+
+    def test_probe_with_schema_tables(self, lowcode_db):
+        """测试低代码数据库的探测结果和 schema 查询"""
+        client = DatabaseClient(lowcode_db)
+        assert client.has_schema_tables is True
+        assert "ref_entity_id" in client.attribute_columns
+        # 缺失的可选字段以 NULL 代替
+        assert "default_value" not in client.attribute_columns
+        # 没有 updated_at 字段时不支持水位查询
+        assert client.get_table_watermarks() is None
+
+        table_info = client.get_table_info("activity")
+        assert table_info is not None
+        assert table_info.comment == "活动 - 活动主表"
+        assert [col.code for col in table_info.columns] == ["id", "title", "owner_id"]
+        assert table_info.columns[0].is_system is True
+        assert table_info.columns[1].nullable is False
+        assert table_info.foreign_keys == [
+            {"column": "owner_id", "referenced_table": "user", "referenced_column": "id"}
+        ]
+
+    def test_trusted_models_match_validated_models(self, temp_db, lowcode_db):
+        """测试跳过校验构建的模型与校验构建的模型一致"""
+        conn = sqlite3.connect(lowcode_db.replace("sqlite:///", ""))
+        conn.execute("ALTER TABLE da_entity_attribute ADD COLUMN default_value INTEGER")
+        conn.execute("ALTER TABLE da_entity_attribute ADD COLUMN updated_by INTEGER")
+        conn.execute("UPDATE da_entity_attribute SET default_value = 0, updated_by = 42")
+        conn.commit()
+        conn.close()
+
+        for url, table_name in ((lowcode_db, "activity"), (temp_db, "test_table")):
+            table_info = DatabaseClient(url).get_table_info(table_name)
+            assert TableInfo.model_validate(table_info.model_dump()) == table_info
+            assert table_info.model_dump_json()
+
+        # 非字符串的值被显式转换为模型声明的类型
+        column = DatabaseClient(lowcode_db).get_table_info("activity").columns[0]
+        assert column.default == "0"
+        assert column.modifier == "42"
+
+    def test_column_filter_pushed_into_schema_query(self, lowcode_db):
+        """测试字段筛选条件加入字段查询，只返回满足条件的字段"""
+        client = DatabaseClient(lowcode_db)
+        statements = []
+        event.listen(
+            client.engine,
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement),
+        )
+
+        table_info = client.get_table_info(
+            "activity", ColumnFilter(exclude_system=True)
+        )
+        assert [col.code for col in table_info.columns] == ["title", "owner_id"]
+        assert "is_system" in statements[-2]
+
+        table_info = client.get_table_info(
+            "activity", ColumnFilter(columns=["ID", "负责人"])
+        )
+        assert [col.code for col in table_info.columns] == ["id", "owner_id"]
+        assert table_info.foreign_keys[0]["column"] == "owner_id"
+
+        table_info = client.get_table_info(
+            "activity", ColumnFilter(column_pattern="*_id", exclude_system=True)
+        )
+        assert [col.code for col in table_info.columns] == ["owner_id"]
+        assert "LIKE" in statements[-2]
+
+    def test_filtered_foreign_keys_match_cached_paths(self, lowcode_db, tmp_path):
+        """测试缓存的表结构筛选字段后与直接查询的结果一致，不保留筛选掉字段的外键"""
+        client = DatabaseClient(lowcode_db)
+        full = client.get_table_info("activity")
+        compact = CompactTable.from_table_info(full, StringPool())
+        path = str(tmp_path / "catalog.bin")
+        write_catalog_file(path, [("database", full)])
+        mapped = MappedCatalog(path)
+
+        for columns, foreign_keys in ((["title"], 0), (["title", "owner_id"], 1)):
+            column_filter = ColumnFilter(columns=columns)
+            cold = client.get_table_info("activity", column_filter)
+            assert len(cold.foreign_keys) == foreign_keys
+            assert column_filter.apply(full) == cold
+            assert compact.filtered(column_filter) == cold
+            assert (
+                mapped.get_filtered_table_info("database", "activity", column_filter)
+                == cold
+            )
+
+    def test_column_filter_on_metadata(self, temp_db):
+        """测试非低代码数据库在元数据上筛选字段"""
+        client = DatabaseClient(temp_db)
+        table_info = client.get_table_info(
+            "test_table", ColumnFilter(column_pattern="?ma*")
+        )
+        assert [col.code for col in table_info.columns] == ["email"]
+
+    def test_refresh_reprobes_schema_tables(self, temp_db):
+        """测试 refresh 重新探测低代码 schema 表"""
+        client = DatabaseClient(temp_db)
+        assert client.has_schema_tables is False
+
+        conn = sqlite3.connect(temp_db.replace("sqlite:///", ""))
+        conn.execute("CREATE TABLE da_logic_entity (id INTEGER, name TEXT, code TEXT)")
+        conn.execute(
+            "CREATE TABLE da_entity_attribute (id INTEGER, entity_id INTEGER, name TEXT, code TEXT)"
+        )
+        conn.commit()
+        conn.close()
+
+        client.refresh()
+        assert client.has_schema_tables is True
+
+    def test_probe_error_is_retried(self, lowcode_db, monkeypatch):
+        """测试探测出错时标记为未探测，下次使用时重新探测"""
+        from sqlalchemy.exc import OperationalError
+
+        def broken_inspect(engine):
+            raise OperationalError("SELECT", {}, Exception("connection reset"))
+
+        monkeypatch.setattr("sp_database_mcp.database.inspect", broken_inspect)
+        client = DatabaseClient(lowcode_db)
+        assert client.entity_columns is None
+
+        monkeypatch.undo()
+        assert client.has_schema_tables is True
+        assert client.get_table_info("activity").comment == "活动 - 活动主表"
+
+    @pytest.mark.asyncio
+    async def test_table_list_reload_reprobes_schema_tables(self, temp_db):
+        """测试数据源重新加载表清单时重新探测低代码 schema 表"""
+        from sp_database_mcp.catalog import TableCatalog
+        from sp_database_mcp.datasources import DataSource
+        from sp_database_mcp.models import DataSourceConfig
+
+        client = DatabaseClient(temp_db)
+        datasource = DataSource(DataSourceConfig(name="default"), db_client=client)
+        conn = sqlite3.connect(temp_db.replace("sqlite:///", ""))
+        conn.execute("CREATE TABLE da_logic_entity (id INTEGER, name TEXT, code TEXT)")
+        conn.execute(
+            "CREATE TABLE da_entity_attribute "
+            "(id INTEGER, entity_id INTEGER, name TEXT, code TEXT)"
+        )
+        conn.commit()
+        conn.close()
+
+        await datasource.preload(TableCatalog(ttl=0))
+        assert client.has_schema_tables is True
+
     def test_get_all_tables(self, temp_db):
         """测试获取所有表"""
         client = DatabaseClient(temp_db)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""表结构流式导出的单元测试"""
+
+import gzip
+import io
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sp_database_mcp.database import DatabaseClient
+from sp_database_mcp.export import export_schema, infer_compression, write_jsonl
+from sp_database_mcp.models import TableInfo
+
+
+@pytest.fixture
+def lowcode_url(tmp_path):
+    """包含 3 个低代码实体和 2 个物理表（其中 activity 同时是实体）的数据库"""
+    db_path = tmp_path / "lowcode.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE da_logic_entity (
+            id INTEGER PRIMARY KEY, name TEXT, code TEXT, description TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE da_entity_attribute (
+            id INTEGER PRIMARY KEY, entity_id INTEGER, name TEXT, code TEXT,
+            data_type TEXT, required BOOLEAN, ref_entity_id INTEGER, ref_type TEXT
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO da_logic_entity VALUES (?, ?, ?, ?)",
+        [
+            (1, "活动", "activity", "活动主表"),
+            (2, "用户", "user", None),
+            (5, "报名", "signup", None),
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO da_entity_attribute VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (1, 1, "主键", "id", "bigint", 1, None, None),
+            (2, 1, "负责人", "owner_id", "bigint", 0, 2, "foreign_key"),
+            (3, 2, "主键", "id", "bigint", 1, None, None),
+            (4, 5, "活动", "activity_id", "bigint", 1, 1, "foreign_key"),
+            (5, 5, "用户", "user_id", "bigint", 1, 2, "foreign_key"),
+        ],
+    )
+    conn.execute("CREATE TABLE activity (id INTEGER PRIMARY KEY)")
+    conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, amount DECIMAL(10, 2))")
+    conn.commit()
+    conn.close()
+    return f"sqlite:///{db_path}"
+
+
+def _expected_names():
+    # 实体按 id 顺序，随后是不属于任何实体的物理表
+    return [
+        "activity",
+        "user",
+        "signup",
+        "da_entity_attribute",
+        "da_logic_entity",
+        "orders",
+    ]
+
+
+def test_iter_table_infos_in_batches(lowcode_url):
+    """测试按批读取实体，每批只查询一次字段，结果与单表查询一致"""
+    client = DatabaseClient(lowcode_url)
+    statements = []
+    event.listen(
+        client.engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    tables = list(client.iter_table_infos(batch_size=2))
+    assert sorted(t.name for t in tables) == sorted(_expected_names())
+    assert [t.name for t in tables[:3]] == ["activity", "user", "signup"]
+
+    # 两批实体（2 + 1），每批一次字段查询
+    attribute_queries = [s for s in statements if "WHERE entity_id IN" in s]
+    assert len(attribute_queries) == 2
+
+    for table_info in tables:
+        assert table_info == client.get_table_info(table_info.name)
+    signup = tables[2]
+    assert [fk["referenced_table"] for fk in signup.foreign_keys] == [
+        "activity",
+        "user",
+    ]
+
+
+def test_iter_table_infos_is_lazy(lowcode_url):
+    """测试导出按需读取，只消费第一个表时不读取后续批次"""
+    client = DatabaseClient(lowcode_url)
+    statements = []
+    event.listen(
+        client.engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    tables = client.iter_table_infos(batch_size=1)
+    assert next(tables).name == "activity"
+    assert not any("id > " in s for s in statements)
+
+    with pytest.raises(ValueError):
+        next(client.iter_table_infos(batch_size=0))
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".jsonl.gz"])
+def test_export_schema_round_trip(lowcode_url, tmp_path, suffix):
+    """测试导出文件逐行解析后与数据库中的表结构一致"""
+    client = DatabaseClient(lowcode_url)
+    path = tmp_path / f"schema{suffix}"
+
+    count = export_schema(client, str(path), batch_size=2)
+    assert count == len(_expected_names())
+    assert not list(tmp_path.glob("*.tmp"))
+
+    opener = gzip.open if suffix.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        tables = [TableInfo.model_validate(json.loads(line)) for line in f]
+    assert [t.name for t in tables] == [
+        t.name for t in client.iter_table_infos(batch_size=2)
+    ]
+    assert tables[0] == client.get_table_info("activity")
+    assert "活动主表" in tables[0].comment
+
+
+def _fail_on(fragment):
+    """before_cursor_execute 监听函数：语句包含 fragment 时模拟连接中断"""
+
+    def listener(conn, cursor, statement, *args):
+        if fragment in statement:
+            raise OperationalError(statement, {}, Exception("连接中断"))
+
+    return listener
+
+
+def test_export_schema_failure_leaves_no_file(lowcode_url, tmp_path):
+    """测试读取后续批次失败时导出抛出异常，不留下不完整的文件"""
+    client = DatabaseClient(lowcode_url)
+    listener = _fail_on("id > ")
+    event.listen(client.engine, "before_cursor_execute", listener)
+    path = tmp_path / "schema.jsonl"
+    with pytest.raises(OperationalError):
+        export_schema(client, str(path), batch_size=2)
+    assert not path.exists()
+    assert not list(tmp_path.glob("*.tmp"))
+    event.remove(client.engine, "before_cursor_execute", listener)
+
+    # 检查实体代码失败时抛出异常，不会把实体当作物理表再导出一次
+    event.listen(client.engine, "before_cursor_execute", _fail_on("code IN"))
+    with pytest.raises(OperationalError):
+        list(client.iter_table_infos(batch_size=2))
+
+
+def test_export_command_reports_errors(lowcode_url, tmp_path, monkeypatch, capsys):
+    """测试导出命令遇到不可用的压缩方式时输出错误并以状态码 1 退出"""
+    from sp_database_mcp import server
+    from sp_database_mcp.datasources import (
+        DEFAULT_DATASOURCE,
+        DataSource,
+        DataSourceRegistry,
+    )
+    from sp_database_mcp.models import DataSourceConfig
+
+    registry = DataSourceRegistry()
+    registry.register(
+        DataSource(
+            DataSourceConfig(name=DEFAULT_DATASOURCE, database_url=lowcode_url)
+        )
+    )
+    monkeypatch.setattr(server, "registry", registry)
+    path = tmp_path / "schema.jsonl"
+    with pytest.raises(SystemExit) as exc_info:
+        server._export_schema(str(path), "brotli", batch_size=2)
+    assert exc_info.value.code == 1
+    assert "错误: 导出表结构失败: 不支持的压缩方式: brotli" in capsys.readouterr().err
+    assert not path.exists()
+
+
+def test_write_jsonl_options():
+    """测试压缩方式的推断和校验，未压缩时不关闭输出流"""
+    assert infer_compression("schema.jsonl.gz") == "gzip"
+    assert infer_compression("schema.ZST") == "zstd"
+    assert infer_compression("schema.jsonl") is None
+
+    out = io.BytesIO()
+    table = TableInfo(name="t", columns=[])
+    assert write_jsonl([table, table], out) == 2
+    assert out.getvalue().count(b"\n") == 2
+    assert not out.closed
+
+    with pytest.raises(ValueError):
+        write_jsonl([table], io.BytesIO(), compression="bz2")
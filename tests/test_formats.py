@@ -0,0 +1,79 @@
+"""表结构输出格式测试"""
+
+import csv
+import io
+import json
+
+from sp_database_mcp import formats
+from sp_database_mcp.formats import RENDERERS
+from sp_database_mcp.models import ColumnInfo, TableInfo
+
+
+def _table() -> TableInfo:
+    return TableInfo(
+        name="activity",
+        comment="活动",
+        columns=[
+            ColumnInfo(
+                name="主键",
+                type="bigint",
+                code="id",
+                nullable=False,
+                is_primary_key=True,
+                is_system=True,
+            ),
+            ColumnInfo(
+                name="标题, 名称",
+                type="varchar",
+                code="title",
+                nullable=True,
+                max_length=100,
+                comment='含 "引号"',
+            ),
+            ColumnInfo(name="owner_id", type="bigint", code="owner_id", nullable=True),
+        ],
+        indexes=[{"name": "pk_activity", "columns": ["id"], "unique": True}],
+        foreign_keys=[
+            {"column": "owner_id", "referenced_table": "user", "referenced_column": "id"}
+        ],
+    )
+
+
+def test_json_formats_round_trip():
+    """测试 json / jsonl 可以还原出相同的表结构"""
+    table_info = _table()
+    assert TableInfo.model_validate_json(RENDERERS["json"][0](table_info)) == table_info
+
+    head, *lines = RENDERERS["jsonl"][0](table_info).splitlines()
+    restored = TableInfo(columns=[json.loads(line) for line in lines], **json.loads(head))
+    assert restored == table_info
+
+
+def test_csv_format():
+    """测试 CSV 每行一个字段，特殊字符被正确转义"""
+    rows = list(csv.DictReader(io.StringIO(RENDERERS["csv"][0](_table()))))
+    assert [row["code"] for row in rows] == ["id", "title", "owner_id"]
+    assert rows[1]["name"] == "标题, 名称"
+    assert rows[1]["comment"] == '含 "引号"'
+    assert rows[0]["is_primary_key"] == "1"
+    assert rows[0]["default"] == ""
+
+
+def test_compact_format():
+    """测试紧凑表示法包含字段标记、外键和索引，且比 markdown 和 JSON 更小"""
+    output = RENDERERS["compact"][0](_table())
+    lines = output.splitlines()
+    assert lines[0] == "# activity 活动"
+    assert "id:bigint*!~ 主键" in lines
+    assert "title:varchar(100) 标题, 名称" in lines
+    assert "owner_id:bigint>user.id" in lines
+    assert "@pk_activity unique(id)" in lines
+    assert len(output) < len(RENDERERS["json"][0](_table()))
+
+
+def test_dumps_without_orjson(monkeypatch):
+    """测试未安装 orjson 时使用标准库，输出相同"""
+    value = _table().model_dump()
+    expected = formats.dumps(value)
+    monkeypatch.setattr(formats, "orjson", None)
+    assert formats.dumps(value) == expected
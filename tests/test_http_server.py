@@ -0,0 +1,51 @@
+"""HTTP 传输测试"""
+
+import asyncio
+import socket
+
+import pytest
+import uvicorn
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+from sp_database_mcp import server
+from sp_database_mcp.http_server import create_app
+
+
+@pytest.mark.asyncio
+async def test_concurrent_sessions_share_one_process():
+    """测试多个客户端会话通过 Streamable HTTP 连接同一个服务器进程"""
+    started = asyncio.Event()
+
+    async def background():
+        started.set()
+
+    app = create_app(server.server, background_tasks=[background])
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    http_server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+    serve_task = asyncio.create_task(http_server.serve(sockets=[sock]))
+
+    async def run_session():
+        async with streamablehttp_client(f"http://127.0.0.1:{port}/mcp") as (
+            read_stream,
+            write_stream,
+            _,
+        ):
+            async with ClientSession(read_stream, write_stream) as session:
+                result = await session.initialize()
+                tools = await session.list_tools()
+                return result.capabilities.resources.subscribe, len(tools.tools)
+
+    try:
+        while not http_server.started:
+            await asyncio.sleep(0.01)
+
+        tool_count = len(await server.handle_list_tools())
+        results = await asyncio.gather(*(run_session() for _ in range(3)))
+        assert results == [(True, tool_count)] * 3
+        assert started.is_set()
+    finally:
+        http_server.should_exit = True
+        await serve_task
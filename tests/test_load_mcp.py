@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""MCP 负载测试工具的单元测试"""
+
+import asyncio
+import json
+import os
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tests.benchmarks.load_mcp import (
+    DEFAULT_WORKLOAD,
+    Workload,
+    load_workload,
+    run_load,
+    summarize_run,
+)
+from tests.benchmarks.synthetic_schema import create_sqlite_schema
+
+
+def test_workload_pick_and_validation(tmp_path):
+    """测试按权重选择调用、替换占位符，以及 workload 文件校验"""
+    calls = load_workload(str(DEFAULT_WORKLOAD))["calls"]
+    workload = Workload(calls, ["orders"], ["order"])
+    picks = [workload.pick(random.Random(seed)) for seed in range(200)]
+    names = {pick["name"] for pick in picks}
+    assert {"get_table_info", "search_tables", "read_resource"} <= names
+    for pick in picks:
+        if pick["name"] == "read_resource":
+            assert pick["resource"] == "database://table/orders"
+        elif pick["name"] == "search_tables":
+            assert pick["arguments"]["keyword"] == "order"
+
+    path = tmp_path / "workload.json"
+    path.write_text(json.dumps({"calls": [{"tool": "list_all_tables"}]}))
+    with pytest.raises(ValueError, match="weight"):
+        load_workload(str(path))
+    path.write_text(json.dumps({"calls": [{"weight": 1}]}))
+    with pytest.raises(ValueError, match="tool 或 resource"):
+        load_workload(str(path))
+
+
+def test_summarize_run():
+    """测试吞吐量、各调用的延迟和按采样区间统计的调用数"""
+    records = [
+        (0.1, 0.010, "a", True),
+        (0.5, 0.020, "b", True),
+        (1.2, 0.030, "a", False),
+    ]
+    samples = [{"t": 1.0, "cpu_percent": 50.0, "rss_mib": 60.0, "processes": 1}]
+    report = summarize_run(records, 1.5, samples)
+    assert report["summary"]["calls"] == 3
+    assert report["summary"]["errors"] == 1
+    assert report["summary"]["throughput_per_s"] == 2.0
+    assert report["operations"]["a"]["calls"] == 2
+    assert report["operations"]["a"]["p50_ms"] == 20.0
+    assert report["timeline"] == [{**samples[0], "calls": 2}]
+
+
+def test_run_load_stdio(tmp_path):
+    """测试启动真实的 stdio 服务器，两个会话各完成指定次数的调用"""
+    db_path = tmp_path / "lowcode.db"
+    create_sqlite_schema(str(db_path), entities=10, attributes=100, physical_tables=True)
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "API_BASE_URL": "",
+        "USAGE_LOG_PATH": "",
+    }
+    calls = load_workload(str(DEFAULT_WORKLOAD))["calls"]
+    workload = Workload(calls, ["approval_detail_1"], ["approval"])
+
+    report = asyncio.run(
+        run_load(
+            workload,
+            clients=2,
+            command=[sys.executable, "-m", "sp_database_mcp.server"],
+            env=env,
+            requests=5,
+            sample_interval=0.1,
+        )
+    )
+    assert report["summary"]["calls"] == 10
+    assert report["summary"]["errors"] == 0
+    assert report["summary"]["p99_ms"] > 0
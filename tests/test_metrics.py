@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""运行统计和 server_stats 工具的单元测试"""
+
+import json
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sp_database_mcp import server
+from sp_database_mcp.api_client import APIClient
+from sp_database_mcp.database import DatabaseClient
+from sp_database_mcp.datasources import (
+    DEFAULT_DATASOURCE,
+    DataSource,
+    DataSourceRegistry,
+)
+from sp_database_mcp.metrics import LatencyHistogram, metrics
+from sp_database_mcp.models import DataSourceConfig
+from sp_database_mcp.usage import UsageLog
+from tests.benchmarks.schema_api import SchemaAPI
+from tests.benchmarks.synthetic_schema import create_sqlite_schema
+
+
+@pytest.fixture
+def stats_server(monkeypatch, tmp_path):
+    """使用临时 SQLite 数据库配置服务器，并清空运行统计"""
+    db_path = tmp_path / "stats.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, amount DECIMAL)")
+    conn.commit()
+    conn.close()
+
+    client = DatabaseClient(f"sqlite:///{db_path}")
+    registry = DataSourceRegistry()
+    registry.register(
+        DataSource(
+            DataSourceConfig(name=DEFAULT_DATASOURCE, pinned=True), db_client=client
+        )
+    )
+    monkeypatch.setattr(server, "registry", registry)
+    monkeypatch.setattr(server, "usage_log", UsageLog(None))
+    metrics.reset()
+    yield
+    client.close()
+    metrics.reset()
+
+
+def test_latency_histogram():
+    """测试百分位数取所在桶的上界，超出最后一个上界时取最大值"""
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) == 0.0
+    for ms in [0.3, 0.8, 3.0, 4.0, 15000.0]:
+        histogram.observe(ms)
+    assert histogram.percentile(20) == 0.5
+    assert histogram.percentile(50) == 5
+    assert histogram.percentile(100) == 15000.0
+    assert histogram.to_dict()["buckets"] == {"le_0.5ms": 1, "le_1ms": 1, "le_5ms": 2}
+
+    # 落在第一个桶且小于桶上界时取最大值，与 max_ms 一样保留 3 位小数
+    histogram = LatencyHistogram()
+    histogram.observe(0.417284)
+    assert histogram.to_dict()["p50_ms"] == histogram.to_dict()["max_ms"] == 0.417
+
+
+@pytest.mark.asyncio
+async def test_server_stats_tool(stats_server):
+    """测试工具调用的延迟、SQL 语句数、缓存命中和输出字节数"""
+    first = await server.handle_call_tool("get_table_info", {"table_name": "orders"})
+    await server.handle_call_tool("get_table_info", {"table_name": "orders"})
+    await server.handle_read_resource("database://table/orders")
+    await server.handle_call_tool("no_such_tool", {})
+
+    result = await server.handle_call_tool("server_stats", {"format": "json"})
+    stats = json.loads(result[0].text)
+    info = stats["operations"]["tool:get_table_info"]
+    assert info["count"] == 2
+    assert info["sql_statements"] > 0
+    assert info["bytes_emitted"] == 2 * len(first[0].text.encode("utf-8"))
+    assert stats["operations"]["resource:read"]["count"] == 1
+    assert stats["operations"]["tool:unknown"]["count"] == 1
+    assert stats["sql"]["statements"] == info["sql_statements"]
+    # 第二次调用命中渲染结果缓存，资源读取（另一种格式）命中表结构缓存
+    assert stats["cache"]["table_info"] == {"hits": 1, "misses": 1, "hit_ratio": 0.5}
+    assert stats["cache"]["rendered"]["hits"] == 1
+
+    result = await server.handle_call_tool("server_stats", {"reset": True})
+    assert "| tool:get_table_info | 2 |" in result[0].text
+    assert "tool:get_table_info" not in metrics.snapshot()["operations"]
+
+
+@pytest.mark.asyncio
+async def test_http_requests_counted(tmp_path):
+    """测试 API 请求计入当前操作，错误响应单独计数"""
+    db_path = str(tmp_path / "lowcode.db")
+    create_sqlite_schema(db_path, entities=5, attributes=50)
+    api = SchemaAPI(db_path, error_rate=0.5, seed=3)
+    client = APIClient("http://schema-api.test", transport=api.transport())
+    metrics.reset()
+
+    with metrics.operation("tool:list_all_tables"):
+        for _ in range(6):
+            await client.get_all_tables()
+    stats = metrics.snapshot()
+    assert stats["operations"]["tool:list_all_tables"]["http_requests"] == 6
+    assert stats["http"]["requests"] == 6
+    assert stats["http"]["error_responses"] == api.stats["errors"] > 0
+
+    await client.aclose()
+    api.close()
+    metrics.reset()
+
+
+def test_dump(tmp_path):
+    """测试统计写入文件，路径中的 {pid} 替换为进程号"""
+    metrics.reset()
+    metrics.record_cache("table_info", True)
+    metrics.dump(str(tmp_path / "stats-{pid}.json"))
+
+    path = tmp_path / f"stats-{os.getpid()}.json"
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["cache"]["table_info"]["hit_ratio"] == 1.0
+    assert not list(tmp_path.glob("*.tmp"))
+    metrics.reset()
@@ -0,0 +1,40 @@
+"""宽表分页测试"""
+
+import pytest
+
+from sp_database_mcp.catalog import InvalidCursorError
+from sp_database_mcp.paging import (
+    decode_page_cursor,
+    encode_page_cursor,
+    estimate_tokens,
+    parse_page_arguments,
+)
+
+
+def test_estimate_tokens():
+    """测试 ASCII 约 4 个字符一个 token，中文每个字符一个 token"""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+    assert estimate_tokens("用户表") == 3
+
+
+def test_page_cursor_bound_to_table():
+    """测试游标只对生成它的表有效"""
+    cursor = encode_page_cursor("user", 50)
+    assert decode_page_cursor(cursor, "user") == 50
+    with pytest.raises(InvalidCursorError):
+        decode_page_cursor(cursor, "order")
+
+
+def test_parse_page_arguments():
+    """测试分页参数解析"""
+    assert parse_page_arguments({"table_name": "user"}, "user") is None
+    assert parse_page_arguments({"limit": 10}, "user") == (0, 10, None)
+    cursor = encode_page_cursor("user", 20)
+    assert parse_page_arguments(
+        {"cursor": cursor, "offset": 5, "max_tokens": 500}, "user"
+    ) == (20, None, 500)
+    for arguments in ({"limit": 0}, {"offset": -1}, {"max_tokens": 0}):
+        with pytest.raises(ValueError):
+            parse_page_arguments(arguments, "user")
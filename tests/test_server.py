@@ -0,0 +1,552 @@
+"""MCP 服务器处理函数测试"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import pytest
+from mcp.shared.exceptions import McpError
+from pydantic import AnyUrl
+from sqlalchemy import text
+
+from sp_database_mcp import server
+from sp_database_mcp.catalog import decode_cursor, paginate
+from sp_database_mcp.database import DatabaseClient
+from sp_database_mcp.datasources import (
+    DEFAULT_DATASOURCE,
+    DataSource,
+    DataSourceRegistry,
+)
+from sp_database_mcp.models import DataSourceConfig
+from sp_database_mcp.subscriptions import ChangeDetector, SubscriptionRegistry
+from sp_database_mcp.usage import UsageLog
+
+
+@pytest.fixture
+def db_server(monkeypatch):
+    """使用临时 SQLite 数据库配置服务器"""
+    with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as f:
+        db_path = f.name
+
+    conn = sqlite3.connect(db_path)
+    for i in range(7):
+        conn.execute(f"CREATE TABLE table_{i} (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.commit()
+    conn.close()
+
+    client = DatabaseClient(f"sqlite:///{db_path}")
+    registry = DataSourceRegistry()
+    registry.register(
+        DataSource(
+            DataSourceConfig(name=DEFAULT_DATASOURCE, pinned=True), db_client=client
+        )
+    )
+    monkeypatch.setattr(server, "registry", registry)
+
+    yield client
+
+    client.close()
+    os.unlink(db_path)
+
+
+def test_paginate_with_cursor():
+    """测试游标分页"""
+    keys = ["a", "b", "c", "d", "e"]
+    page, cursor = paginate(keys, None, 2)
+    assert list(page) == ["a", "b"]
+    assert decode_cursor(cursor) == "b"
+
+    page, cursor = paginate(keys, cursor, 2)
+    assert list(page) == ["c", "d"]
+
+    page, cursor = paginate(keys, cursor, 2)
+    assert list(page) == ["e"]
+    assert cursor is None
+
+
+@pytest.mark.asyncio
+async def test_list_resources_paginated(db_server, monkeypatch):
+    """测试资源列表按页返回，并覆盖全部表"""
+    monkeypatch.setattr(server, "RESOURCE_PAGE_SIZE", 3)
+
+    uris = []
+    cursor = None
+    while True:
+        result = await server.handle_list_resources(cursor)
+        assert len(result.resources) <= 3
+        uris.extend(str(resource.uri) for resource in result.resources)
+        cursor = result.nextCursor
+        if cursor is None:
+            break
+
+    assert uris == [f"database://table/table_{i}" for i in range(7)]
+
+
+@pytest.mark.asyncio
+async def test_list_resources_invalid_cursor(db_server):
+    """测试无效游标返回协议错误"""
+    with pytest.raises(McpError):
+        await server.handle_list_resources("%%%")
+
+
+@pytest.mark.asyncio
+async def test_list_resource_templates(db_server):
+    """测试资源模板"""
+    templates = await server.handle_list_resource_templates()
+    assert [t.uriTemplate for t in templates] == ["database://table/{table_name}"]
+
+
+class FakeSession:
+    """记录推送通知的会话"""
+
+    def __init__(self):
+        self.updated = []
+
+    async def send_resource_updated(self, uri):
+        self.updated.append(str(uri))
+
+
+@pytest.mark.asyncio
+async def test_resource_updated_only_for_changed_tables(db_server, monkeypatch):
+    """测试只向变化表的订阅者推送 resources/updated"""
+    monkeypatch.setattr(server, "subscriptions", SubscriptionRegistry())
+    monkeypatch.setattr(server, "change_detector", ChangeDetector())
+
+    session = FakeSession()
+    uris = ["database://table/table_0", "database://table/table_1"]
+    for uri in uris:
+        server.subscriptions.subscribe(uri, session)
+    server.change_detector.seed(await server._resource_fingerprints(uris))
+
+    await server._notify_resource_changes()
+    assert session.updated == []
+
+    with db_server.engine.begin() as conn:
+        conn.execute(text("ALTER TABLE table_1 ADD COLUMN remark TEXT"))
+
+    await server._notify_resource_changes()
+    assert session.updated == ["database://table/table_1"]
+
+
+@pytest.mark.asyncio
+async def test_late_subscriber_keeps_pending_change(db_server, monkeypatch):
+    """测试表变化后、下次检查前加入的订阅者不会重置基线，两个会话都收到通知"""
+    monkeypatch.setattr(server, "subscriptions", SubscriptionRegistry())
+    monkeypatch.setattr(server, "change_detector", ChangeDetector())
+    uri = "database://table/table_2"
+
+    async def subscribe(session):
+        # 与 handle_subscribe_resource 相同的步骤
+        server.subscriptions.subscribe(uri, session)
+        server.change_detector.seed(await server._resource_fingerprints([uri]))
+
+    first, second = FakeSession(), FakeSession()
+    await subscribe(first)
+    with db_server.engine.begin() as conn:
+        conn.execute(text("ALTER TABLE table_2 ADD COLUMN remark TEXT"))
+    await subscribe(second)
+
+    await server._notify_resource_changes()
+    assert first.updated == [uri]
+    assert second.updated == [uri]
+
+
+@pytest.mark.asyncio
+async def test_tools_route_to_named_datasource(db_server, tmp_path):
+    """测试工具通过 datasource 参数访问独立的命名数据源"""
+    db_path = tmp_path / "tenant.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE tenant_only (id INTEGER PRIMARY KEY)")
+    conn.commit()
+    conn.close()
+
+    tenant = server.registry.register(
+        DataSource(DataSourceConfig(name="tenant", database_url=f"sqlite:///{db_path}"))
+    )
+    assert not tenant.connected
+
+    result = await server.handle_call_tool(
+        "list_all_tables", {"source": "database", "datasource": "tenant"}
+    )
+    assert "tenant_only" in result[0].text
+    assert tenant.connected
+
+    result = await server.handle_call_tool("list_all_tables", {"source": "database"})
+    assert "tenant_only" not in result[0].text
+
+    result = await server.handle_call_tool("list_all_tables", {"datasource": "missing"})
+    assert "未知数据源" in result[0].text
+
+    tools = await server.handle_list_tools()
+    assert all(
+        tool.inputSchema["properties"]["datasource"]["enum"] == ["default", "tenant"]
+        for tool in tools
+        if tool.name not in ("federated_search", "server_stats")
+    )
+
+
+@pytest.mark.asyncio
+async def test_idle_datasource_evicted(db_server, tmp_path):
+    """测试空闲的非常驻数据源被回收，再次使用时重新连接"""
+    db_path = tmp_path / "tenant.db"
+    sqlite3.connect(db_path).close()
+    tenant = server.registry.register(
+        DataSource(DataSourceConfig(name="tenant", database_url=f"sqlite:///{db_path}"))
+    )
+    server.registry.idle_timeout = 0
+
+    server.registry.get("tenant").connect()
+    assert await server.registry.evict_idle() == ["tenant"]
+    assert not tenant.connected
+    # 常驻的 default 数据源不会被回收
+    assert server.registry.default.connected
+
+    await server.registry.get("tenant").aconnect()
+    assert tenant.db_client is not None
+
+
+class SlowDataSource(DataSource):
+    """连接时长时间无响应的数据源，记录进入连接的线程数"""
+
+    connect_calls = 0
+
+    def connect(self):
+        SlowDataSource.connect_calls += 1
+        super().connect()
+
+    def _create_clients(self):
+        time.sleep(2)
+
+
+@pytest.mark.asyncio
+async def test_federated_search_merges_and_tolerates_slow_source(db_server, tmp_path):
+    """测试跨数据源搜索合并排序结果，慢数据源不拖慢整体响应"""
+    db_path = tmp_path / "tenant.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE table_0_archive (id INTEGER PRIMARY KEY)")
+    conn.commit()
+    conn.close()
+    server.registry.register(
+        DataSource(DataSourceConfig(name="tenant", database_url=f"sqlite:///{db_path}"))
+    )
+    server.registry.register(
+        SlowDataSource(DataSourceConfig(name="slow", database_url="sqlite://"))
+    )
+
+    started = time.monotonic()
+    result = await server.handle_call_tool(
+        "federated_search", {"keyword": "table_0", "timeout": 0.5}
+    )
+    assert time.monotonic() - started < 1.5
+
+    text = result[0].text
+    # 完全匹配排在前缀匹配之前，并标注来源数据源
+    assert text.index("## table_0\n") < text.index("## table_0_archive")
+    assert "**数据源**: default (database)" in text
+    assert "**数据源**: tenant (database)" in text
+    assert "数据源 slow (*) 超时" in text
+
+
+class SlowConnectDataSource(DataSource):
+    """建立连接较慢（例如经过 VPN）的数据源，记录连接次数"""
+
+    connect_count = 0
+
+    def _create_clients(self):
+        time.sleep(1)
+        SlowConnectDataSource.connect_count += 1
+        super()._create_clients()
+
+
+def test_server_import_defers_sqlalchemy():
+    """测试导入服务器模块时不加载 SQLAlchemy"""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, sp_database_mcp.server; print('sqlalchemy' in sys.modules)",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip().splitlines()[-1] == "False"
+
+
+def test_stdio_stdout_only_carries_json_rpc(tmp_path):
+    """测试 stdio 模式下连接和预热的提示写到标准错误，标准输出只有 JSON-RPC 消息"""
+    db_path = tmp_path / "stdio.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY)")
+    conn.commit()
+    conn.close()
+    usage_path = tmp_path / "usage.json"
+    usage = UsageLog(str(usage_path))
+    usage.record(DEFAULT_DATASOURCE, "orders")
+    usage.save()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "API_BASE_URL": "",
+        "USAGE_LOG_PATH": str(usage_path),
+        "PREWARM_DELAY": "0",
+    }
+    messages = [
+        {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "initialize",
+            "params": {
+                "protocolVersion": "2025-06-18",
+                "capabilities": {},
+                "clientInfo": {"name": "test", "version": "0"},
+            },
+        },
+        {"jsonrpc": "2.0", "method": "notifications/initialized"},
+        {
+            "jsonrpc": "2.0",
+            "id": 2,
+            "method": "tools/call",
+            "params": {"name": "list_all_tables", "arguments": {}},
+        },
+    ]
+    process = subprocess.Popen(
+        [sys.executable, "-m", "sp_database_mcp.server"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+        text=True,
+    )
+    responses = []
+    for message in messages:
+        process.stdin.write(json.dumps(message) + "\n")
+        process.stdin.flush()
+        if "id" in message:
+            responses.append(json.loads(process.stdout.readline()))
+    # 等待后台预热完成后再关闭标准输入
+    time.sleep(0.5)
+    rest, stderr = process.communicate(timeout=10)
+
+    assert [response["id"] for response in responses] == [1, 2]
+    assert "orders" in responses[1]["result"]["content"][0]["text"]
+    assert all(json.loads(line) for line in rest.splitlines())
+    assert "数据库连接已建立" in stderr
+    assert "已预热 1 个常用表" in stderr
+
+
+@pytest.mark.asyncio
+async def test_federated_search_does_not_wait_for_slow_default(monkeypatch, tmp_path):
+    """测试默认数据源连接缓慢时跨数据源搜索不等待它，重复搜索不再排队新的连接"""
+    db_path = tmp_path / "tenant.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY)")
+    conn.commit()
+    conn.close()
+    registry = DataSourceRegistry()
+    registry.register(
+        SlowDataSource(
+            DataSourceConfig(
+                name=DEFAULT_DATASOURCE, database_url="sqlite://", pinned=True
+            )
+        )
+    )
+    registry.register(
+        DataSource(DataSourceConfig(name="tenant", database_url=f"sqlite:///{db_path}"))
+    )
+    monkeypatch.setattr(server, "registry", registry)
+    SlowDataSource.connect_calls = 0
+
+    for _ in range(3):
+        started = time.monotonic()
+        result = await server.handle_call_tool(
+            "federated_search", {"keyword": "orders", "timeout": 0.3}
+        )
+        assert time.monotonic() - started < 1
+        assert "**数据源**: tenant (database)" in result[0].text
+        assert "数据源 default" in result[0].text
+    # 三次搜索共用一次仍在进行的连接
+    assert SlowDataSource.connect_calls == 1
+
+    await registry.close_all()
+
+
+@pytest.mark.asyncio
+async def test_warm_up_connects_in_background(monkeypatch, tmp_path):
+    """测试默认数据源在后台连接，期间服务器仍能响应请求"""
+    db_path = tmp_path / "slow.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY)")
+    conn.commit()
+    conn.close()
+
+    registry = DataSourceRegistry()
+    registry.register(
+        SlowConnectDataSource(
+            DataSourceConfig(
+                name=DEFAULT_DATASOURCE,
+                database_url=f"sqlite:///{db_path}",
+                pinned=True,
+            )
+        )
+    )
+    monkeypatch.setattr(server, "registry", registry)
+    SlowConnectDataSource.connect_count = 0
+
+    warm_up = asyncio.create_task(server._warm_up())
+    await asyncio.sleep(0.1)
+
+    started = time.monotonic()
+    assert await server.handle_list_tools()
+    # 资源模板按配置列出，不等待连接
+    templates = await server.handle_list_resource_templates()
+    assert [t.uriTemplate for t in templates] == ["database://table/{table_name}"]
+    assert time.monotonic() - started < 0.5
+
+    # 连接完成前到达的工具调用等待同一次连接
+    result = await server.handle_call_tool("list_all_tables", {"source": "database"})
+    assert "orders" in result[0].text
+    await warm_up
+    assert SlowConnectDataSource.connect_count == 1
+
+    await registry.close_all()
+
+
+@pytest.mark.asyncio
+async def test_popular_tables_are_prewarmed(db_server, monkeypatch, tmp_path):
+    """测试工具调用被记录，重启后最常用的表被预热到缓存"""
+    monkeypatch.setattr(server, "usage_log", UsageLog(str(tmp_path / "usage.json")))
+    monkeypatch.setattr(server, "PREWARM_DELAY", 0)
+    for table_name in ("table_1", "table_1", "table_2"):
+        await server.handle_call_tool(
+            "get_table_info", {"table_name": table_name, "source": "database"}
+        )
+    server.usage_log.save()
+
+    # 模拟重启：新的访问记录和空的表目录缓存
+    monkeypatch.setattr(server, "usage_log", UsageLog(str(tmp_path / "usage.json")))
+    monkeypatch.setattr(server, "PREWARM_TOP_N", 1)
+    catalog = server.registry.default.catalog
+    catalog.invalidate()
+
+    await server._prewarm_popular_tables()
+    assert ("database", "table_1") in catalog._table_infos
+    assert ("database", "table_2") not in catalog._table_infos
+
+
+@pytest.mark.asyncio
+async def test_rendered_output_cached_until_invalidated(db_server, monkeypatch):
+    """测试重复读取同一个表时返回缓存的渲染结果，表结构失效后重新渲染"""
+    calls = []
+    format_table_info = server._format_table_info
+
+    def counting_format(table_info):
+        calls.append(table_info.name)
+        return format_table_info(table_info)
+
+    monkeypatch.setattr(server, "_format_table_info", counting_format)
+    arguments = {"table_name": "table_0", "source": "database"}
+
+    first = await server.handle_call_tool("get_table_info", arguments)
+    second = await server.handle_call_tool("get_table_info", arguments)
+    assert first[0].text == second[0].text
+    assert "| id | id | INTEGER | 是 |  |" in first[0].text
+    assert calls == ["table_0"]
+
+    # 资源读取使用另一种格式，单独渲染并缓存
+    resource = await server.handle_read_resource("database://table/table_0")
+    assert resource == await server.handle_read_resource("database://table/table_0")
+    assert '"name": "table_0"' in resource
+
+    db_server.engine.dispose()
+    with db_server.engine.begin() as conn:
+        conn.execute(text("ALTER TABLE table_0 ADD COLUMN extra TEXT"))
+    server.registry.default.catalog.invalidate("database", "table_0")
+
+    third = await server.handle_call_tool("get_table_info", arguments)
+    assert "| extra |" in third[0].text
+    assert calls == ["table_0", "table_0"]
+    assert '"extra"' in await server.handle_read_resource("database://table/table_0")
+
+
+@pytest.mark.asyncio
+async def test_wide_table_paged_from_cache(db_server, monkeypatch):
+    """测试宽表按 limit / cursor / max_tokens 分页，各页字段来自表目录缓存"""
+    with db_server.engine.begin() as conn:
+        columns = ", ".join(f"col_{i} TEXT" for i in range(120))
+        conn.execute(text(f"CREATE TABLE wide (id INTEGER PRIMARY KEY, {columns})"))
+
+    loads = []
+    get_table_info = db_server.get_table_info
+    monkeypatch.setattr(
+        db_server,
+        "get_table_info",
+        lambda table_name: loads.append(table_name) or get_table_info(table_name),
+    )
+
+    names = []
+    arguments = {"table_name": "wide", "source": "database", "limit": 70}
+    while True:
+        result = await server.handle_call_tool("get_table_info", arguments)
+        output = result[0].text
+        names.extend(
+            line.split(" | ")[0][2:]
+            for line in output.splitlines()
+            if line.startswith("| ") and not line.startswith("| 属性名称")
+        )
+        assert "估计" in output
+        if "cursor: `" not in output:
+            break
+        arguments["cursor"] = output.split("cursor: `")[1].split("`")[0]
+
+    assert names == ["id"] + [f"col_{i}" for i in range(120)]
+    assert loads == ["wide"]
+
+    result = await server.handle_call_tool(
+        "get_table_documentation", {"table_name": "wide", "max_tokens": 200}
+    )
+    output = result[0].text
+    assert output.startswith("# wide 表文档")
+    assert "cursor: `" in output
+    assert server.estimate_tokens(output) <= 200
+    assert loads == ["wide"]
+
+    result = await server.handle_call_tool(
+        "get_table_info", {"table_name": "wide", "cursor": "%%%"}
+    )
+    assert result[0].text.startswith("错误：分页参数无效")
+
+
+@pytest.mark.asyncio
+async def test_table_output_formats(db_server):
+    """测试 format 参数选择工具和资源的输出格式，分页时页脚单独返回"""
+    result = await server.handle_call_tool(
+        "get_table_info", {"table_name": "table_0", "format": "compact"}
+    )
+    assert result[0].text.splitlines()[2:] == ["id:INTEGER*", "name:TEXT"]
+
+    result = await server.handle_call_tool(
+        "get_table_info", {"table_name": "table_0", "format": "csv", "limit": 1}
+    )
+    assert result[0].text.splitlines()[1].startswith("id,INTEGER,id,")
+    assert len(result[0].text.splitlines()) == 2
+    assert "cursor: `" in result[1].text
+
+    resource = await server.handle_read_resource("database://table/table_0?format=json")
+    assert resource.startswith('{"name":"table_0"')
+    # MCP SDK 以 AnyUrl 传入资源 URI
+    assert resource == await server.handle_read_resource(
+        AnyUrl("database://table/table_0?format=json")
+    )
+    resource = await server.handle_read_resource("database://table/table_0?format=xml")
+    assert resource.startswith("不支持的格式 xml")
+
+    result = await server.handle_call_tool(
+        "get_table_info", {"table_name": "table_0", "format": "xml"}
+    )
+    assert result[0].text.startswith("错误：不支持的格式 xml")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""SQL 跟踪和 N+1 检测的单元测试"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sp_database_mcp import server
+from sp_database_mcp.database import DatabaseClient
+from sp_database_mcp.datasources import (
+    DEFAULT_DATASOURCE,
+    DataSource,
+    DataSourceRegistry,
+)
+from sp_database_mcp.metrics import metrics
+from sp_database_mcp.models import DataSourceConfig
+from sp_database_mcp.sqltrace import SQLTracer, assert_max_queries, normalize_sql
+from sp_database_mcp.usage import UsageLog
+from tests.test_export import lowcode_url  # noqa: F401
+
+
+@pytest.fixture
+def tracer():
+    """在运行统计上开启 SQL 跟踪，结束后关闭"""
+    metrics.sql_tracer = SQLTracer(repeat_threshold=3)
+    metrics.reset()
+    yield metrics.sql_tracer
+    metrics.sql_tracer = None
+    metrics.reset()
+
+
+@pytest.mark.parametrize(
+    "statement, shape",
+    [
+        (
+            "SELECT * FROM t WHERE code = 'a''b' AND id = 42",
+            "SELECT * FROM t WHERE code = ? AND id = ?",
+        ),
+        ("SELECT * FROM t WHERE id = :id_1", "SELECT * FROM t WHERE id = ?"),
+        ("SELECT * FROM t WHERE id = %(id)s", "SELECT * FROM t WHERE id = ?"),
+        ("SELECT * FROM t WHERE id IN (?, ?,\n ?)", "SELECT * FROM t WHERE id IN (?)"),
+        ("SELECT col_1 FROM table_2 LIMIT 10", "SELECT col_1 FROM table_2 LIMIT ?"),
+        ("SELECT x::text FROM t", "SELECT x::text FROM t"),
+    ],
+)
+def test_normalize_sql(statement, shape):
+    """测试常量和参数替换为 ?，IN 列表合并，标识符中的数字保留"""
+    assert normalize_sql(statement) == shape
+
+
+def test_tracer_flags_repeated_statements(tracer):
+    """测试同一请求中重复执行的语句形状记为疑似 N+1，请求之外的语句单独统计"""
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY)"))
+        with metrics.operation("tool:loop"):
+            for i in range(4):
+                conn.execute(text("SELECT id FROM t WHERE id = :id"), {"id": i})
+            conn.execute(text("SELECT count(*) FROM t"))
+        with metrics.operation("tool:loop"):
+            conn.execute(text("SELECT id FROM t WHERE id = :id"), {"id": 1})
+    engine.dispose()
+
+    trace = metrics.snapshot()["sql_trace"]
+    loop = trace["operations"]["tool:loop"]
+    assert loop["calls"] == 2
+    assert loop["statements"] == 6
+    assert loop["max_statements_per_call"] == 5
+    assert trace["operations"]["(background)"]["statements"] == 1
+    assert trace["n_plus_one"] == [
+        {
+            "operation": "tool:loop",
+            "sql": "SELECT id FROM t WHERE id = ?",
+            "calls": 1,
+            "max_repeats": 4,
+        }
+    ]
+
+    with pytest.raises(ValueError):
+        SQLTracer(repeat_threshold=1)
+
+
+@pytest.mark.asyncio
+async def test_server_stats_sql_trace(tracer, lowcode_url, monkeypatch):  # noqa: F811
+    """测试 server_stats 输出各工具调用的 SQL 跟踪"""
+    client = DatabaseClient(lowcode_url)
+    registry = DataSourceRegistry()
+    registry.register(
+        DataSource(
+            DataSourceConfig(name=DEFAULT_DATASOURCE, pinned=True), db_client=client
+        )
+    )
+    monkeypatch.setattr(server, "registry", registry)
+    monkeypatch.setattr(server, "usage_log", UsageLog(None))
+
+    await server.handle_call_tool("get_table_info", {"table_name": "signup"})
+    result = await server.handle_call_tool("server_stats", {"format": "json"})
+    trace = json.loads(result[0].text)["sql_trace"]
+    info = trace["operations"]["tool:get_table_info"]
+    assert info["calls"] == 1
+    assert info["max_statements_per_call"] > 0
+    assert trace["n_plus_one"] == []
+
+    result = await server.handle_call_tool("server_stats", {})
+    assert "## SQL 跟踪" in result[0].text
+    assert "| tool:get_table_info | 1 |" in result[0].text
+    assert "未发现同一请求中执行 3 次以上的语句形状" in result[0].text
+    client.close()
+
+
+def test_assert_max_queries(lowcode_url):  # noqa: F811
+    """测试超过语句数或重复次数上限时抛出 AssertionError"""
+    client = DatabaseClient(lowcode_url)
+    with assert_max_queries(2, engine=client.engine) as trace:
+        client.get_all_tables()
+    assert trace.statements >= 1
+
+    with pytest.raises(AssertionError, match="超过上限 1"):
+        with assert_max_queries(1):
+            client.get_table_info("activity")
+            client.get_table_info("user")
+    with pytest.raises(AssertionError, match="执行了 2 次"):
+        with assert_max_queries(max_repeats=1):
+            client.get_table_info("activity")
+            client.get_table_info("user")
+    client.close()
+
+
+def test_lowcode_foreign_keys_are_batched(lowcode_url):  # noqa: F811
+    """回归测试：实体的外键引用一次查询，不按外键逐个查询"""
+    client = DatabaseClient(lowcode_url)
+    client.get_table_info("activity")
+    # 实体、字段、被引用实体各一条
+    with assert_max_queries(3, max_repeats=1):
+        info = client.get_table_info("signup")
+    assert [fk["referenced_table"] for fk in info.foreign_keys] == ["activity", "user"]
+    client.close()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""合成低代码 schema 生成器的单元测试"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sp_database_mcp.database import DatabaseClient
+from tests.benchmarks.synthetic_schema import (
+    MIN_ATTRIBUTES,
+    create_sqlite_schema,
+    iter_schema_rows,
+)
+
+
+def _dump(path):
+    conn = sqlite3.connect(path)
+    try:
+        return [
+            conn.execute(f"SELECT * FROM {table} ORDER BY id").fetchall()
+            for table in ("da_logic_entity", "da_entity_attribute")
+        ]
+    finally:
+        conn.close()
+
+
+def test_same_seed_generates_same_rows(tmp_path):
+    """测试同样的参数逐行生成相同的数据，不同种子生成不同的数据"""
+    options = {"entities": 40, "attributes": 800, "fk_density": 0.2}
+    paths = [tmp_path / f"{name}.db" for name in ("a", "b", "c")]
+    stats = create_sqlite_schema(str(paths[0]), seed=7, **options)
+    assert create_sqlite_schema(str(paths[1]), seed=7, **options) == stats
+    create_sqlite_schema(str(paths[2]), seed=8, **options)
+
+    assert _dump(paths[0]) == _dump(paths[1])
+    assert _dump(paths[0]) != _dump(paths[2])
+    assert stats["entities"] == 40
+    assert stats["attributes"] == 800
+    assert stats["foreign_keys"] > 0
+
+
+def test_generated_rows_shape():
+    """测试字段总数按实体分配，每个实体以系统字段开头，外键不引用自身"""
+    rows = list(iter_schema_rows(entities=30, attributes=900, fk_density=0.3, seed=1))
+    counts = [len(attributes) for _, attributes in rows]
+    assert sum(counts) == 900
+    assert min(counts) >= MIN_ATTRIBUTES
+    assert len(set(counts)) > 1
+
+    for entity, attributes in rows:
+        codes = [attr["code"] for attr in attributes]
+        assert len(set(codes)) == len(codes)
+        assert codes[0] == "id" and attributes[0]["primary_key"]
+        assert all(attr["is_system"] for attr in attributes[: MIN_ATTRIBUTES - 1])
+        for attr in attributes:
+            if attr["ref_type"]:
+                assert 1 <= attr["ref_entity_id"] <= 30
+                assert attr["ref_entity_id"] != entity["id"]
+
+    with pytest.raises(ValueError):
+        list(iter_schema_rows(entities=10, attributes=10))
+
+
+def test_generated_schema_loads_through_client(tmp_path):
+    """测试生成的数据库走低代码查询路径，外键指向被引用实体的表名"""
+    path = tmp_path / "lowcode.db"
+    create_sqlite_schema(str(path), entities=20, attributes=400, fk_density=0.5)
+    client = DatabaseClient(f"sqlite:///{path}")
+    assert client.has_schema_tables
+
+    tables = list(client.iter_table_infos(batch_size=8))
+    entity_tables = [t for t in tables if not t.name.startswith("da_")]
+    assert len(entity_tables) == 20
+    assert sum(len(t.columns) for t in entity_tables) == 400
+    names = {t.name for t in entity_tables}
+    foreign_keys = [fk for t in entity_tables for fk in t.foreign_keys]
+    assert foreign_keys
+    assert all(fk["referenced_table"] in names for fk in foreign_keys)
+    assert entity_tables[0].columns[0].is_system
+    client.close()
@@ -0,0 +1,73 @@
+"""系统字段识别测试"""
+
+import json
+import os
+import sqlite3
+import tempfile
+
+from sp_database_mcp.database import DatabaseClient
+from sp_database_mcp.models import SystemFieldRules
+from sp_database_mcp.system_fields import SystemFieldClassifier
+
+
+def test_default_rules():
+    """测试默认规则识别常见的系统字段，不误判业务字段"""
+    classifier = SystemFieldClassifier()
+    for name in ("created_at", "Updated_By", "is_deleted", "sys_tenant", "gmt_modified"):
+        assert classifier.is_system(name), name
+    for name in ("id", "name", "start_time", "resource_id", "versioned_name"):
+        assert not classifier.is_system(name), name
+
+
+def test_custom_rules():
+    """测试完全匹配、前缀、后缀和正则规则"""
+    classifier = SystemFieldClassifier(
+        SystemFieldRules(
+            exact=["Tenant"],
+            prefixes=["x_"],
+            suffixes=["_audit"],
+            patterns=[r"f\d+$"],
+        )
+    )
+    assert classifier.is_system("tenant")
+    assert classifier.is_system("X_trace")
+    assert classifier.is_system("login_audit")
+    assert classifier.is_system("f12")
+    assert not classifier.is_system("created_at")
+    assert not classifier.is_system("f12a")
+    assert not SystemFieldClassifier(SystemFieldRules()).is_system("created_at")
+
+
+def test_rules_from_env(tmp_path, monkeypatch):
+    """测试 SYSTEM_FIELD_RULES 指定的规则文件代替默认规则"""
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"suffixes": ["_ts"]}), encoding="utf-8")
+    monkeypatch.setenv("SYSTEM_FIELD_RULES", str(path))
+
+    classifier = SystemFieldClassifier.from_env()
+    assert classifier.is_system("load_ts")
+    assert not classifier.is_system("created_at")
+
+
+def test_metadata_columns_tagged():
+    """测试通过数据库元数据加载的字段按规则标记 is_system"""
+    with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as f:
+        db_path = f.name
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE orders (id INTEGER PRIMARY KEY, title TEXT, created_at TEXT, "
+        "updated_by TEXT)"
+    )
+    conn.commit()
+    conn.close()
+
+    client = DatabaseClient(f"sqlite:///{db_path}")
+    try:
+        table_info = client.get_table_info("orders")
+        assert [col.code for col in table_info.columns if col.is_system] == [
+            "created_at",
+            "updated_by",
+        ]
+    finally:
+        client.close()
+        os.unlink(db_path)
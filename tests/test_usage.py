@@ -0,0 +1,74 @@
+"""表使用统计与缓存预热测试"""
+
+import asyncio
+import json
+
+import pytest
+
+from sp_database_mcp.usage import UsageLog, prewarm
+
+
+def test_top_ranks_by_count_and_recency():
+    """测试按访问次数排序，久未访问的表权重衰减"""
+    log = UsageLog(half_life=100)
+    now = 10_000.0
+    for _ in range(3):
+        log.record("default", "orders", now=now)
+    log.record("default", "users", now=now)
+    # 访问次数多但已经过了多个半衰期
+    for _ in range(10):
+        log.record("default", "legacy", now=now - 1_000)
+    log.record("tenant", "orders", now=now)
+
+    assert log.top("default", 2, now=now) == ["orders", "users"]
+    assert log.top("default", 10, now=now) == ["orders", "users", "legacy"]
+    assert log.top("tenant", 10, now=now) == ["orders"]
+
+
+def test_save_and_load_merge_counts(tmp_path):
+    """测试访问记录持久化，并与已有文件中的记录合并"""
+    path = tmp_path / "nested" / "usage.json"
+    first = UsageLog(str(path))
+    first.record("default", "orders", now=100.0)
+    first.record("default", "orders", now=200.0)
+    first.save()
+
+    second = UsageLog(str(path))
+    second.record("default", "orders", now=300.0)
+    second.record("default", "users", now=300.0)
+    second.save()
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    entries = {item["table"]: item for item in data["tables"]}
+    assert entries["orders"]["count"] == 3
+    assert entries["orders"]["last_used"] == 300.0
+    assert entries["users"]["count"] == 1
+
+
+def test_load_ignores_corrupt_file(tmp_path):
+    """测试损坏的访问记录文件被忽略"""
+    path = tmp_path / "usage.json"
+    path.write_text("{not json", encoding="utf-8")
+    log = UsageLog(str(path))
+    log.load()
+    assert log.top("default", 10) == []
+
+
+@pytest.mark.asyncio
+async def test_prewarm_yields_to_interactive_requests():
+    """测试有交互请求时预热暂停"""
+    busy = True
+    loaded = []
+
+    async def load(table_name):
+        loaded.append(table_name)
+        return True
+
+    task = asyncio.create_task(prewarm(["a", "b"], load, lambda: busy, delay=0.01))
+    await asyncio.sleep(0.05)
+    assert loaded == []
+
+    busy = False
+    assert await task == 2
+    assert loaded == ["a", "b"]
+
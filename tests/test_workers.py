@@ -0,0 +1,124 @@
+"""多进程服务模式测试"""
+
+import asyncio
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import pytest
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+from sp_database_mcp.catalog_file import write_catalog_file
+from sp_database_mcp.models import TableInfo
+from sp_database_mcp.workers import SnapshotFollower
+
+
+def test_snapshot_follower_detects_new_version(tmp_path):
+    """测试 worker 侧只在目录文件被替换后映射新文件"""
+    path = str(tmp_path / "catalog.bin")
+    write_catalog_file(path, [("database", TableInfo(name="a", columns=[]))], 1)
+
+    follower = SnapshotFollower(path)
+    follower.mark_current()
+    assert follower.poll() is None
+
+    write_catalog_file(path, [("database", TableInfo(name="b", columns=[]))], 2)
+    mapped = follower.poll()
+    assert mapped.version == 2
+    assert mapped.table_names("database") == ["b"]
+    assert follower.poll() is None
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _call_tool(port: int, name: str, arguments: dict) -> str:
+    async with streamablehttp_client(f"http://127.0.0.1:{port}/mcp") as (
+        read_stream,
+        write_stream,
+        _,
+    ):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            result = await session.call_tool(name, arguments)
+            return result.content[0].text
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="需要 fork 支持")
+@pytest.mark.asyncio
+async def test_workers_serve_and_follow_refresh():
+    """测试多个 worker 提供服务，并通过快照获得父进程刷新后的目录"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "test.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE activity (id INTEGER PRIMARY KEY, title TEXT)")
+        conn.commit()
+        conn.close()
+
+        port = _free_port()
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{db_path}",
+            CATALOG_REFRESH_INTERVAL="1",
+            SNAPSHOT_POLL_INTERVAL="0.2",
+        )
+        env.pop("API_BASE_URL", None)
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "sp_database_mcp.server",
+                "--transport",
+                "http",
+                "--workers",
+                "2",
+                "--port",
+                str(port),
+            ],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+        try:
+            deadline = time.monotonic() + 20
+            while True:
+                try:
+                    with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                        break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise
+                    await asyncio.sleep(0.1)
+
+            texts = await asyncio.gather(
+                *(
+                    _call_tool(port, "get_table_info", {"table_name": "activity"})
+                    for _ in range(4)
+                )
+            )
+            assert all("| title |" in text for text in texts)
+
+            conn = sqlite3.connect(db_path)
+            conn.execute("CREATE TABLE activity_log (id INTEGER PRIMARY KEY)")
+            conn.commit()
+            conn.close()
+
+            deadline = time.monotonic() + 10
+            while True:
+                text = await _call_tool(port, "list_all_tables", {})
+                if "activity_log" in text:
+                    break
+                assert time.monotonic() < deadline, text
+                await asyncio.sleep(0.3)
+        finally:
+            process.terminate()
+            process.wait(timeout=15)